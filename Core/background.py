@@ -0,0 +1,101 @@
+# Core/background.py
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QObject, QRunnable, QSize, QThreadPool, QTimer, Signal
+from PySide6.QtGui import QImage, QImageReader, QPixmap
+
+# Chờ bao lâu sau sự kiện resize cuối cùng mới vẽ lại ảnh nền bằng phép co mịn (ms)
+RESIZE_DEBOUNCE_MS = 150
+# Số kích thước cửa sổ giữ sẵn ảnh đã co mịn (ví dụ bình thường và phóng to)
+PIXMAP_CACHE_SIZE = 4
+
+
+class _DecodeTask(QRunnable):
+    """Giải mã ảnh nền trên thread pool, thu nhỏ ngay khi đọc về cỡ cần phủ target."""
+
+    def __init__(self, path, target, renderer):
+        super().__init__()
+        self.path = path
+        self.target = target
+        self.renderer = renderer
+
+    def run(self):
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if size.isValid() and not self.target.isEmpty():
+            scaled = size.scaled(self.target, Qt.AspectRatioMode.KeepAspectRatioByExpanding)
+            if scaled.width() < size.width():
+                # Bộ giải mã JPEG thu nhỏ ngay trong lúc đọc, nhanh hơn đọc đủ rồi co
+                reader.setScaledSize(scaled)
+        # QImage dùng được ngoài luồng giao diện; QPixmap chỉ được tạo trên luồng giao diện
+        self.renderer.decoded.emit(reader.read())
+
+
+class BackgroundRenderer(QObject):
+    """Ảnh nền của cửa sổ, co theo kích thước cửa sổ với bộ nhớ đệm.
+
+    Ảnh được giải mã một lần ở nền, đã thu nhỏ về cỡ màn hình. Trong lúc kéo
+    giãn cửa sổ, mỗi sự kiện resize chỉ dùng phép co nhanh (không nội suy);
+    phép co mịn chạy một lần khi người dùng dừng tay, và kết quả được giữ lại
+    theo kích thước nên phóng to/thu nhỏ lần sau không phải co lại.
+    """
+    decoded = Signal(QImage)
+    # Không đọc được ảnh (thiếu tệp hoặc hỏng)
+    failed = Signal()
+
+    def __init__(self, label, path, parent=None, debounce_ms=RESIZE_DEBOUNCE_MS, cache_size=PIXMAP_CACHE_SIZE):
+        super().__init__(parent)
+        self.label = label
+        self.path = path
+        self.cache_size = cache_size
+        self._source = None
+        self._size = QSize()
+        self._cache = OrderedDict()
+        self._task = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._render_smooth)
+        self.decoded.connect(self._on_decoded)
+
+    def load(self, target):
+        """Bắt đầu giải mã ở nền; target là kích thước lớn nhất cần phủ (thường là màn hình)."""
+        self._task = _DecodeTask(self.path, target, self)
+        QThreadPool.globalInstance().start(self._task)
+
+    def _on_decoded(self, image):
+        self._task = None
+        if image.isNull():
+            self.failed.emit()
+            return
+        self._source = QPixmap.fromImage(image)
+        if not self._size.isEmpty():
+            self._render_smooth()
+
+    def resize(self, size):
+        self._size = size
+        self.label.setGeometry(0, 0, size.width(), size.height())
+        if self._source is None:
+            return
+        key = (size.width(), size.height())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self._timer.stop()
+            self.label.setPixmap(cached)
+            return
+        self.label.setPixmap(self._scaled(Qt.TransformationMode.FastTransformation))
+        self._timer.start()
+
+    def _scaled(self, mode):
+        return self._source.scaled(self._size, Qt.AspectRatioMode.KeepAspectRatioByExpanding, mode)
+
+    def _render_smooth(self):
+        if self._source is None or self._size.isEmpty():
+            return
+        pixmap = self._scaled(Qt.TransformationMode.SmoothTransformation)
+        self._cache[(self._size.width(), self._size.height())] = pixmap
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        self.label.setPixmap(pixmap)
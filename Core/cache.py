@@ -0,0 +1,261 @@
+# Core/cache.py
+# Bộ nhớ đệm trên đĩa cho kết quả phân tích: văn bản cây giống hệt (cùng định
+# dạng đầu vào, cùng phiên bản bộ phân tích) được nạp lại thành ParsedTree và
+# BuildPlan đã biên dịch mà không phải phân tích hay làm sạch tên lần nữa.
+#
+# Mỗi mục là một tệp "<khóa>.tbcache": dòng "TBC1", rồi một khối marshal chứa
+# các mảng của cây và kế hoạch ở dạng bytes. marshal giữ tham chiếu chung nên
+# tên lặp lại chỉ được lưu một lần. Khóa băm mã nguồn của các module quyết định
+# kết quả phân tích cùng văn bản cây (khi văn bản đã nằm trong bộ nhớ) hoặc
+# đường dẫn và os.stat của tệp cây, để tệp chỉ được đọc một lần bởi bộ phân tích.
+# Sửa bộ phân tích tự làm mọi mục cũ thôi được dùng; các mục đó bị đẩy ra theo
+# LRU như mọi mục khác.
+import hashlib
+import marshal
+import os
+import sys
+import time
+
+from . import formats, parser, planner, templates
+from .formats import InputFormat
+from .ingest import TreeFile
+from .parser import ParsedTree, TreeParser
+from .planner import BuildPlan
+
+CACHE_MAGIC = b"TBC1\n"
+# Tăng khi bố cục khối dữ liệu thay đổi
+CACHE_VERSION = 1
+CACHE_EXTENSION = ".tbcache"
+# Tổng dung lượng tối đa của thư mục đệm; vượt quá thì xóa các mục dùng lâu nhất
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+CACHE_DIR_NAME = "tree_builder"
+# Biến môi trường tắt bộ nhớ đệm mặc định (CI, thư mục nhà chỉ đọc)
+CACHE_DISABLE_ENV = "TREE_BUILDER_NO_CACHE"
+# Tệp sửa gần hơn chừng này giây không được đệm: đồng hồ thô (1-2 giây) có thể
+# cho cùng mtime với một lần sửa ngay sau đó
+RACY_SECONDS = 2
+
+_code_fingerprint = None
+
+
+def default_cache_dir():
+    """Thư mục đệm theo quy ước của hệ điều hành (LOCALAPPDATA, ~/Library/Caches, XDG)."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, CACHE_DIR_NAME)
+
+
+def cache_disabled():
+    """True khi TREE_BUILDER_NO_CACHE được đặt (khác rỗng và "0")."""
+    return os.environ.get(CACHE_DISABLE_ENV, "") not in ("", "0")
+
+
+def _fingerprint():
+    """Băm mã nguồn của các module quyết định kết quả phân tích và kế hoạch (tính một lần)."""
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{CACHE_VERSION}:{marshal.version}:{sys.version_info[0]}.{sys.version_info[1]}".encode())
+        for module in (parser, formats, planner, templates):
+            try:
+                with open(module.__file__, "rb") as f:
+                    digest.update(f.read())
+            except (OSError, TypeError):
+                # Bản đóng gói không kèm mã nguồn: chỉ còn CACHE_VERSION để phân biệt
+                digest.update(module.__name__.encode())
+        _code_fingerprint = digest.digest()
+    return _code_fingerprint
+
+
+def _format_key(input_format):
+    if isinstance(input_format, InputFormat):
+        return f"{input_format.name}:{input_format.width}:{input_format.explicit_dirs}"
+    return input_format or "auto"
+
+
+def _dump(tree, plan):
+    return marshal.dumps((
+        tree.parents.tobytes(), tree.names, bytes(tree.dir_bits), tree.line_nums.tobytes(), tree.contents,
+        tree.originals, tree.warnings, tree.total_lines, tree.skipped,
+        plan.parents.tobytes(), plan.nodes.tobytes(), bytes(plan.dir_bits), plan.levels, plan.dir_paths,
+        plan.contents, plan.duplicates,
+    ))
+
+
+def _load(data):
+    (tree_parents, names, tree_dir_bits, line_nums, tree_contents, originals, warnings, total_lines, skipped,
+     plan_parents, nodes, plan_dir_bits, levels, dir_paths, plan_contents, duplicates) = marshal.loads(data)
+    tree = ParsedTree()
+    tree.parents.frombytes(tree_parents)
+    tree.names = names
+    tree.dir_bits = bytearray(tree_dir_bits)
+    tree.line_nums.frombytes(line_nums)
+    tree.contents = tree_contents
+    tree.originals = originals
+    tree.warnings = warnings
+    tree.total_lines = total_lines
+    tree.skipped = skipped
+    plan = BuildPlan()
+    plan.parents.frombytes(plan_parents)
+    plan.nodes.frombytes(nodes)
+    # Tên của op là tên của nút đầu tiên ứng với nó, không cần lưu lần hai
+    plan.names = [names[node] for node in plan.nodes]
+    plan.dir_bits = bytearray(plan_dir_bits)
+    plan.levels = levels
+    plan.dir_paths = dir_paths
+    plan.contents = plan_contents
+    plan.duplicates = duplicates
+    if len(tree.parents) != len(names) or len(plan.parents) != len(plan.names):
+        raise ValueError("inconsistent cache entry")
+    return tree, plan
+
+
+class TreeCache:
+    """Bộ nhớ đệm ParsedTree + BuildPlan theo băm nội dung, giới hạn max_bytes với LRU.
+
+    Thời điểm sửa đổi của tệp là lần dùng gần nhất. Ghi qua tệp tạm rồi
+    os.replace nên nhiều tiến trình (hàng đợi dựng) dùng chung thư mục được;
+    mục hỏng hoặc đọc dở bị coi là trượt và xóa đi.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        # Cho RunReport
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def key(self, source, input_format=None):
+        """Khóa của source: văn bản cây, hoặc TreeFile (theo os.stat, không đọc tệp).
+
+        Trả về None khi không nên đệm: tệp không stat được hoặc vừa được sửa
+        (xem RACY_SECONDS); load() coi đó là trượt và store() bỏ qua.
+        """
+        digest = hashlib.blake2b(_fingerprint(), digest_size=20)
+        digest.update(_format_key(input_format).encode("utf-8"))
+        digest.update(b"\0")
+        if isinstance(source, TreeFile):
+            try:
+                st = os.stat(source.path)
+            except OSError:
+                return None
+            if time.time_ns() - st.st_mtime_ns < RACY_SECONDS * 1_000_000_000:
+                return None
+            digest.update(b"file\0")
+            digest.update(os.path.realpath(source.path).encode("utf-8", "surrogateescape"))
+            digest.update(f"\0{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{st.st_ctime_ns}".encode())
+        else:
+            digest.update(source.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_EXTENSION)
+
+    def load(self, key):
+        """(tree, plan) của khóa, hoặc None nếu chưa có hay mục không dùng được."""
+        if key is None:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            if not data.startswith(CACHE_MAGIC):
+                raise ValueError("bad cache magic")
+            result = _load(memoryview(data)[len(CACHE_MAGIC):])
+        except (ValueError, EOFError, TypeError):
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_read += len(data)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def store(self, key, tree, plan):
+        """Ghi một mục rồi dọn bớt mục cũ; lỗi ghi chỉ làm mất lần đệm này."""
+        if key is None:
+            return False
+        path = self._path(key)
+        data = CACHE_MAGIC + _dump(tree, plan)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            self._remove(temp_path)
+            return False
+        self.bytes_written += len(data)
+        self.evict()
+        return True
+
+    def parse(self, source, input_format=None):
+        """Như TreeParser.parse rồi BuildPlan.compile, nhưng dùng mục đệm nếu có.
+
+        source là văn bản cây hoặc TreeFile. Trả về (tree, plan, hit).
+        """
+        key = self.key(source, input_format)
+        cached = self.load(key)
+        if cached is not None:
+            return cached + (True,)
+        if isinstance(source, TreeFile):
+            tree = source.parse(input_format)
+        else:
+            tree = TreeParser.parse(source, input_format)
+        plan = BuildPlan.compile(tree)
+        self.store(key, tree, plan)
+        return tree, plan, False
+
+    def entries(self):
+        """[(thời điểm dùng, kích thước, đường dẫn)] của các mục, cũ nhất trước."""
+        found = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(CACHE_EXTENSION):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return []
+        found.sort()
+        return found
+
+    def evict(self):
+        """Xóa các mục dùng lâu nhất tới khi tổng dung lượng không vượt max_bytes."""
+        found = self.entries()
+        total = sum(size for _, size, _ in found)
+        for _, size, path in found:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,546 @@
+# Core/cli.py
+# Điểm vào dòng lệnh: không bao giờ import PySide6 để khởi động nhanh và chạy được
+# trong môi trường không có màn hình (CI, script).
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+from .cache import CACHE_DISABLE_ENV, DEFAULT_CACHE_BYTES, TreeCache, cache_disabled, default_cache_dir
+from .formats import format_names
+from .ingest import TreeFile
+from .jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, BuildJob, JobQueue
+from .journal import BuildJournal, JournalError, rollback
+from .parser import TreeParser
+from .planner import BuildPlan
+from .sinks import FORMAT_DIR, OUTPUT_FORMATS, detect_format, open_sink
+from .sync import diff_tree, prune
+from .reverse import IgnoreRules, TreeTextGenerator
+from .report import (RunReport, format_report, profiled, record_cache_stats, record_journal_stats,
+                     record_materializer_stats)
+from .templates import ContentResolver, TemplateError, TemplateRegistry
+from .translations import Translations
+from .events import SEVERITY_ERROR, EventRenderer
+from .validator import has_errors, target_limits, validate_tree
+from .watch import WATCH_WAIT_SECONDS, FileWatcher, WatchedSpec, apply_delta, validate_delta
+
+
+class CliReporter:
+    """In tiến trình ra stdout (khi bật --verbose) và lỗi/cảnh báo ra stderr."""
+
+    def __init__(self, verbose=False, report=None):
+        self.verbose = verbose
+        self.created = 0
+        self.errors = 0
+        self.report = report or RunReport()
+
+    def created_entry(self, is_dir, name):
+        self.created += 1
+        if self.verbose:
+            key = "log_folder_created" if is_dir else "log_file_created"
+            print(Translations.get(key, name=name))
+
+    def info(self, message):
+        print(message)
+
+    def warning(self, message):
+        print(message, file=sys.stderr)
+
+    def error(self, path, error):
+        self.errors += 1
+        self.report.error(error)
+        if isinstance(error, TemplateError):
+            print(Translations.get("err_template", path=path, error=error), file=sys.stderr)
+        elif isinstance(error, PermissionError):
+            print(Translations.get("err_permission", path=path), file=sys.stderr)
+        else:
+            print(Translations.get("err_os", path=path, error=error), file=sys.stderr)
+
+
+def open_input(path):
+    """Các dòng của đầu vào: stdin, hoặc TreeFile (ánh xạ bộ nhớ, đọc theo khối) với một tệp."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", errors="replace")
+    return contextlib.nullcontext(TreeFile(path))
+
+
+def build_streaming(lines, sink, reporter, contents=None, input_format=None):
+    """Phân tích và tạo từng nút ngay khi nút đó được chốt."""
+    parser = TreeParser(input_format)
+    tree = parser.tree
+    builder = sink.streaming(
+        tree,
+        on_created=lambda i: reporter.created_entry(tree.is_dir(i), tree.names[i]),
+        on_error=lambda i, path, e: reporter.error(path, e),
+        contents=contents)
+    reported_warnings = 0
+    created = 0
+    with reporter.report.phase("parse_and_create"):
+        for line in lines:
+            parser.feed_line(line)
+            while reported_warnings < len(tree.warnings):
+                reporter.warning(Translations.get("warn_indent", line_num=tree.warnings[reported_warnings]))
+                reported_warnings += 1
+            while created < parser.ready:
+                builder.create(created)
+                created += 1
+        parser.close()
+        for line_num in tree.warnings[reported_warnings:]:
+            reporter.warning(Translations.get("warn_indent", line_num=line_num))
+        for index in range(created, len(tree)):
+            builder.create(index)
+    record_tree_stats(reporter.report, tree)
+    record_materializer_stats(reporter.report, builder.stats)
+
+
+def sync_prepare(plan, output_path, reporter, remove_extras=False):
+    """Quét thư mục đầu ra và trả về tập op đã tồn tại."""
+    report = diff_tree(plan, output_path)
+    reporter.info(Translations.get(
+        "log_sync_summary", scanned=report.scanned_dirs, missing=len(report.missing),
+        extras=len(report.extras), conflicts=len(report.conflicts)))
+    for op in report.conflicts:
+        reporter.warning(Translations.get("log_conflict_entry", path=plan.rel_path(op)))
+    if remove_extras:
+        prune(report, plan, output_path,
+              on_removed=lambda path: reporter.info(Translations.get("log_removed", path=path)),
+              on_error=reporter.error)
+    else:
+        for rel_path, _ in report.extras:
+            reporter.info(Translations.get("log_extra_entry", path=rel_path))
+    return report.existing
+
+
+def check_tree(tree, sink, reporter):
+    """Kiểm tra trước khi dựng; in mọi vấn đề và trả về False nếu có lỗi."""
+    with reporter.report.phase("check"):
+        limits = target_limits(sink.output_path) if sink.supports_sync else None
+        issues = validate_tree(tree, sink.output_path if limits else "", limits)
+    reporter.report.count("check_issues", len(issues))
+    renderer = EventRenderer(Translations)
+    for entry in issues:
+        reporter.warning(renderer.message(entry))
+    errors = sum(1 for entry in issues if entry[0] == SEVERITY_ERROR)
+    if errors:
+        reporter.warning(Translations.get("check_failed", errors=errors, warnings=len(issues) - errors))
+        reporter.errors += errors
+    return not errors
+
+
+def build_parallel(lines, sink, reporter, jobs=None, sync=False, remove_extras=False, contents=None,
+                   input_format=None, journal_path=None, resume=False, check=True, cache=None, tree=None):
+    """Đọc hết đầu vào theo dòng, biên dịch kế hoạch rồi tạo song song (với thư mục).
+
+    journal_path bật nhật ký thao tác; resume bỏ qua các op mà nhật ký đã ghi.
+    check=True chạy kiểm tra trước và không tạo gì nếu có lỗi. cache là TreeCache
+    tùy chọn: tệp cây đã gặp không phải phân tích và lập kế hoạch lại; stdin
+    không được đệm để vẫn được phân tích theo luồng. tree là ParsedTree đã phân
+    tích sẵn (khi đó lines và cache bị bỏ qua). Trả về False nếu kiểm tra trước
+    thất bại.
+    """
+    report = reporter.report
+    plan = None
+    if tree is not None or not isinstance(lines, TreeFile):
+        cache = None
+    if cache is not None:
+        with report.phase("cache_load"):
+            cache_key = cache.key(lines, input_format)
+            cached = cache.load(cache_key)
+        if cached is not None:
+            tree, plan = cached
+            reporter.info(Translations.get("log_cache_hit", nodes=len(tree)))
+    if plan is None and tree is None:
+        with report.phase("parse"):
+            parser = TreeParser(input_format)
+            parser.feed(lines)
+            tree = parser.close()
+    record_tree_stats(report, tree)
+    for line_num in tree.warnings:
+        reporter.warning(Translations.get("warn_indent", line_num=line_num))
+    if check and not check_tree(tree, sink, reporter):
+        return False
+    if plan is None:
+        with report.phase("plan"):
+            plan = BuildPlan.compile(tree)
+        if cache is not None:
+            with report.phase("cache_store"):
+                cache.store(cache_key, tree, plan)
+    report.count("duplicates_merged", plan.duplicates)
+    existing = None
+    if sync:
+        with report.phase("sync_scan"):
+            existing = sync_prepare(plan, sink.output_path, reporter, remove_extras)
+    journal = None
+    if journal_path:
+        if resume and os.path.exists(journal_path):
+            journal, done_ops = BuildJournal.resume(journal_path, plan)
+            existing = done_ops if existing is None else existing | done_ops
+            reporter.info(Translations.get("log_resumed", done=len(done_ops)))
+        else:
+            journal = BuildJournal.create(journal_path, plan, sink.output_path)
+    materializer = sink.materializer(plan, max_workers=jobs,
+                                     on_created=lambda op: reporter.created_entry(plan.is_dir(op), plan.names[op]),
+                                     on_error=lambda op, path, e: reporter.error(path, e),
+                                     skip=existing, truncate=not sync, contents=contents, journal=journal)
+    with report.phase("create"):
+        try:
+            materializer.run()
+        finally:
+            if journal:
+                journal.close()
+    record_materializer_stats(report, materializer.stats)
+    if journal:
+        record_journal_stats(report, journal)
+    if cache is not None:
+        record_cache_stats(report, cache)
+    return True
+
+
+def watch_tree(args, sink, reporter, contents=None, input_format=None):
+    """Chế độ --watch: dựng đồng bộ một lần rồi áp dụng mỗi lần tệp cây được lưu, tới Ctrl+C.
+
+    Mỗi thay đổi chỉ được phân tích lại quanh các dòng đã sửa (Core/watch.py);
+    mục thêm, chuyển, đổi tên và xóa được áp dụng thẳng lên thư mục; tệp có nội
+    dung chỉ bị xóa với --prune. Mỗi thay đổi được kiểm tra trước trên phần cây
+    nó chạm tới; khi kiểm tra (của thay đổi hay của lần dựng đầy đủ) thất bại,
+    không gì được áp dụng và lần lưu sau được dựng đầy đủ lại.
+    """
+    spec = WatchedSpec(args.input, input_format)
+
+    def full_build():
+        with reporter.report.phase("parse"):
+            tree = spec.load()
+        return build_parallel(None, sink, reporter, jobs=args.jobs, sync=True, remove_extras=args.prune,
+                              contents=contents, check=not args.no_check, tree=tree)
+
+    def on_removed(path):
+        if reporter.verbose:
+            reporter.info(Translations.get("log_removed", path=path))
+
+    def on_renamed(old, path):
+        if reporter.verbose:
+            reporter.info(Translations.get("log_renamed", old=old, path=path))
+
+    def on_moved(old, path):
+        if reporter.verbose:
+            reporter.info(Translations.get("log_moved", old=old, path=path))
+
+    synced = full_build()
+    # Tệp do chế độ theo dõi tạo, để biết tệp nào chưa bị sửa và xóa được khi không --prune
+    created = {}
+    limits = target_limits(sink.output_path)
+    renderer = EventRenderer(Translations)
+    with FileWatcher(args.input) as watcher:
+        reporter.info(Translations.get("log_watch_started", path=args.input, method=watcher.method))
+        try:
+            while True:
+                if not watcher.wait(WATCH_WAIT_SECONDS):
+                    continue
+                started = time.perf_counter()
+                try:
+                    if not synced:
+                        synced = full_build()
+                        continue
+                    delta = spec.update()
+                except (OSError, ValueError) as e:
+                    # Tệp đang được ghi dở hoặc JSON chưa hợp lệ: chờ lần lưu sau
+                    print(Translations.get("err_critical", error=e), file=sys.stderr)
+                    continue
+                if delta is None:
+                    continue
+                if not args.no_check:
+                    issues = validate_delta(delta, sink.output_path, limits)
+                    for entry in issues:
+                        reporter.warning(renderer.message(entry))
+                    if has_errors(issues):
+                        errors = sum(1 for entry in issues if entry[0] == SEVERITY_ERROR)
+                        reporter.warning(Translations.get("check_failed", errors=errors,
+                                                          warnings=len(issues) - errors))
+                        reporter.errors += errors
+                        synced = False
+                        continue
+                if not delta:
+                    continue
+                counts = apply_delta(delta, sink.output_path, contents, args.jobs, prune=args.prune, created=created,
+                                     on_created=lambda rel_path, is_dir: reporter.created_entry(is_dir, rel_path),
+                                     on_removed=on_removed, on_renamed=on_renamed, on_moved=on_moved,
+                                     on_kept=lambda path: reporter.warning(Translations.get("log_watch_kept", path=path)),
+                                     on_error=reporter.error)
+                reporter.info(Translations.get("log_watch_applied", seconds=time.perf_counter() - started,
+                                               **counts))
+        except KeyboardInterrupt:
+            pass
+
+
+def record_tree_stats(report, tree):
+    report.count("lines_parsed", tree.total_lines)
+    report.count("nodes", len(tree))
+    report.count("nodes_skipped", tree.skipped)
+    report.count("indent_warnings", len(tree.warnings))
+
+
+def dump_tree(args, reporter):
+    """Chế độ --reverse: ghi văn bản cây của một thư mục ra tệp hoặc stdout."""
+    ignore = IgnoreRules(args.ignore or ())
+    for ignore_file in args.ignore_file or ():
+        ignore.add_file(ignore_file)
+    generator = TreeTextGenerator(
+        args.reverse, max_depth=args.max_depth, ignore=ignore, include_root=not args.no_root,
+        dirs_first=args.dirs_first, max_workers=args.jobs,
+        on_lossy=lambda path: reporter.warning(Translations.get("warn_lossy_name", path=path)))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as stream:
+            return generator.write_to(stream)
+    stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="\n", write_through=False)
+    try:
+        return generator.write_to(stdout)
+    finally:
+        stdout.flush()
+        stdout.detach()
+
+
+def rollback_build(journal_path, reporter):
+    """Chế độ --rollback: xóa những gì bản dựng có nhật ký đã tạo."""
+    def on_removed(path):
+        if reporter.verbose:
+            reporter.info(Translations.get("log_removed", path=path))
+
+    try:
+        removed = rollback(journal_path, on_removed=on_removed, on_error=reporter.error)
+    except (OSError, JournalError) as e:
+        print(Translations.get("err_critical", error=e), file=sys.stderr)
+        return 1
+    reporter.info(Translations.get("log_rolled_back", removed=removed))
+    return 1 if reporter.errors else 0
+
+
+def load_batch(path, allow_copy_outside=False):
+    """Đọc tệp --batch: danh sách JSON các việc {"tree", "output", "format", "input_format", "templates"}.
+
+    Đường dẫn tương đối được tính từ thư mục chứa tệp batch.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: expected a JSON list of jobs")
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict) or "tree" not in entry or "output" not in entry:
+            raise ValueError(f"{path}: job {number} needs 'tree' and 'output'")
+        tree_path = os.path.join(base, entry["tree"])
+        output_path = os.path.join(base, entry["output"])
+        output_format = entry.get("format") or "auto"
+        if output_format == "auto":
+            output_format = detect_format(output_path)
+        elif output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"{path}: job {number}: unknown output format {output_format!r}")
+        templates = entry.get("templates")
+        if not os.path.isfile(tree_path):
+            raise ValueError(f"{path}: job {number}: tree file not found: {tree_path}")
+        # Tiến trình con tự đọc tệp cây, văn bản không đi qua pool
+        jobs.append(BuildJob(None, output_path, output_format, entry.get("input_format"),
+                             templates_path=os.path.join(base, templates) if templates else None,
+                             base_dir=os.path.dirname(tree_path), label=entry["tree"], tree_path=tree_path,
+                             allow_copy_outside=allow_copy_outside))
+    return jobs
+
+
+def no_cache(args):
+    """--no-cache, hoặc biến môi trường tắt bộ nhớ đệm khi không chỉ định --cache-dir."""
+    return args.no_cache or (cache_disabled() and not args.cache_dir)
+
+
+def run_batch(args, reporter):
+    """Chế độ --batch: dựng nhiều cặp (cây, đầu ra) song song trên một pool tiến trình."""
+    try:
+        jobs = load_batch(args.batch, args.allow_copy_outside)
+    except (OSError, ValueError) as e:
+        print(Translations.get("err_critical", error=e), file=sys.stderr)
+        return 1
+    queue = JobQueue(jobs, processes=args.processes, threads=args.jobs,
+                     cache_dir=None if no_cache(args) else args.cache_dir or default_cache_dir())
+    reported = set()
+    renderer = EventRenderer(Translations)
+
+    def on_poll(queue):
+        for index, state in enumerate(queue.states):
+            if not state.finished or index in reported:
+                continue
+            reported.add(index)
+            job = queue.jobs[index]
+            if state.status == JOB_FAILED:
+                reporter.errors += 1
+                print(Translations.get("job_failed_entry", job=job.label, error=state.error), file=sys.stderr)
+                continue
+            result = state.result or {"created": 0, "errors": 0, "error_samples": [], "issues": [], "seconds": 0.0}
+            reporter.created += result["created"]
+            reporter.errors += result["errors"]
+            for entry in result["issues"]:
+                reporter.warning(f"{job.label}: {renderer.message(entry)}")
+            for path, error in result["error_samples"]:
+                print(Translations.get("err_os", path=path, error=error), file=sys.stderr)
+            key = "job_done_entry" if state.status == JOB_DONE else "job_cancelled_entry"
+            reporter.info(Translations.get(key, job=job.label, output=job.output_path, created=result["created"],
+                                           errors=result["errors"], seconds=result["seconds"]))
+
+    queue.start()
+    try:
+        queue.wait(on_poll=on_poll)
+    except KeyboardInterrupt:
+        queue.cancel_all()
+        queue.wait(on_poll=on_poll)
+    finally:
+        queue.shutdown()
+    cancelled = sum(state.status == JOB_CANCELLED for state in queue.states)
+    return 1 if reporter.errors or cancelled else 0
+
+
+def build_arg_parser():
+    # Chạy bằng "python -m Core" hoặc qua lệnh tree-builder đã cài (pyproject.toml)
+    prog = os.path.basename(sys.argv[0])
+    if prog in ("__main__.py", "-m", ""):
+        prog = "python -m Core"
+    parser = argparse.ArgumentParser(prog=prog, description=Translations.get("cli_description"))
+    parser.add_argument("input", nargs="?", default="-", help="tree text file, or '-' for stdin (default)")
+    parser.add_argument("-o", "--output",
+                        help="output directory or archive (with --reverse: text file, default stdout)")
+    parser.add_argument("--input-format", choices=("auto",) + format_names(), default="auto",
+                        help="input format; 'auto' detects it from the first lines")
+    parser.add_argument("--format", choices=("auto",) + OUTPUT_FORMATS, default="auto",
+                        help="output format; 'auto' picks an archive from the -o extension (.zip, .tar.gz, ...)")
+    parser.add_argument("--reverse", metavar="DIR",
+                        help="generate tree text from an existing directory instead of building one")
+    parser.add_argument("--max-depth", type=int, default=None, help="with --reverse, limit listing depth")
+    parser.add_argument("--ignore", action="append", metavar="PATTERN",
+                        help="with --reverse, .gitignore-style pattern to skip (repeatable)")
+    parser.add_argument("--ignore-file", action="append", metavar="FILE",
+                        help="with --reverse, read ignore patterns from a file such as .gitignore")
+    parser.add_argument("--no-root", action="store_true",
+                        help="with --reverse, list the directory's contents without a root line")
+    parser.add_argument("--dirs-first", action="store_true", help="with --reverse, list directories first")
+    parser.add_argument("--stream", action="store_true",
+                        help="create each entry as soon as its line is read (sequential)")
+    parser.add_argument("--sync", action="store_true",
+                        help="only create entries missing from the output directory; never truncate files")
+    parser.add_argument("--prune", action="store_true",
+                        help="with --sync or --watch, remove entries that are not in the tree")
+    parser.add_argument("--watch", action="store_true",
+                        help="build, then keep applying edits of the tree file to the output directory until Ctrl+C")
+    parser.add_argument("--no-check", action="store_true",
+                        help="skip the pre-flight check for name collisions and path limits")
+    parser.add_argument("--journal", metavar="FILE",
+                        help="append an operation journal so the build can be resumed or rolled back")
+    parser.add_argument("--resume", action="store_true",
+                        help="with --journal, skip entries the journal records as already done")
+    parser.add_argument("--rollback", metavar="JOURNAL",
+                        help="remove everything the journaled build created, then delete the journal")
+    parser.add_argument("--batch", metavar="FILE",
+                        help='JSON list of jobs {"tree": ..., "output": ...} built in parallel processes')
+    parser.add_argument("--processes", type=int, default=None,
+                        help="with --batch, number of worker processes (default: CPU count)")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help=f"parse cache directory (default: {default_cache_dir()})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024), metavar="MB",
+                        help="parse cache size limit; least recently used entries are evicted (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always parse the tree text instead of loading a cached parse and plan; "
+                             f"{CACHE_DISABLE_ENV}=1 does the same unless --cache-dir is given. "
+                             "stdin is never cached")
+    parser.add_argument("--templates", metavar="FILE",
+                        help="JSON template registry with named templates and per-extension file contents")
+    parser.add_argument("--allow-copy-outside", action="store_true",
+                        help="let '@copy' sources resolve outside the tree file's (or template registry's) "
+                             "directory, e.g. absolute paths, '..' or symlinks pointing elsewhere")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker threads for parallel creation")
+    parser.add_argument("--report", metavar="FILE", help="write a JSON run report with phase times and counters")
+    parser.add_argument("--stats", action="store_true", help="print the run report summary")
+    parser.add_argument("--profile", metavar="FILE", help="run under cProfile and save stats to FILE")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every created entry")
+    parser.add_argument("--lang", choices=sorted(Translations.lang_map), default=Translations.LANG_EN,
+                        help="message language (default: en)")
+    return parser
+
+
+def main(argv=None):
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    Translations.set_language(args.lang)
+    if args.reverse:
+        if not os.path.isdir(args.reverse):
+            print(Translations.get("cli_input_not_found", path=args.reverse), file=sys.stderr)
+            return 2
+        dump_tree(args, CliReporter())
+        return 0
+    if args.rollback:
+        return rollback_build(args.rollback, CliReporter(verbose=args.verbose))
+    if args.batch:
+        started = time.perf_counter()
+        reporter = CliReporter(verbose=args.verbose)
+        status = run_batch(args, reporter)
+        print(Translations.get("cli_summary", created=reporter.created, errors=reporter.errors,
+                               seconds=time.perf_counter() - started))
+        return status
+    if not args.output:
+        arg_parser.error("the following arguments are required: -o/--output")
+    if args.stream and args.sync:
+        arg_parser.error("--stream cannot be combined with --sync")
+    if args.prune and not (args.sync or args.watch):
+        arg_parser.error("--prune requires --sync or --watch")
+    output_format = detect_format(args.output) if args.format == "auto" else args.format
+    input_format = None if args.input_format == "auto" else args.input_format
+    if args.sync and output_format != FORMAT_DIR:
+        arg_parser.error("--sync requires a directory output")
+    if args.resume and not args.journal:
+        arg_parser.error("--resume requires --journal")
+    if args.journal and (args.stream or output_format != FORMAT_DIR):
+        arg_parser.error("--journal requires a directory output without --stream")
+    if args.watch and (args.input == "-" or output_format != FORMAT_DIR):
+        arg_parser.error("--watch requires an input file and a directory output")
+    if args.watch and (args.stream or args.journal):
+        arg_parser.error("--watch cannot be combined with --stream or --journal")
+
+    if args.input != "-" and not os.path.isfile(args.input):
+        print(Translations.get("cli_input_not_found", path=args.input), file=sys.stderr)
+        return 2
+
+    reporter = CliReporter(verbose=args.verbose)
+    started = time.perf_counter()
+    try:
+        registry = (TemplateRegistry.load(args.templates, args.allow_copy_outside)
+                    if args.templates else None)
+        # "# @copy" tương đối tính từ thư mục của tệp cây (hoặc thư mục hiện tại với stdin)
+        base_dir = os.path.dirname(os.path.abspath(args.input)) if args.input != "-" else None
+        contents = ContentResolver(registry, base_dir, args.allow_copy_outside)
+        cache = None if no_cache(args) else TreeCache(args.cache_dir, args.cache_size * 1024 * 1024)
+        with profiled(args.profile), reporter.report.phase("total"), open_input(args.input) as lines:
+            sink = open_sink(args.output, output_format)
+            try:
+                if args.watch:
+                    watch_tree(args, sink, reporter, contents, input_format)
+                elif args.stream:
+                    build_streaming(lines, sink, reporter, contents, input_format)
+                else:
+                    build_parallel(lines, sink, reporter, jobs=args.jobs, sync=args.sync,
+                                   remove_extras=args.prune, contents=contents, input_format=input_format,
+                                   journal_path=args.journal, resume=args.resume, check=not args.no_check,
+                                   cache=cache)
+            finally:
+                sink.close()
+                contents.close()
+    except (OSError, ValueError, TemplateError, JournalError) as e:
+        # ValueError: đầu vào JSON không hợp lệ
+        print(Translations.get("err_critical", error=e), file=sys.stderr)
+        return 1
+
+    print(Translations.get("cli_summary", created=reporter.created, errors=reporter.errors,
+                           seconds=time.perf_counter() - started))
+    if args.stats:
+        for line in format_report(reporter.report.as_dict(), Translations):
+            print(line)
+    if args.report:
+        reporter.report.write_json(args.report)
+    return 1 if reporter.errors else 0
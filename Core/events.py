@@ -0,0 +1,175 @@
+# Core/events.py
+# Các mục nhật ký dùng chung giữa worker, giao diện và tệp nhật ký; không phụ thuộc Qt.
+#
+# Một mục là bộ (mức độ, phần trăm, mã sự kiện, chỉ số nút, chi tiết). Worker chỉ
+# tạo các bộ này; chuỗi đã dịch được dựng bởi EventRenderer khi một hàng thực sự
+# được hiển thị hoặc xuất ra tệp, theo ngôn ngữ đang chọn lúc đó.
+import json
+import os
+
+from .templates import TemplateError
+
+SEVERITY_INFO = 0
+SEVERITY_WARNING = 1
+SEVERITY_ERROR = 2
+
+SEVERITY_TAGS = {SEVERITY_INFO: "INFO", SEVERITY_WARNING: "WARN", SEVERITY_ERROR: "ERROR"}
+_SEVERITY_BY_TAG = {tag: severity for severity, tag in SEVERITY_TAGS.items()}
+
+# Mã sự kiện; chỉ số trong EVENT_KEYS là khóa dịch tương ứng
+EVENT_TEXT = 0
+EVENT_START = 1
+EVENT_FOLDER_CREATED = 2
+EVENT_FILE_CREATED = 3
+EVENT_DONE = 4
+EVENT_STOPPED = 5
+EVENT_INDENT = 6
+EVENT_SYNC_SUMMARY = 7
+EVENT_CONFLICT = 8
+EVENT_EXTRA = 9
+EVENT_REMOVED = 10
+EVENT_ERR_PERMISSION = 11
+EVENT_ERR_OS = 12
+EVENT_ERR_TEMPLATE = 13
+EVENT_ERR_CRITICAL = 14
+EVENT_RESUMED = 15
+EVENT_ROLLED_BACK = 16
+EVENT_JOB_DONE = 17
+EVENT_JOB_FAILED = 18
+EVENT_JOB_CANCELLED = 19
+EVENT_QUEUE_STARTED = 20
+EVENT_CHECK_DUPLICATE = 21
+EVENT_CHECK_TYPE_CONFLICT = 22
+EVENT_CHECK_SANITIZED = 23
+EVENT_CHECK_CASE = 24
+EVENT_CHECK_NAME_LENGTH = 25
+EVENT_CHECK_PATH_LENGTH = 26
+EVENT_CHECK_FAILED = 27
+EVENT_CACHE_HIT = 28
+EVENT_RENAMED = 29
+EVENT_WATCH_STARTED = 30
+EVENT_WATCH_APPLIED = 31
+EVENT_MOVED = 32
+EVENT_WATCH_KEPT = 33
+EVENT_JOURNAL_UNAVAILABLE = 34
+
+EVENT_KEYS = (
+    None, "log_start_analysis", "log_folder_created", "log_file_created", "status_done",
+    "log_stopped_by_user", "warn_indent", "log_sync_summary", "log_conflict_entry", "log_extra_entry",
+    "log_removed", "err_permission", "err_os", "err_template", "err_critical", "log_resumed",
+    "log_rolled_back", "job_done_entry", "job_failed_entry", "job_cancelled_entry", "log_queue_started",
+    "check_duplicate", "check_type_conflict", "check_sanitized", "check_case", "check_name_length",
+    "check_path_length", "check_failed", "log_cache_hit", "log_renamed", "log_watch_started", "log_watch_applied",
+    "log_moved", "log_watch_kept", "log_journal_unavailable",
+)
+
+# Khóa dịch không nhắc số dòng cho các kiểm tra trước, dùng khi nút không có dòng
+# (line 0: đầu vào JSON được đọc cả khối); đường dẫn trong thông điệp vẫn chỉ ra nút
+EVENT_KEYS_NO_LINE = {
+    EVENT_CHECK_DUPLICATE: "check_duplicate_no_line",
+    EVENT_CHECK_TYPE_CONFLICT: "check_type_conflict_no_line",
+    EVENT_CHECK_SANITIZED: "check_sanitized_no_line",
+    EVENT_CHECK_CASE: "check_case_no_line",
+    EVENT_CHECK_NAME_LENGTH: "check_name_length_no_line",
+    EVENT_CHECK_PATH_LENGTH: "check_path_length_no_line",
+}
+
+# Nút không thuộc kế hoạch (sự kiện chung của cả lần chạy)
+NO_NODE = -1
+
+
+def text_entry(severity, message, value=None):
+    """Mục mang sẵn chuỗi đã dựng (báo cáo, thông điệp từ nơi khác)."""
+    return severity, value, EVENT_TEXT, NO_NODE, message
+
+
+def error_entry(node, error, path=None):
+    """Mục lỗi cho một nút từ ngoại lệ; chỉ giữ errno hoặc thông điệp, không dịch."""
+    if isinstance(error, PermissionError):
+        code, detail = EVENT_ERR_PERMISSION, None
+    elif isinstance(error, TemplateError):
+        code, detail = EVENT_ERR_TEMPLATE, str(error)
+    elif isinstance(error, OSError) and error.errno is not None:
+        code, detail = EVENT_ERR_OS, error.errno
+    else:
+        code, detail = EVENT_ERR_OS, str(error)
+    if node == NO_NODE and path is not None:
+        # Đường dẫn không có trong kế hoạch (ví dụ mục thừa khi dọn)
+        detail = {"path": path, "error": detail if not isinstance(detail, int) else os.strerror(detail)}
+    return SEVERITY_ERROR, None, code, node, detail
+
+
+class EventRenderer:
+    """Dựng chuỗi hiển thị cho các mục có cấu trúc, dùng bảng dịch hiện tại.
+
+    plan cung cấp tên và đường dẫn của nút; output_path là thư mục gốc của các
+    đường dẫn trong thông điệp lỗi.
+    """
+
+    def __init__(self, translations, plan=None, output_path=None):
+        self.translations = translations
+        self.plan = plan
+        self.output_path = output_path
+
+    def message(self, entry):
+        _, _, code, node, detail = entry
+        if code == EVENT_TEXT:
+            return detail
+        fields = dict(detail) if isinstance(detail, dict) else {}
+        if isinstance(detail, int):
+            fields["error"] = os.strerror(detail)
+        elif isinstance(detail, str):
+            fields["error"] = detail
+        if node != NO_NODE and self.plan is not None:
+            fields["name"] = self.plan.names[node]
+            rel_path = self.plan.rel_path(node)
+            fields["path"] = os.path.join(self.output_path, rel_path) if self.output_path else rel_path
+        if fields.get("line") == 0 and code in EVENT_KEYS_NO_LINE:
+            return self.translations.get(EVENT_KEYS_NO_LINE[code], **fields)
+        return self.translations.get(EVENT_KEYS[code], **fields)
+
+    def text(self, entry):
+        """Chuỗi hiển thị của một mục; phần trăm None thì bỏ qua."""
+        message = self.message(entry)
+        value = entry[1]
+        if value is None:
+            return message
+        return f"[{value}%] {message}"
+
+
+class LogFileWriter:
+    """Ghi toàn bộ nhật ký của một lần chạy ra tệp, theo lô, với bộ đệm lớn.
+
+    Mỗi dòng là một mục có cấu trúc (thẻ mức độ, phần trăm, mã, nút, chi tiết
+    JSON), nên worker không phải dịch; read_entries() đọc lại để dựng khi xuất.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8", buffering=1 << 16)
+
+    def write_entries(self, entries):
+        self._file.write("".join(
+            f"{SEVERITY_TAGS[severity]}\t{'' if value is None else value}\t{code}\t{node}\t"
+            f"{'' if detail is None else json.dumps(detail, ensure_ascii=False)}\n"
+            for severity, value, code, node, detail in entries))
+
+    def close(self):
+        self._file.close()
+
+
+def read_entries(path):
+    """Đọc lại các mục do LogFileWriter ghi."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            tag, value, code, node, detail = line.rstrip("\n").split("\t", 4)
+            yield (_SEVERITY_BY_TAG[tag], int(value) if value else None, int(code), int(node),
+                   json.loads(detail) if detail else None)
+
+
+def write_text_log(path, entries, renderer):
+    """Xuất nhật ký đã dịch (thẻ mức độ + chuỗi hiển thị) ra tệp văn bản."""
+    with open(path, "w", encoding="utf-8", buffering=1 << 16) as f:
+        text = renderer.text
+        for entry in entries:
+            f.write(f"{SEVERITY_TAGS[entry[0]]}\t{text(entry)}\n")
@@ -0,0 +1,248 @@
+# Core/formats.py
+# Các định dạng đầu vào mà TreeParser đọc được. Mỗi định dạng dòng chỉ cần tách
+# một dòng thành (độ dài tiền tố, độ dài thụt lề đầu, phần tên); phần còn lại
+# (làm sạch tên, ngăn xếp cấp, cảnh báo) dùng chung một lượt tuyến tính trong
+# TreeParser. Định dạng được đoán từ SAMPLE_LINES dòng đầu tiên.
+import json
+import re
+
+# Số dòng đầu dùng để đoán định dạng và độ rộng thụt lề
+SAMPLE_LINES = 200
+
+# Tiền tố của `tree` (Unicode); giống hệt biểu thức cũ của TreeParser
+_BOX_PREFIX = r'[│├└─\s]*'
+# Thêm các nối ASCII của `tree --charset=ascii` và `tree /A` trên Windows:
+# "|-- ", "`-- ", "+---", "\---"; '+' hay '`' đứng riêng vẫn thuộc về tên
+_ASCII_PREFIX = r'(?:[│├└─\s]|[|+`\\]-{2,3}|\|(?=\s))*'
+_BOX_CONNECTOR_RE = re.compile(r'^[\s│]*[├└]─')
+_ASCII_CONNECTOR_RE = re.compile(r'^(?:[\s|]|\|   )*[|+`\\]-{2,3}')
+# Dòng tổng kết ở cuối đầu ra của `tree`
+_TREE_SUMMARY_RE = re.compile(r'^\d+ director(?:y|ies)(?:, \d+ files?)?$')
+_BULLET_RE = re.compile(r'^([ \t]*)(?:[-*+]|\d+[.)])\s+(.*)$')
+_PATH_RE = re.compile(r'^(?:\./)?[^\s│├└|`/][^/]*/.')
+
+_FORMATS = {}
+
+
+def register_format(cls):
+    """Đăng ký một lớp định dạng; thứ tự đăng ký quyết định khi hai điểm bằng nhau."""
+    _FORMATS[cls.name] = cls
+    return cls
+
+
+def format_names():
+    return tuple(_FORMATS)
+
+
+def detect_format(sample, name=None):
+    """Chọn và cấu hình định dạng từ các dòng mẫu (hoặc theo tên nếu đã chỉ định)."""
+    lines = [line.rstrip('\r\n') for line in sample
+             if line.strip() and not line.lstrip().startswith('```')]
+    if name is not None:
+        return _FORMATS[name].from_sample(lines)
+    best = max(_FORMATS.values(), key=lambda cls: cls.sniff(lines) if lines else 0.0)
+    return best.from_sample(lines)
+
+
+def _has_dir_markers(lines):
+    return any(line.rstrip().rstrip('`*').endswith('/') for line in lines)
+
+
+def _indent_width(widths, default=4):
+    """Độ rộng một cấp thụt lề: độ thụt lề dương nhỏ nhất trong mẫu.
+
+    Một dòng thụt lệch (6 khi mỗi cấp là 4) chỉ làm sai cấp của chính nó thay
+    vì làm hỏng độ rộng của cả tệp như khi lấy ước chung.
+    """
+    width = min((value for value in widths if value), default=0)
+    return width if 2 <= width <= 8 else default
+
+
+class InputFormat:
+    """Một định dạng dòng.
+
+    split(line) trả về (độ dài tiền tố, độ dài thụt lề đầu, phần tên) hoặc None
+    để bỏ qua dòng; cấp = độ dài tiền tố // width. explicit_dirs=False nghĩa là
+    thư mục không được đánh dấu bằng '/' và một mục trở thành thư mục khi có con.
+    """
+    name = None
+    # Mỗi dòng là một đường dẫn tương đối thay vì một mục có thụt lề
+    paths = False
+    # Cần toàn bộ văn bản (không phân tích từng dòng được)
+    whole_text = False
+
+    def __init__(self, width=4, explicit_dirs=True):
+        self.width = width
+        self.explicit_dirs = explicit_dirs
+
+    @classmethod
+    def sniff(cls, lines):
+        """Điểm 0..1 cho biết mẫu giống định dạng này đến đâu."""
+        return 0.0
+
+    @classmethod
+    def from_sample(cls, lines):
+        return cls(explicit_dirs=_has_dir_markers(lines))
+
+    def key(self):
+        return self.name, self.width, self.explicit_dirs
+
+    def split(self, line):
+        raise NotImplementedError
+
+
+@register_format
+class TreeFormat(InputFormat):
+    """Đầu ra của `tree` (Unicode hoặc ASCII) và cây vẽ tay theo cùng kiểu."""
+    name = "tree"
+
+    def __init__(self, width=4, explicit_dirs=True, ascii_connectors=False):
+        super().__init__(width, explicit_dirs)
+        self.ascii_connectors = ascii_connectors
+        self._line_re = re.compile(r'^(?P<prefix>' + (_ASCII_PREFIX if ascii_connectors else _BOX_PREFIX)
+                                   + r')(?P<name>.*)')
+
+    @classmethod
+    def sniff(cls, lines):
+        hits = sum(1 for line in lines if _BOX_CONNECTOR_RE.match(line) or _ASCII_CONNECTOR_RE.match(line))
+        return hits / len(lines)
+
+    @classmethod
+    def from_sample(cls, lines):
+        ascii_connectors = any(_ASCII_CONNECTOR_RE.match(line) for line in lines)
+        fmt = cls(explicit_dirs=_has_dir_markers(lines), ascii_connectors=ascii_connectors)
+        widths = []
+        for line in lines:
+            prefix = fmt._line_re.match(line).group('prefix')
+            widths.append(len(prefix) - (len(line) - len(line.lstrip())))
+        # Nối 3 ký tự ("├─ ") hay 2 ký tự vẫn được; còn lại giữ 4 như `tree`
+        width = _indent_width(widths)
+        fmt.width = width if width <= 4 else 4
+        return fmt
+
+    def key(self):
+        return super().key() + (self.ascii_connectors,)
+
+    def split(self, line):
+        match = self._line_re.match(line)
+        name = match.group('name').strip()
+        if name[:1].isdigit() and _TREE_SUMMARY_RE.match(name):
+            return None
+        return match.end('prefix'), len(line) - len(line.lstrip()), name
+
+
+@register_format
+class JsonFormat(InputFormat):
+    """Cây lồng nhau dạng JSON: object = thư mục, chuỗi = tệp có nội dung, null = tệp rỗng.
+
+    Mảng liệt kê tên tệp (chuỗi, thêm '/' cho thư mục) hoặc object con.
+    """
+    name = "json"
+    whole_text = True
+
+    @classmethod
+    def sniff(cls, lines):
+        return 1.0 if lines[0].lstrip()[:1] in ('{', '[') else 0.0
+
+    @classmethod
+    def from_sample(cls, lines):
+        return cls()
+
+    def split(self, line):
+        raise TypeError("JSON input must be parsed as a whole")
+
+    def entries(self, text):
+        """Sinh (độ sâu, tên, là thư mục, nội dung chữ hoặc None) theo thứ tự duyệt trước."""
+        stack = [iter(_json_children(json.loads(text)))]
+        while stack:
+            for name, child in stack[-1]:
+                nested = isinstance(child, (dict, list))
+                yield (len(stack) - 1, name.rstrip('/'), nested or name.endswith('/'),
+                       child if isinstance(child, str) else None)
+                if nested:
+                    stack.append(iter(_json_children(child)))
+                    break
+            else:
+                stack.pop()
+
+
+def _json_children(value):
+    if isinstance(value, dict):
+        return list(value.items())
+    children = []
+    if isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict):
+                children.extend(item.items())
+            elif isinstance(item, str):
+                children.append((item, None))
+    return children
+
+
+@register_format
+class MarkdownFormat(InputFormat):
+    """Danh sách markdown lồng nhau ("- ", "* ", "+ ", "1. "); các dòng khác bị bỏ qua."""
+    name = "markdown"
+
+    @classmethod
+    def sniff(cls, lines):
+        return sum(1 for line in lines if _BULLET_RE.match(line)) / len(lines)
+
+    @classmethod
+    def from_sample(cls, lines):
+        widths = []
+        for line in lines:
+            match = _BULLET_RE.match(line)
+            if match:
+                widths.append(len(match.group(1).expandtabs(4)))
+        return cls(_indent_width(widths, default=2), _has_dir_markers(lines))
+
+    def split(self, line):
+        match = _BULLET_RE.match(line)
+        if match is None:
+            return None
+        indent = len(match.group(1).expandtabs(self.width))
+        # `tên` hay **tên** trong markdown chỉ là định dạng chữ
+        return indent, indent, match.group(2).strip().strip('`*').strip()
+
+
+@register_format
+class PathListFormat(InputFormat):
+    """Mỗi dòng một đường dẫn tương đối (`find`, `git ls-files`...); thư mục cha được tạo ngầm."""
+    name = "paths"
+    paths = True
+
+    @classmethod
+    def sniff(cls, lines):
+        return sum(1 for line in lines if _PATH_RE.match(line)) / len(lines)
+
+    @classmethod
+    def from_sample(cls, lines):
+        return cls(explicit_dirs=False)
+
+    def split(self, line):
+        return 0, 0, line.strip()
+
+
+@register_format
+class IndentFormat(InputFormat):
+    """Dàn ý chỉ dùng thụt lề (khoảng trắng hoặc tab); độ rộng một cấp được tự đoán."""
+    name = "indent"
+
+    @classmethod
+    def sniff(cls, lines):
+        # Định dạng dự phòng: thắng khi không định dạng nào khác đạt điểm này
+        return 0.2
+
+    @classmethod
+    def from_sample(cls, lines):
+        indents = [line[:len(line) - len(line.lstrip())] for line in lines]
+        if any('\t' in indent for indent in indents) and not any(' ' in indent for indent in indents):
+            # Mỗi tab là một cấp
+            return cls(4, _has_dir_markers(lines))
+        return cls(_indent_width(len(indent.expandtabs(4)) for indent in indents), _has_dir_markers(lines))
+
+    def split(self, line):
+        stripped = line.lstrip()
+        indent = len(line[:len(line) - len(stripped)].expandtabs(self.width))
+        return indent, indent, stripped.strip()
@@ -0,0 +1,70 @@
+# Core/ingest.py
+# Đọc tệp cây rất lớn mà không nạp cả tệp vào bộ nhớ: tệp được ánh xạ (mmap)
+# và quét theo từng khối để tìm ranh giới dòng, rồi các dòng được đưa thẳng vào
+# TreeParser. Mỗi lúc chỉ có một khối (CHUNK_BYTES) ở dạng bytes và chuỗi, nên
+# bộ nhớ cho phần đầu vào không phụ thuộc kích thước tệp; chỉ ParsedTree (các
+# mảng gọn) lớn theo số nút.
+import mmap
+import os
+
+from .parser import TreeParser
+
+# Kích thước một khối quét; khối luôn được cắt ở ký tự xuống dòng
+CHUNK_BYTES = 4 * 1024 * 1024
+
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+class TreeFile:
+    """Tệp văn bản cây trên đĩa, đọc lại được nhiều lần (xem trước, dựng, băm cho TreeCache).
+
+    Lặp qua đối tượng cho các dòng không kèm '\\n', giống khi lặp một tệp mở ở
+    chế độ văn bản với utf-8-sig; byte UTF-8 hỏng được thay bằng U+FFFD. Tệp chỉ
+    được mở và ánh xạ trong lúc đang lặp.
+    """
+
+    def __init__(self, path, chunk_bytes=CHUNK_BYTES):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def chunks(self):
+        """Các khối bytes của tệp (đã bỏ BOM), mỗi khối kết thúc ở một ký tự xuống dòng."""
+        with open(self.path, "rb") as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Tệp rỗng không ánh xạ được
+                return
+            with mapped:
+                size = len(mapped)
+                pos = len(_UTF8_BOM) if mapped[:len(_UTF8_BOM)] == _UTF8_BOM else 0
+                while pos < size:
+                    end = pos + self.chunk_bytes
+                    if end < size:
+                        cut = mapped.rfind(b"\n", pos, end)
+                        if cut < 0:
+                            # Một dòng dài hơn cả khối: kéo dài tới hết dòng
+                            cut = mapped.find(b"\n", end)
+                        end = size if cut < 0 else cut + 1
+                    else:
+                        end = size
+                    yield mapped[pos:end]
+                    pos = end
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            # Khối được cắt ở '\n' nên không bao giờ tách đôi một ký tự UTF-8
+            lines = chunk.decode("utf-8", "replace").split("\n")
+            if chunk.endswith(b"\n"):
+                lines.pop()
+            yield from lines
+
+    def parse(self, input_format=None):
+        """Phân tích cả tệp thành ParsedTree, nạp từng dòng vào TreeParser."""
+        parser = TreeParser(input_format)
+        parser.feed(self)
+        return parser.close()
@@ -0,0 +1,89 @@
+# Core/job_view.py
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor
+
+from .jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING, JobState
+from .translations import Translations
+
+_STATUS_COLORS = {
+    JOB_DONE: QColor(120, 200, 150),
+    JOB_FAILED: QColor(240, 120, 130),
+    JOB_CANCELLED: QColor(150, 150, 165),
+}
+
+
+class JobListModel(QAbstractListModel):
+    """Danh sách việc của hàng đợi dựng, mỗi hàng là (BuildJob, JobState).
+
+    Trạng thái của các việc đang chạy là chính các JobState của JobQueue, nên
+    sau mỗi lần poll() chỉ cần refresh() để view vẽ lại; chuỗi trạng thái được
+    dựng theo ngôn ngữ hiện tại khi hàng được hiển thị.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = []
+        self._states = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._jobs)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self._jobs[index.row()]
+        state = self._states[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{job.label} → {job.output_path}: {status_text(state)}"
+        if role == Qt.ItemDataRole.ToolTipRole and state.status == JOB_FAILED:
+            return str(state.error)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return _STATUS_COLORS.get(state.status)
+        return None
+
+    def add_job(self, job):
+        row = len(self._jobs)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._jobs.append(job)
+        self._states.append(JobState())
+        self.endInsertRows()
+
+    def job(self, row):
+        return self._jobs[row]
+
+    def state(self, row):
+        return self._states[row]
+
+    def pending_rows(self):
+        return [row for row, state in enumerate(self._states) if state.status == JOB_PENDING]
+
+    def attach(self, rows, states):
+        """Gắn các JobState của một JobQueue vừa tạo vào những hàng nó chạy."""
+        for row, state in zip(rows, states):
+            self._states[row] = state
+        self.refresh()
+
+    def remove_finished(self):
+        self.beginResetModel()
+        keep = [i for i, state in enumerate(self._states) if not state.finished]
+        self._jobs = [self._jobs[i] for i in keep]
+        self._states = [self._states[i] for i in keep]
+        self.endResetModel()
+
+    def refresh(self):
+        rows = self.rowCount()
+        if rows:
+            self.dataChanged.emit(self.index(0), self.index(rows - 1),
+                                  [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ForegroundRole])
+
+
+def status_text(state):
+    if state.status == JOB_RUNNING:
+        return Translations.get("job_status_running", percent=state.percent, done=state.done, total=state.total)
+    if state.status == JOB_DONE:
+        return Translations.get("job_status_done", created=state.result["created"], errors=state.result["errors"])
+    if state.status == JOB_FAILED:
+        return Translations.get("job_status_failed", error=state.error)
+    if state.status == JOB_CANCELLED:
+        return Translations.get("job_status_cancelled")
+    return Translations.get("job_status_pending")
@@ -0,0 +1,240 @@
+# Core/jobs.py
+# Hàng đợi nhiều lần dựng (cây, đầu ra) chạy trên một pool tiến trình; không phụ thuộc Qt.
+#
+# Mỗi việc được phân tích, lập kế hoạch và tạo trọn vẹn trong một tiến trình con,
+# nên các việc không tranh nhau GIL. Tiến trình và trạng thái hủy của từng việc
+# nằm trong các mảng dùng chung: tiến trình con chỉ ghi một số nguyên, tiến trình
+# cha đọc lại khi poll(), không có thông điệp nào đi qua hàng đợi.
+import multiprocessing
+import os
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from .cache import TreeCache
+from .events import SEVERITY_ERROR
+from .ingest import TreeFile
+from .materializer import default_workers
+from .parser import TreeParser
+from .planner import BuildPlan
+from .sinks import FORMAT_DIR, open_sink
+from .templates import ContentResolver, TemplateRegistry
+from .validator import has_errors, target_limits, validate_tree
+
+JOB_PENDING = 0
+JOB_RUNNING = 1
+JOB_DONE = 2
+JOB_FAILED = 3
+JOB_CANCELLED = 4
+
+# Số mục tạo xong giữa hai lần cập nhật tiến trình dùng chung
+_PROGRESS_STEP = 256
+# Số lỗi đầu tiên của mỗi việc được gửi lại kèm kết quả
+_ERROR_SAMPLES = 20
+
+# Mảng dùng chung của tiến trình con, gán một lần bởi _init_worker
+_shared = None
+
+
+def default_processes():
+    return os.cpu_count() or 1
+
+
+class BuildJob:
+    """Một việc trong hàng đợi: văn bản cây và nơi dựng nó.
+
+    base_dir là thư mục gốc cho "# @copy" tương đối; templates_path là tệp JSON
+    của TemplateRegistry (tùy chọn). Với tree_path, tiến trình con tự đọc tệp
+    cây (xem Core/ingest.py) và tree_text có thể là None, nên văn bản lớn không
+    phải gửi qua pool. allow_copy_outside cho phép nguồn @copy nằm ngoài base_dir.
+    """
+
+    __slots__ = ("tree_text", "output_path", "output_format", "input_format", "templates_path", "base_dir",
+                 "label", "tree_path", "allow_copy_outside")
+
+    def __init__(self, tree_text, output_path, output_format=FORMAT_DIR, input_format=None,
+                 templates_path=None, base_dir=None, label=None, tree_path=None, allow_copy_outside=False):
+        self.tree_text = tree_text
+        self.tree_path = tree_path
+        self.output_path = output_path
+        self.output_format = output_format
+        self.input_format = input_format
+        self.templates_path = templates_path
+        self.base_dir = base_dir
+        self.label = label or os.path.basename(output_path.rstrip(os.sep)) or output_path
+        self.allow_copy_outside = allow_copy_outside
+
+
+class JobState:
+    """Trạng thái một việc như tiến trình cha thấy ở lần poll() gần nhất."""
+
+    __slots__ = ("status", "done", "total", "result", "error")
+
+    def __init__(self):
+        self.status = JOB_PENDING
+        self.done = 0
+        self.total = 0
+        # dict do _run_job trả về khi xong (kể cả khi bị hủy giữa chừng)
+        self.result = None
+        # Ngoại lệ của việc thất bại (đầu vào hỏng, không mở được đầu ra...)
+        self.error = None
+
+    @property
+    def percent(self):
+        return int(self.done * 100 / self.total) if self.total else 0
+
+    @property
+    def finished(self):
+        return self.status >= JOB_DONE
+
+
+def _init_worker(progress, totals, cancelled):
+    global _shared
+    _shared = (progress, totals, cancelled)
+
+
+def _run_job(index, job, threads, cache_dir=None):
+    """Chạy trong tiến trình con: phân tích, lập kế hoạch và tạo một việc.
+
+    cache_dir bật TreeCache dùng chung giữa các tiến trình: cây đã gặp được nạp
+    lại cùng kế hoạch của nó thay vì phân tích lại.
+    """
+    progress, totals, cancelled = _shared
+    started = time.perf_counter()
+    if cancelled[index]:
+        return {"created": 0, "errors": 0, "error_samples": [], "issues": [], "cancelled": True, "seconds": 0.0}
+    source = TreeFile(job.tree_path) if job.tree_path else job.tree_text
+    if cache_dir:
+        tree, plan, _ = TreeCache(cache_dir).parse(source, job.input_format)
+    else:
+        tree = source.parse(job.input_format) if job.tree_path else TreeParser.parse(source, job.input_format)
+        plan = None
+    # Mục nhật ký của kiểm tra trước; có lỗi thì việc kết thúc mà không tạo gì
+    limits = target_limits(job.output_path) if job.output_format == FORMAT_DIR else None
+    issues = validate_tree(tree, job.output_path, limits)
+    if has_errors(issues):
+        return {"created": 0, "errors": sum(1 for entry in issues if entry[0] == SEVERITY_ERROR),
+                "error_samples": [], "issues": issues, "cancelled": False,
+                "seconds": time.perf_counter() - started}
+    if plan is None:
+        plan = BuildPlan.compile(tree)
+    totals[index] = len(plan)
+    counters = [0, 0]
+    samples = []
+
+    def on_created(_op):
+        counters[0] += 1
+        if counters[0] % _PROGRESS_STEP == 0:
+            progress[index] = counters[0]
+
+    def on_error(_op, path, error):
+        counters[1] += 1
+        if len(samples) < _ERROR_SAMPLES:
+            samples.append((path, str(error)))
+
+    registry = TemplateRegistry.load(job.templates_path, job.allow_copy_outside) if job.templates_path else None
+    contents = ContentResolver(registry, job.base_dir, job.allow_copy_outside)
+    try:
+        sink = open_sink(job.output_path, job.output_format)
+        try:
+            sink.materializer(plan, max_workers=threads, on_created=on_created, on_error=on_error,
+                              is_cancelled=lambda: cancelled[index], contents=contents).run()
+        finally:
+            sink.close()
+    finally:
+        contents.close()
+    progress[index] = counters[0]
+    return {"created": counters[0], "errors": counters[1], "error_samples": samples, "issues": issues,
+            "cancelled": bool(cancelled[index]), "seconds": time.perf_counter() - started}
+
+
+class JobQueue:
+    """Chạy một loạt BuildJob trên tối đa processes tiến trình.
+
+    Mỗi việc dùng threads luồng tạo mục bên trong tiến trình của nó, nên tổng số
+    luồng I/O là processes * threads. Tiến trình con được khởi động bằng "spawn"
+    để không sao chép trạng thái của ứng dụng Qt đang chạy. start() không chặn;
+    gọi poll() định kỳ để cập nhật states. cache_dir là thư mục TreeCache dùng
+    chung cho mọi việc (None thì không đệm).
+    """
+
+    def __init__(self, jobs, processes=None, threads=None, cache_dir=None):
+        self.jobs = list(jobs)
+        self.processes = max(1, min(processes or default_processes(), len(self.jobs) or 1))
+        self.threads = threads or max(2, default_workers() // self.processes)
+        self.cache_dir = cache_dir
+        self.states = [JobState() for _ in self.jobs]
+        self._context = multiprocessing.get_context("spawn")
+        count = len(self.jobs)
+        # Không cần khóa: mỗi ô chỉ có một tiến trình ghi
+        self._progress = self._context.Array('q', count, lock=False)
+        self._totals = self._context.Array('q', count, lock=False)
+        self._cancelled = self._context.Array('b', count, lock=False)
+        self._executor = None
+        self._futures = []
+
+    def start(self):
+        self._executor = ProcessPoolExecutor(
+            self.processes, mp_context=self._context, initializer=_init_worker,
+            initargs=(self._progress, self._totals, self._cancelled))
+        self._futures = [self._executor.submit(_run_job, index, job, self.threads, self.cache_dir)
+                         for index, job in enumerate(self.jobs)]
+
+    def cancel(self, index):
+        """Hủy một việc: việc chưa chạy bị bỏ khỏi pool, việc đang chạy dừng ở nhóm kế tiếp."""
+        if self.states[index].finished:
+            return
+        self._cancelled[index] = 1
+        if self._futures and self._futures[index].cancel():
+            self.states[index].status = JOB_CANCELLED
+
+    def cancel_all(self):
+        for index in range(len(self.jobs)):
+            self.cancel(index)
+
+    def poll(self):
+        """Cập nhật states từ các mảng dùng chung và các future; trả về True khi mọi việc đã xong."""
+        finished = True
+        for index, (state, future) in enumerate(zip(self.states, self._futures)):
+            if state.finished:
+                continue
+            if future.done():
+                self._collect(state, future)
+                state.done = self._progress[index]
+                state.total = self._totals[index]
+                continue
+            finished = False
+            state.done = self._progress[index]
+            state.total = self._totals[index]
+            if state.total:
+                state.status = JOB_RUNNING
+        return finished
+
+    def _collect(self, state, future):
+        try:
+            result = future.result()
+        except CancelledError:
+            state.status = JOB_CANCELLED
+            return
+        except Exception as e:
+            state.status = JOB_FAILED
+            state.error = e
+            return
+        state.result = result
+        state.status = JOB_CANCELLED if result["cancelled"] else JOB_DONE
+
+    def wait(self, interval=0.2, on_poll=None):
+        """Chặn tới khi mọi việc xong; on_poll(queue) được gọi sau mỗi lần poll."""
+        while True:
+            finished = self.poll()
+            if on_poll:
+                on_poll(self)
+            if finished:
+                return
+            time.sleep(interval)
+
+    def shutdown(self, cancel=False):
+        if cancel:
+            self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=cancel)
+            self._executor = None
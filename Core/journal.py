@@ -0,0 +1,350 @@
+# Core/journal.py
+# Nhật ký thao tác của một lần dựng vào thư mục, để tiếp tục bản dựng dở hoặc
+# hoàn tác đúng những gì lần dựng đó đã tạo.
+#
+# Bố cục tệp:
+#   dòng "TBJ1", dòng tiêu đề JSON,
+#   bản sao gọn của kế hoạch (tên nối bằng '\0', mảng cha int32, bitmap thư mục),
+#   rồi các bản ghi int32 nối tiếp: op đã tạo mới, hoặc ~op nếu mục đã có từ trước.
+# Trước mỗi cấp, một khối ý định [INTENT_MARKER, số op, giây kể từ "started", op...]
+# được ghi xuống đĩa trước khi chạm vào bất kỳ mục nào của cấp đó. Bản ghi kết quả
+# được gom trong bộ nhớ và ghi bằng một lần os.write cho mỗi lô; nếu tiến trình
+# chết giữa chừng, op có ý định mà chưa có kết quả được coi là do lần dựng tạo khi
+# mục đó tồn tại và có ctime không sớm hơn khối ý định (xem JournalState.interrupted).
+import hashlib
+import json
+import os
+import threading
+import time
+from array import array
+
+from .parser import ROOT
+from .planner import SUPPORTS_DIR_FD
+
+JOURNAL_MAGIC = b"TBJ1\n"
+JOURNAL_VERSION = 2
+# Phiên bản 1 không có khối ý định nhưng vẫn đọc được
+READABLE_VERSIONS = (1, 2)
+# Mở đầu một khối ý định; không trùng với op hay ~op của kế hoạch dưới 2^31 - 1 op
+INTENT_MARKER = -(1 << 31)
+# Dung sai khi so ctime với thời điểm ghi ý định (FAT làm tròn thời gian tới 2 giây)
+INTENT_SLACK_SECONDS = 2
+# Số bản ghi gom lại trước mỗi lần ghi (4 byte mỗi bản ghi)
+JOURNAL_BATCH = 1 << 16
+JOURNAL_EXTENSION = ".tbjournal"
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+
+class JournalError(Exception):
+    """Tệp nhật ký hỏng hoặc không khớp với cây đang dựng."""
+
+
+def default_journal_path(output_path):
+    """Nhật ký nằm cạnh thư mục đầu ra, không lẫn vào bên trong nó (trừ khi đầu ra là gốc ổ đĩa)."""
+    path = os.path.abspath(output_path)
+    if os.path.dirname(path) == path:
+        return os.path.join(path, "tree_builder" + JOURNAL_EXTENSION)
+    return path + JOURNAL_EXTENSION
+
+
+def _plan_blob(plan):
+    names = "\0".join(plan.names).encode("utf-8", "surrogateescape")
+    return names, plan.parents.tobytes(), bytes(plan.dir_bits)
+
+
+def _fingerprint(blob):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in blob:
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class BuildJournal:
+    """Ghi nhật ký cho Materializer.
+
+    record_intents/record_results/flush được gọi trên luồng đã gọi run();
+    record_existed được gọi từ các luồng tạo mục. Mỗi lần ghi giữ khóa nên các
+    khối không xen vào nhau.
+    """
+
+    def __init__(self, path, fd, started, batch=JOURNAL_BATCH):
+        self.path = path
+        self._fd = fd
+        self.started = started
+        self.batch = batch
+        self._records = array('i')
+        self._lock = threading.Lock()
+        # Cho RunReport: số bản ghi, số byte và thời gian nằm trong os.write
+        self.records = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+
+    @classmethod
+    def create(cls, path, plan, output_path, batch=JOURNAL_BATCH):
+        """Bắt đầu nhật ký mới (ghi đè nhật ký cũ) cho một lần dựng plan vào output_path."""
+        blob = _plan_blob(plan)
+        started = int(time.time())
+        header = {
+            "version": JOURNAL_VERSION,
+            "output_path": os.path.abspath(output_path),
+            # Thư mục đầu ra do lần dựng này tạo thì hoàn tác cũng xóa nó
+            "created_root": not os.path.isdir(output_path),
+            "fingerprint": _fingerprint(blob),
+            "sizes": [len(part) for part in blob],
+            "started": started,
+        }
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0), 0o666)
+        journal = cls(path, fd, started, batch)
+        journal._write(JOURNAL_MAGIC + json.dumps(header).encode("utf-8") + b"\n" + b"".join(blob))
+        return journal
+
+    @classmethod
+    def resume(cls, path, plan, batch=JOURNAL_BATCH):
+        """Mở lại nhật ký của bản dựng dở để ghi tiếp; trả về (nhật ký, tập op đã xong)."""
+        state = load_journal(path)
+        if state.fingerprint != _fingerprint(_plan_blob(plan)):
+            raise JournalError(f"{path}: journal was written for a different tree")
+        fd = os.open(path, os.O_WRONLY | getattr(os, "O_CLOEXEC", 0))
+        # Bỏ phần bản ghi bị cắt dở (nếu tiến trình chết giữa một lần ghi)
+        os.ftruncate(fd, state.records_end)
+        os.lseek(fd, 0, os.SEEK_END)
+        journal = cls(path, fd, state.started, batch)
+        done = {op if op >= 0 else ~op for op in state.records}
+        # Mục dở dang của lần chết trước được ghi nhận là đã tạo để hoàn tác vẫn xóa chúng
+        interrupted = state.interrupted()
+        if interrupted:
+            journal._records.extend(interrupted)
+            journal.flush()
+            done.update(interrupted)
+        return journal, done
+
+    def record_intents(self, ops):
+        """Ghi xuống đĩa các op sắp được thực thi, trước khi tạo bất kỳ op nào trong số đó."""
+        if not ops:
+            return
+        self.flush()
+        block = array('i', (INTENT_MARKER, len(ops), int(time.time()) - self.started))
+        block.extend(ops)
+        self._write(block.tobytes())
+
+    def record_existed(self, op):
+        """Ghi ngay xuống đĩa rằng op đã có từ trước, trước khi mở lại (cắt, ghi) mục đó.
+
+        Mở lại làm đổi ctime; nếu tiến trình chết trước khi record_results ghi
+        kết quả của nhóm, interrupted() sẽ tưởng mục do lần dựng tạo và hoàn tác
+        xóa mất nó. Bản ghi ~op lặp lại sau đó trong record_results không hại gì.
+        """
+        self._write(array('i', (~op,)).tobytes())
+
+    def record_results(self, results, existed):
+        """Ghi các op thành công của một nhóm; existed là các op đã có trên đĩa từ trước."""
+        records = self._records
+        if existed:
+            existed = set(existed)
+            for op, error in results:
+                if error is None:
+                    records.append(~op if op in existed else op)
+        else:
+            for op, error in results:
+                if error is None:
+                    records.append(op)
+        if len(records) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self._records:
+            return
+        records, self._records = self._records, array('i')
+        self.records += len(records)
+        self._write(records.tobytes())
+
+    def _write(self, data):
+        with self._lock:
+            started = time.perf_counter()
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._fd, view):]
+            self.bytes_written += len(data)
+            self.write_seconds += time.perf_counter() - started
+
+    def close(self):
+        if self._fd is None:
+            return
+        try:
+            self.flush()
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class JournalState:
+    """Nội dung đã đọc của một tệp nhật ký: kế hoạch gọn và các bản ghi."""
+
+    def __init__(self, header, names, parents, dir_bits, records, intents, records_end):
+        self.output_path = header["output_path"]
+        self.created_root = header["created_root"]
+        self.fingerprint = header["fingerprint"]
+        self.started = header.get("started", 0)
+        self.names = names
+        self.parents = parents
+        self.dir_bits = dir_bits
+        self.records = records
+        # op -> thời điểm (giây) của khối ý định cuối cùng chứa op
+        self.intents = intents
+        self.records_end = records_end
+        self._dir_paths = {ROOT: ""}
+
+    def is_dir(self, op):
+        return bool(self.dir_bits[op >> 3] & (1 << (op & 7)))
+
+    def dir_path(self, op):
+        path = self._dir_paths.get(op)
+        if path is None:
+            path = self._dir_paths[op] = os.path.join(self.dir_path(self.parents[op]), self.names[op])
+        return path
+
+    def path(self, op):
+        if self.is_dir(op):
+            return os.path.join(self.output_path, self.dir_path(op))
+        return os.path.join(self.output_path, self.dir_path(self.parents[op]), self.names[op])
+
+    def interrupted(self):
+        """Các op có ý định nhưng chưa có kết quả mà trên đĩa trông như do lần dựng tạo.
+
+        Mục có ctime sớm hơn khối ý định đã có từ trước và không được tính; mục
+        chưa tồn tại thì chưa được tạo. Trả về theo thứ tự op, tức cha trước con.
+        """
+        if not self.intents:
+            return []
+        finished = {op if op >= 0 else ~op for op in self.records}
+        interrupted = []
+        for op, stamp in self.intents.items():
+            if op in finished:
+                continue
+            try:
+                ctime = os.lstat(self.path(op)).st_ctime_ns
+            except OSError:
+                continue
+            if ctime >= (stamp - INTENT_SLACK_SECONDS) * 1_000_000_000:
+                interrupted.append(op)
+        interrupted.sort()
+        return interrupted
+
+    def created(self):
+        """Các op do lần dựng này tạo mới, theo thứ tự đã tạo (kể cả các op dở dang)."""
+        return [op for op in self.records if op >= 0] + self.interrupted()
+
+
+def load_journal(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(JOURNAL_MAGIC):
+        raise JournalError(f"{path}: not a build journal")
+    header_end = data.index(b"\n", len(JOURNAL_MAGIC)) + 1
+    try:
+        header = json.loads(data[len(JOURNAL_MAGIC):header_end])
+    except ValueError as e:
+        raise JournalError(f"{path}: {e}") from e
+    if header.get("version") not in READABLE_VERSIONS:
+        raise JournalError(f"{path}: unsupported journal version {header.get('version')}")
+    offset = header_end
+    parts = []
+    for size in header["sizes"]:
+        parts.append(data[offset:offset + size])
+        offset += size
+    if offset > len(data):
+        raise JournalError(f"{path}: truncated journal header")
+    names_blob, parents_blob, dir_bits = parts
+    names = names_blob.decode("utf-8", "surrogateescape").split("\0") if names_blob else []
+    parents = array('i')
+    parents.frombytes(parents_blob)
+    raw = array('i')
+    raw.frombytes(data[offset:offset + (len(data) - offset) // raw.itemsize * raw.itemsize])
+    records, intents, used = _split_records(raw, header.get("started", 0))
+    return JournalState(header, names, parents, bytearray(dir_bits), records, intents,
+                        offset + used * raw.itemsize)
+
+
+def _split_records(raw, started):
+    """Tách bản ghi kết quả khỏi các khối ý định; khối bị cắt dở ở cuối bị bỏ."""
+    records = array('i')
+    intents = {}
+    start = 0
+    size = len(raw)
+    while start < size:
+        try:
+            marker = raw.index(INTENT_MARKER, start)
+        except ValueError:
+            marker = size
+        records.extend(raw[start:marker])
+        if marker == size or marker + 3 > size:
+            start = marker
+            break
+        count = raw[marker + 1]
+        end = marker + 3 + count
+        if end > size:
+            break
+        stamp = started + raw[marker + 2]
+        intents.update(dict.fromkeys(raw[marker + 3:end], stamp))
+        start = end
+    return records, intents, start
+
+
+def rollback(path, on_removed=None, on_error=None, remove_journal=True):
+    """Xóa những gì lần dựng ghi trong nhật ký đã tạo, theo thứ tự ngược lại.
+
+    Con luôn được ghi sau cha nên đi ngược bảo đảm thư mục đã rỗng khi tới lượt
+    nó; các op liên tiếp cùng cha dùng chung một fd của thư mục cha. Mục đã có
+    từ trước lần dựng không bị đụng tới. Trả về số mục đã xóa.
+    """
+    state = load_journal(path)
+    created = state.created()
+    created.reverse()
+    output_path = state.output_path
+    removed = 0
+    errors = 0
+    start = 0
+    while start < len(created):
+        parent = state.parents[created[start]]
+        end = start + 1
+        while end < len(created) and state.parents[created[end]] == parent:
+            end += 1
+        parent_path = os.path.join(output_path, state.dir_path(parent))
+        dir_fd = None
+        if SUPPORTS_DIR_FD:
+            try:
+                dir_fd = os.open(parent_path, _DIR_FLAGS)
+            except OSError:
+                dir_fd = None
+        try:
+            for op in created[start:end]:
+                name = state.names[op]
+                target = name if dir_fd is not None else os.path.join(parent_path, name)
+                try:
+                    if state.is_dir(op):
+                        os.rmdir(target, dir_fd=dir_fd)
+                    else:
+                        os.unlink(target, dir_fd=dir_fd)
+                    removed += 1
+                    if on_removed:
+                        on_removed(os.path.join(parent_path, name))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    errors += 1
+                    if on_error:
+                        on_error(os.path.join(parent_path, name), e)
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+        start = end
+    if state.created_root and not errors:
+        try:
+            os.rmdir(output_path)
+        except OSError:
+            pass
+    if remove_journal and not errors:
+        os.remove(path)
+    return removed
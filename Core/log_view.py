@@ -0,0 +1,105 @@
+# Core/log_view.py
+from collections import deque
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor
+
+from .events import SEVERITY_INFO, SEVERITY_WARNING, SEVERITY_ERROR, EventRenderer
+from .translations import Translations
+
+# Số dòng nhật ký giữ trong bộ nhớ; dòng cũ hơn chỉ còn trong tệp nhật ký đầy đủ
+LOG_CAPACITY = 20000
+
+_SEVERITY_COLORS = {
+    SEVERITY_WARNING: QColor(235, 200, 120),
+    SEVERITY_ERROR: QColor(240, 120, 130),
+}
+
+
+class LogListModel(QAbstractListModel):
+    """Mô hình danh sách trên một bộ đệm vòng có sức chứa cố định.
+
+    Chỉ lưu các mục có cấu trúc (xem Core/events.py); chuỗi đã dịch được
+    renderer dựng khi view hỏi tới một hàng đang hiển thị, nên chi phí không
+    tăng theo số dòng mà bản dựng sinh ra và đổi ngôn ngữ chỉ cần vẽ lại.
+    """
+
+    def __init__(self, capacity=LOG_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.renderer = EventRenderer(Translations)
+        self._entries = deque(maxlen=capacity)
+        self._min_severity = SEVERITY_INFO
+        # Chỉ số trong _entries của các hàng đang hiển thị khi có lọc; None = không lọc
+        self._visible = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._entries) if self._visible is None else len(self._visible)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        entry = self._entries[row if self._visible is None else self._visible[row]]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.renderer.text(entry)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return _SEVERITY_COLORS.get(entry[0])
+        return None
+
+    def append_entries(self, entries):
+        if not entries:
+            return
+        if self._visible is not None:
+            # Có lọc: dựng lại chỉ mục, chi phí bị chặn bởi sức chứa của bộ đệm
+            self.beginResetModel()
+            self._entries.extend(entries)
+            self._rebuild_visible()
+            self.endResetModel()
+            return
+        capacity = self._entries.maxlen
+        entries = list(entries)[-capacity:]
+        overflow = len(self._entries) + len(entries) - capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._entries.popleft()
+            self.endRemoveRows()
+        start = len(self._entries)
+        self.beginInsertRows(QModelIndex(), start, start + len(entries) - 1)
+        self._entries.extend(entries)
+        self.endInsertRows()
+
+    def set_renderer(self, renderer):
+        self.renderer = renderer
+        self.refresh()
+
+    def refresh(self):
+        """Báo mọi hàng đổi chữ; view chỉ hỏi lại các hàng đang hiển thị."""
+        rows = self.rowCount()
+        if rows:
+            self.dataChanged.emit(self.index(0), self.index(rows - 1), [Qt.ItemDataRole.DisplayRole])
+
+    def clear(self):
+        self.beginResetModel()
+        self._entries.clear()
+        if self._visible is not None:
+            self._visible = []
+        self.endResetModel()
+
+    def set_min_severity(self, severity):
+        self.beginResetModel()
+        self._min_severity = severity
+        self._rebuild_visible()
+        self.endResetModel()
+
+    def _rebuild_visible(self):
+        if self._min_severity == SEVERITY_INFO:
+            self._visible = None
+        else:
+            minimum = self._min_severity
+            self._visible = [i for i, entry in enumerate(self._entries) if entry[0] >= minimum]
+
+    def entries(self):
+        return list(self._entries)
@@ -1,34 +1,150 @@
 # Core/main_app.py
 import sys
 import os
+import tempfile
+import time
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QFileDialog, QMessageBox, QLineEdit, QPlainTextEdit, QProgressBar,
-    QGroupBox, QComboBox
+    QApplication, QGroupBox, QComboBox, QCheckBox, QListView, QTreeView, QSpinBox
 )
-from PySide6.QtCore import Qt, Signal, Slot, QThread, QPoint, QRect, QPropertyAnimation, QEasingCurve
-from PySide6.QtGui import QIcon, QPixmap, QColor, QFont
+from PySide6.QtCore import Qt, Signal, Slot, QThread, QTimer, QPropertyAnimation, QEasingCurve
+from PySide6.QtGui import QIcon, QFont, QGuiApplication
 
-from .worker import StructureBuilderWorker
+from .background import BackgroundRenderer
+from .cache import TreeCache, cache_disabled, default_cache_dir
+from .worker import RollbackWorker, StructureBuilderWorker, TreeDumpWorker, WatchWorker
+from .journal import default_journal_path
 from .translations import Translations
+from .report import format_report
+from .events import (SEVERITY_INFO, SEVERITY_WARNING, SEVERITY_ERROR, EVENT_ERR_OS, EVENT_JOB_CANCELLED,
+                     EVENT_JOB_DONE, EVENT_JOB_FAILED, EVENT_QUEUE_STARTED, NO_NODE, EventRenderer,
+                     read_entries, text_entry, write_text_log)
+from .jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, BuildJob, JobQueue, default_processes
+from .job_view import JobListModel
+from .log_view import LogListModel
+from .preview import PreviewParseWorker, TreePreviewModel
+from .sinks import (FORMAT_DIR, FORMAT_ZIP, FORMAT_TAR, FORMAT_TAR_GZ, FORMAT_EXTENSIONS,
+                    detect_format, strip_archive_extension)
 
 ASSETS_DIR_NAME = "assets"
+# Định dạng đầu ra chọn được trong nhóm "Thư mục đầu ra"
+OUTPUT_FORMAT_CHOICES = (FORMAT_DIR, FORMAT_ZIP, FORMAT_TAR, FORMAT_TAR_GZ)
+# Thời gian chờ sau lần gõ phím cuối trước khi phân tích lại cho khung xem trước (ms)
+PREVIEW_DEBOUNCE_MS = 300
+# Số dòng cảnh báo thụt lề tối đa liệt kê trong khung xem trước
+PREVIEW_MAX_WARNING_LINES = 10
+# Chu kỳ đọc tiến trình của hàng đợi dựng (ms)
+QUEUE_POLL_MS = 200
+
+# Họ phông của giao diện theo thứ tự dự phòng từng ký tự: chữ Latinh và tiếng Việt
+# dùng Segoe UI, ký tự Nhật không có trong Segoe UI được lấy từ Meiryo, nên đổi
+# ngôn ngữ không phải đổi phông
+UI_FONT_FAMILIES = ["Segoe UI", "Meiryo", "Arial"]
+
+APP_STYLESHEET = """
+    QMainWindow { background: transparent; }
+    QWidget#mainContainer { background-color: rgb(10, 12, 28); border-radius: 12px; }
+    QGroupBox {
+        background-color: rgba(25,30,55,0.6); border: 1px solid rgba(140, 150, 190, 0.5);
+        border-radius: 9px; margin-top: 12px; padding: 15px; font-weight: bold;
+        color: rgb(130, 170, 255);
+    }
+    QGroupBox::title { subcontrol-origin: margin; subcontrol-position: top left; padding: 0 8px; margin-left: 10px; }
+    QLabel { color: rgb(155, 160, 180); font-size: 9pt; }
+    QCheckBox { color: rgb(155, 160, 180); font-size: 9pt; font-weight: normal; }
+    QWidget#customTitleBar {
+        background-color: rgba(15, 18, 35, 0.95);
+        border-top-left-radius: 12px; border-top-right-radius: 12px;
+        border-bottom: 1px solid rgba(200, 205, 220, 0.1);
+    }
+    QWidget#customTitleBar QLabel { color: rgb(225, 230, 245); font-size: 11pt; font-weight: bold; }
+    QWidget#customTitleBar > QLabel:first-child { color: rgb(130, 170, 255); font-size: 14pt; padding-bottom: 3px; }
+    QWidget#customTitleBar QPushButton {
+        background-color: transparent; border: none; border-radius: 8px;
+        color: rgb(155, 160, 180); font-family: "Segoe Fluent Icons", "Segoe MDL2 Assets"; font-size: 10pt;
+        min-width: 36px; max-width: 36px; min-height: 30px; max-height: 30px;
+    }
+    QWidget#customTitleBar QPushButton:hover { background-color: rgb(85, 100, 145); color: white; }
+    QWidget#customTitleBar QPushButton#btn_close:hover { background-color: rgb(220, 90, 100); color: white; }
+    QComboBox {
+        background-color: rgba(12, 15, 32, 0.9); color: rgb(225, 230, 245);
+        border: 1px solid rgba(140, 150, 190, 0.5); border-radius: 7px;
+        padding: 4px 8px; min-width: 100px;
+    }
+    QComboBox:hover { border-color: rgb(130, 170, 255); }
+    QComboBox::drop-down { border: none; }
+    QComboBox QAbstractItemView {
+        background-color: rgb(25, 30, 55); border: 1px solid rgb(130, 170, 255);
+        selection-background-color: rgb(130, 170, 255); selection-color: black;
+    }
+    QLineEdit, QPlainTextEdit, QListView, QTreeView, QSpinBox {
+        background-color: rgba(12, 15, 32, 0.9); border: 1px solid rgba(140, 150, 190, 0.5);
+        border-radius: 8px; padding: 10px; color: rgb(225, 230, 245); font-size: 10pt;
+    }
+    QLineEdit:focus, QPlainTextEdit:focus, QListView:focus, QTreeView:focus { border: 1.5px solid rgb(160, 190, 255); }
+    QPushButton {
+        background-color: rgb(65, 75, 115); border: none; border-radius: 8px;
+        padding: 10px 18px; font-weight: bold; color: rgb(225, 230, 245);
+    }
+    QPushButton:hover { background-color: rgb(85, 100, 145); }
+    QPushButton:disabled { background-color: #555; color: #888; }
+    QPushButton#runButton {
+        background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 rgb(60, 110, 220), stop:1 rgb(130, 170, 255));
+        font-size: 12pt; color: white;
+    }
+    QPushButton#runButton:hover {
+        background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 rgb(80, 130, 240), stop:1 rgb(150, 190, 255));
+    }
+    QProgressBar {
+        border: 1px solid rgba(140, 150, 190, 0.5); border-radius: 7px;
+        background-color: rgba(12, 15, 32, 0.9); height: 12px;
+    }
+    QProgressBar::chunk {
+        background-color: rgb(80, 180, 120); border-radius: 6px; margin: 1px;
+    }
+    QScrollBar:vertical {
+        border: none; background: rgba(0,0,0,0.2); width: 12px;
+        margin: 15px 0 15px 0; border-radius: 6px;
+    }
+    QScrollBar::handle:vertical {
+        background: rgb(65, 75, 115); min-height: 30px; border-radius: 5px;
+    }
+    QScrollBar::handle:vertical:hover { background: rgb(85, 100, 145); }
+"""
 
 class TreeBuilderApp(QMainWindow):
+    # Các đoạn dòng đã đổi (vị trí, số dòng cũ, dòng mới) gửi sang luồng xem trước
+    preview_requested = Signal(list)
+    # Tệp cây cần phân tích cho khung xem trước (chế độ "mở tệp cây")
+    preview_file_requested = Signal(str)
+
     def __init__(self):
         super().__init__()
         self.worker = None
         self.thread = None
+        self.dump_worker = None
+        self.dump_thread = None
+        # Hàng đợi dựng đang chạy và các chỉ số việc của nó đã ghi vào nhật ký
+        self.job_queue = None
+        self._reported_jobs = set()
         
+        # Thời gian luồng giao diện dành cho các slot nhận tín hiệu của worker
+        self._gui_signal_seconds = 0.0
+        # Mục nhật ký mới nhất của lần chạy, dựng lại thành dòng trạng thái khi đổi ngôn ngữ
+        self._status_entry = None
+
         # Thêm thuộc tính để lưu animation
         self.anim_open = None
 
         Translations.set_language(Translations.LANG_VI)
 
+        self._apply_font()
         self._setup_window()
         self._create_widgets()
         self._create_layout()
         self._connect_signals()
+        self._setup_preview()
         
         self.retranslate_ui()
         self._apply_styles()
@@ -50,11 +166,12 @@ class TreeBuilderApp(QMainWindow):
         self.setCentralWidget(self.main_container)
 
         self.background_label = QLabel(self.main_container)
-        bg_path = os.path.join(ASSETS_DIR_NAME, "background.jpg")
-        self.original_pixmap = QPixmap(bg_path)
-        if self.original_pixmap.isNull():
-            self.background_label.setText(Translations.get("background_not_found"))
-            self.background_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # Ảnh nền được giải mã ở nền, đã thu nhỏ về cỡ màn hình, rồi mới hiện lên
+        self.background = BackgroundRenderer(self.background_label, os.path.join(ASSETS_DIR_NAME, "background.jpg"),
+                                             self)
+        self.background.failed.connect(self._on_background_failed)
+        screen = QGuiApplication.primaryScreen()
+        self.background.load(screen.availableGeometry().size() if screen else self.size())
 
         self.title_bar = QWidget()
         self.title_bar.setObjectName("customTitleBar")
@@ -69,15 +186,71 @@ class TreeBuilderApp(QMainWindow):
 
         self.input_group = QGroupBox()
         self.tree_input_text = QPlainTextEdit()
+        self.preview_model = TreePreviewModel(self)
+        self.preview_view = QTreeView()
+        self.preview_view.setModel(self.preview_model)
+        self.preview_view.setHeaderHidden(True)
+        self.preview_view.setUniformRowHeights(True)
+        self.preview_summary_label = QLabel()
+        self.preview_summary_label.setWordWrap(True)
+        self.from_folder_btn = QPushButton()
+        self.open_file_btn = QPushButton()
+        # Bật: dựng rồi áp dụng mỗi lần tệp cây được lưu (chỉ khi đầu vào là tệp, đầu ra là thư mục)
+        self.watch_btn = QPushButton()
+        self.watch_btn.setCheckable(True)
+        self.watch_btn.setEnabled(False)
+        # Tệp cây đang dùng làm đầu vào (None = văn bản trong ô soạn thảo)
+        self.tree_file_path = None
         self.output_group = QGroupBox()
         self.output_path_entry = QLineEdit()
         self.browse_btn = QPushButton()
+        self.output_format_combo = QComboBox()
+        self.templates_btn = QPushButton()
+        # Tệp đăng ký mẫu nội dung đang chọn (None = chỉ dùng chỉ thị trong cây)
+        self.templates_path = None
+        # Cho phép nguồn "@copy" nằm ngoài thư mục gốc của nó (mặc định tắt)
+        self.allow_copy_outside_checkbox = QCheckBox()
+        self.sync_checkbox = QCheckBox()
+        self.prune_checkbox = QCheckBox()
+        self.prune_checkbox.setEnabled(False)
+        self.resume_checkbox = QCheckBox()
+        # Ghi nhật ký thao tác và giữ lại sau khi dựng để hoàn tác được (mặc định tắt)
+        self.keep_journal_checkbox = QCheckBox()
+        self.rollback_btn = QPushButton()
+        self.queue_group = QGroupBox()
+        self.job_model = JobListModel(self)
+        self.queue_view = QListView()
+        self.queue_view.setModel(self.job_model)
+        self.queue_view.setUniformItemSizes(True)
+        self.queue_view.setMaximumHeight(110)
+        self.queue_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.queue_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        self.queue_add_btn = QPushButton()
+        self.queue_run_btn = QPushButton()
+        self.queue_cancel_btn = QPushButton()
+        self.queue_clear_btn = QPushButton()
+        self.processes_label = QLabel()
+        self.processes_spin = QSpinBox()
+        self.processes_spin.setRange(1, max(1, default_processes() * 2))
+        self.processes_spin.setValue(default_processes())
+        self.queue_timer = QTimer(self)
+        self.queue_timer.setInterval(QUEUE_POLL_MS)
         self.run_btn = QPushButton()
         self.run_btn.setObjectName("runButton")
         self.run_btn.setFixedHeight(45)
         self.log_group = QGroupBox()
-        self.log_output_text = QPlainTextEdit()
-        self.log_output_text.setReadOnly(True)
+        self.log_model = LogListModel(parent=self)
+        self.log_view = QListView()
+        self.log_view.setModel(self.log_model)
+        # Chỉ dựng các hàng đang hiển thị; mọi hàng cùng chiều cao nên cuộn không cần đo lại
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.log_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.log_view.setSelectionMode(QListView.SelectionMode.ExtendedSelection)
+        self.log_filter_combo = QComboBox()
+        self.export_log_btn = QPushButton()
+        # Tệp nhận toàn bộ nhật ký của lần chạy gần nhất, dùng cho chức năng xuất
+        self.full_log_path = os.path.join(tempfile.gettempdir(), f"tree_builder_{os.getpid()}.log")
         self.status_label = QLabel()
         self.progress_bar = QProgressBar()
         self.progress_bar.setTextVisible(False)
@@ -106,18 +279,57 @@ class TreeBuilderApp(QMainWindow):
         content_layout.setSpacing(15)
         
         input_layout = QVBoxLayout(self.input_group)
-        input_layout.addWidget(self.tree_input_text)
+        editor_layout = QHBoxLayout()
+        editor_layout.addWidget(self.tree_input_text, 3)
+        preview_layout = QVBoxLayout()
+        preview_layout.addWidget(self.preview_view, 1)
+        preview_layout.addWidget(self.preview_summary_label)
+        editor_layout.addLayout(preview_layout, 2)
+        input_layout.addLayout(editor_layout)
+        input_buttons = QHBoxLayout()
+        input_buttons.addStretch()
+        input_buttons.addWidget(self.open_file_btn)
+        input_buttons.addWidget(self.watch_btn)
+        input_buttons.addWidget(self.from_folder_btn)
+        input_layout.addLayout(input_buttons)
         content_layout.addWidget(self.input_group, 1)
 
         output_layout = QHBoxLayout(self.output_group)
         output_layout.addWidget(self.output_path_entry)
         output_layout.addWidget(self.browse_btn)
+        output_layout.addWidget(self.output_format_combo)
+        output_layout.addWidget(self.templates_btn)
+        output_layout.addWidget(self.allow_copy_outside_checkbox)
+        output_layout.addWidget(self.sync_checkbox)
+        output_layout.addWidget(self.prune_checkbox)
+        output_layout.addWidget(self.resume_checkbox)
+        output_layout.addWidget(self.keep_journal_checkbox)
         content_layout.addWidget(self.output_group)
+
+        queue_layout = QHBoxLayout(self.queue_group)
+        queue_layout.addWidget(self.queue_view, 1)
+        queue_buttons = QVBoxLayout()
+        queue_buttons.addWidget(self.queue_add_btn)
+        queue_buttons.addWidget(self.queue_run_btn)
+        queue_buttons.addWidget(self.queue_cancel_btn)
+        queue_buttons.addWidget(self.queue_clear_btn)
+        processes_layout = QHBoxLayout()
+        processes_layout.addWidget(self.processes_label)
+        processes_layout.addWidget(self.processes_spin)
+        queue_buttons.addLayout(processes_layout)
+        queue_layout.addLayout(queue_buttons)
+        content_layout.addWidget(self.queue_group)
         
         content_layout.addWidget(self.run_btn, 0, Qt.AlignmentFlag.AlignCenter)
         
         log_layout = QVBoxLayout(self.log_group)
-        log_layout.addWidget(self.log_output_text)
+        log_toolbar = QHBoxLayout()
+        log_toolbar.addWidget(self.rollback_btn)
+        log_toolbar.addStretch()
+        log_toolbar.addWidget(self.log_filter_combo)
+        log_toolbar.addWidget(self.export_log_btn)
+        log_layout.addLayout(log_toolbar)
+        log_layout.addWidget(self.log_view)
         content_layout.addWidget(self.log_group, 1)
 
         status_layout = QHBoxLayout()
@@ -132,20 +344,176 @@ class TreeBuilderApp(QMainWindow):
         self.btn_minimize.clicked.connect(self.showMinimized)
         self.btn_maximize.clicked.connect(self._toggle_maximize)
         self.browse_btn.clicked.connect(self._browse_output_directory)
+        self.from_folder_btn.clicked.connect(self._load_tree_from_folder)
+        self.open_file_btn.clicked.connect(self._toggle_tree_file)
+        self.watch_btn.toggled.connect(self._toggle_watch)
         self.run_btn.clicked.connect(self._start_process)
+        self.sync_checkbox.toggled.connect(self.prune_checkbox.setEnabled)
+        self.output_format_combo.currentIndexChanged.connect(self._on_output_format_change)
+        self.templates_btn.clicked.connect(self._choose_templates)
         self.lang_combo.currentIndexChanged.connect(self._on_language_change)
+        self.log_filter_combo.currentIndexChanged.connect(self._on_log_filter_change)
+        self.export_log_btn.clicked.connect(self._export_log)
+        self.rollback_btn.clicked.connect(self._rollback_build)
+        self.queue_add_btn.clicked.connect(self._add_job)
+        self.queue_run_btn.clicked.connect(self._run_queue)
+        self.queue_cancel_btn.clicked.connect(self._cancel_selected_jobs)
+        self.queue_clear_btn.clicked.connect(self.job_model.remove_finished)
+        self.queue_timer.timeout.connect(self._poll_queue)
     
+    def _setup_preview(self):
+        self._preview_result = None
+        self._preview_edits = []
+        # Số khối (dòng) của tài liệu tại lần thay đổi trước, để tính số dòng cũ bị thay
+        self._preview_block_count = 0
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self._preview_timer.timeout.connect(self._flush_preview_edits)
+
+        self.preview_thread = QThread(self)
+        self.preview_worker = PreviewParseWorker()
+        self.preview_worker.moveToThread(self.preview_thread)
+        self.preview_requested.connect(self.preview_worker.apply_edits)
+        self.preview_file_requested.connect(self.preview_worker.load_file)
+        self.preview_worker.parsed.connect(self._on_preview_parsed)
+        self.preview_thread.finished.connect(self.preview_worker.deleteLater)
+        self.preview_thread.start()
+
+        document = self.tree_input_text.document()
+        document.contentsChange.connect(self._on_tree_text_changed)
+        self._on_tree_text_changed(0, 0, document.characterCount())
+
+    @Slot(int, int, int)
+    def _on_tree_text_changed(self, position, removed, added):
+        # Chỉ đọc các khối bị ảnh hưởng, không gọi toPlainText()
+        document = self.tree_input_text.document()
+        first_block = document.findBlock(position)
+        if not first_block.isValid():
+            first_block = document.lastBlock()
+        last_block = document.findBlock(position + added)
+        if not last_block.isValid():
+            last_block = document.lastBlock()
+        first = first_block.blockNumber()
+        new_count = last_block.blockNumber() - first + 1
+        block_count = document.blockCount()
+        old_count = new_count - (block_count - self._preview_block_count)
+        self._preview_block_count = block_count
+
+        lines = []
+        block = first_block
+        for _ in range(new_count):
+            lines.append(block.text())
+            block = block.next()
+        self._preview_edits.append((first, old_count, lines))
+        self._preview_timer.start()
+
+    @Slot()
+    def _flush_preview_edits(self):
+        edits, self._preview_edits = self._preview_edits, []
+        if edits:
+            self.preview_requested.emit(edits)
+
+    @Slot(object)
+    def _on_preview_parsed(self, result):
+        if result.path != self.tree_file_path:
+            # Kết quả của nguồn đầu vào trước (ô soạn thảo hoặc tệp khác)
+            return
+        if result.path is None and self._preview_edits:
+            # Đã có chỉnh sửa mới đang chờ; kết quả này sắp bị thay thế
+            return
+        self._preview_result = result
+        if self.preview_model.set_result(result):
+            self.preview_view.expandToDepth(0)
+        self._update_preview_summary()
+
+    def _update_preview_summary(self):
+        result = self._preview_result
+        if result is None:
+            if self.tree_file_path:
+                self.preview_summary_label.setText(Translations.get(
+                    "preview_file_loading", name=os.path.basename(self.tree_file_path), size=self._tree_file_mb()))
+            else:
+                self.preview_summary_label.clear()
+            return
+        tree = result.tree
+        if result.error is not None:
+            self.preview_summary_label.setText(Translations.get("preview_error", error=result.error))
+            return
+        text = Translations.get("preview_summary", nodes=len(tree), dirs=result.dir_count,
+                                warnings=len(tree.warnings))
+        if result.path:
+            text = Translations.get("preview_file", name=os.path.basename(result.path), size=self._tree_file_mb(),
+                                    lines=tree.total_lines) + "\n" + text
+        if result.format_name:
+            text += "\n" + Translations.get("preview_format", name=Translations.get("input_format_" + result.format_name))
+        if tree.warnings:
+            shown = ", ".join(str(line) for line in tree.warnings[:PREVIEW_MAX_WARNING_LINES])
+            if len(tree.warnings) > PREVIEW_MAX_WARNING_LINES:
+                shown += ", …"
+            text += "\n" + Translations.get("preview_warning_lines", lines=shown)
+        if result.issues:
+            renderer = EventRenderer(Translations)
+            lines = [renderer.message(entry) for entry in result.issues[:PREVIEW_MAX_WARNING_LINES]]
+            if len(result.issues) > PREVIEW_MAX_WARNING_LINES:
+                lines.append("…")
+            text += "\n" + "\n".join(lines)
+        self.preview_summary_label.setText(text)
+
     def retranslate_ui(self):
         self.setWindowTitle(Translations.get("app_title"))
         self.title_label.setText(Translations.get("app_title"))
         self.input_group.setTitle(Translations.get("input_group_title"))
-        self.tree_input_text.setPlaceholderText(Translations.get("input_placeholder"))
         self.output_group.setTitle(Translations.get("output_group_title"))
         self.output_path_entry.setPlaceholderText(Translations.get("output_placeholder"))
         self.browse_btn.setText(Translations.get("browse_button"))
+        self.from_folder_btn.setText(Translations.get("from_folder_button"))
+        self.watch_btn.setText(Translations.get("watch_button"))
+        self.watch_btn.setToolTip(Translations.get("watch_tooltip"))
+        self._update_input_mode()
+        self._update_templates_button()
+        self.allow_copy_outside_checkbox.setText(Translations.get("allow_copy_outside_checkbox"))
+        self.allow_copy_outside_checkbox.setToolTip(Translations.get("allow_copy_outside_tooltip"))
+        self.sync_checkbox.setText(Translations.get("sync_checkbox"))
+        self.prune_checkbox.setText(Translations.get("prune_checkbox"))
+        self.resume_checkbox.setText(Translations.get("resume_checkbox"))
+        self.resume_checkbox.setToolTip(Translations.get("resume_tooltip"))
+        self.keep_journal_checkbox.setText(Translations.get("keep_journal_checkbox"))
+        self.keep_journal_checkbox.setToolTip(Translations.get("keep_journal_tooltip"))
+        self.rollback_btn.setText(Translations.get("rollback_button"))
         self.run_btn.setText(Translations.get("run_button"))
+        self.queue_group.setTitle(Translations.get("queue_group_title"))
+        self.queue_add_btn.setText(Translations.get("queue_add_button"))
+        self.queue_run_btn.setText(Translations.get("queue_run_button"))
+        self.queue_cancel_btn.setText(Translations.get("queue_cancel_button"))
+        self.queue_clear_btn.setText(Translations.get("queue_clear_button"))
+        self.processes_label.setText(Translations.get("queue_processes_label"))
+        self.processes_spin.setToolTip(Translations.get("queue_processes_tooltip"))
+        self.job_model.refresh()
         self.log_group.setTitle(Translations.get("log_group_title"))
-        self.status_label.setText(Translations.get("status_ready"))
+        self._update_status_label()
+        self.log_model.refresh()
+        self.export_log_btn.setText(Translations.get("export_log_button"))
+        self._update_preview_summary()
+
+        self.output_format_combo.blockSignals(True)
+        current_format = self.output_format_combo.currentData() or FORMAT_DIR
+        self.output_format_combo.clear()
+        for fmt in OUTPUT_FORMAT_CHOICES:
+            label = (Translations.get("format_dir") if fmt == FORMAT_DIR
+                     else Translations.get("format_archive", ext=FORMAT_EXTENSIONS[fmt]))
+            self.output_format_combo.addItem(label, fmt)
+        self.output_format_combo.setCurrentIndex(self.output_format_combo.findData(current_format))
+        self.output_format_combo.blockSignals(False)
+
+        self.log_filter_combo.blockSignals(True)
+        current_filter = self.log_filter_combo.currentData() or SEVERITY_INFO
+        self.log_filter_combo.clear()
+        for key, severity in (("log_filter_all", SEVERITY_INFO), ("log_filter_warnings", SEVERITY_WARNING),
+                              ("log_filter_errors", SEVERITY_ERROR)):
+            self.log_filter_combo.addItem(Translations.get(key), severity)
+        self.log_filter_combo.setCurrentIndex(self.log_filter_combo.findData(current_filter))
+        self.log_filter_combo.blockSignals(False)
 
         self.lang_combo.blockSignals(True)
         self.lang_combo.clear()
@@ -156,79 +524,16 @@ class TreeBuilderApp(QMainWindow):
             self.lang_combo.setCurrentIndex(current_index)
         self.lang_combo.blockSignals(False)
     
+    def _apply_font(self):
+        # Phải chạy trước khi tạo widget: quy tắc font-size/font-weight của bảng kiểu
+        # được gộp với phông của ứng dụng lúc polish, setFont() sau đó không tới được
+        font = QFont(QApplication.font())
+        font.setFamilies(UI_FONT_FAMILIES)
+        QApplication.setFont(font)
+
     def _apply_styles(self):
-        font_family = "Meiryo, Segoe UI, Arial" if Translations.current_lang == Translations.LANG_JA else "Segoe UI, Arial"
-        self.setStyleSheet(f"""
-            * {{ font-family: "{font_family}"; }}
-            QMainWindow {{ background: transparent; }}
-            QWidget#mainContainer {{ background-color: rgb(10, 12, 28); border-radius: 12px; }}
-            QGroupBox {{
-                background-color: rgba(25,30,55,0.6); border: 1px solid rgba(140, 150, 190, 0.5);
-                border-radius: 9px; margin-top: 12px; padding: 15px; font-weight: bold;
-                color: rgb(130, 170, 255);
-            }}
-            QGroupBox::title {{ subcontrol-origin: margin; subcontrol-position: top left; padding: 0 8px; margin-left: 10px; }}
-            QLabel {{ color: rgb(155, 160, 180); font-size: 9pt; }}
-            QWidget#customTitleBar {{
-                background-color: rgba(15, 18, 35, 0.95);
-                border-top-left-radius: 12px; border-top-right-radius: 12px;
-                border-bottom: 1px solid rgba(200, 205, 220, 0.1);
-            }}
-            QWidget#customTitleBar QLabel {{ color: rgb(225, 230, 245); font-size: 11pt; font-weight: bold; }}
-            QWidget#customTitleBar > QLabel:first-child {{ color: rgb(130, 170, 255); font-size: 14pt; padding-bottom: 3px; }}
-            QWidget#customTitleBar QPushButton {{
-                background-color: transparent; border: none; border-radius: 8px;
-                color: rgb(155, 160, 180); font-family: "Segoe Fluent Icons", "Segoe MDL2 Assets"; font-size: 10pt;
-                min-width: 36px; max-width: 36px; min-height: 30px; max-height: 30px;
-            }}
-            QWidget#customTitleBar QPushButton:hover {{ background-color: rgb(85, 100, 145); color: white; }}
-            QWidget#customTitleBar QPushButton#btn_close:hover {{ background-color: rgb(220, 90, 100); color: white; }}
-            QComboBox {{
-                background-color: rgba(12, 15, 32, 0.9); color: rgb(225, 230, 245);
-                border: 1px solid rgba(140, 150, 190, 0.5); border-radius: 7px;
-                padding: 4px 8px; min-width: 100px;
-            }}
-            QComboBox:hover {{ border-color: rgb(130, 170, 255); }}
-            QComboBox::drop-down {{ border: none; }}
-            QComboBox QAbstractItemView {{
-                background-color: rgb(25, 30, 55); border: 1px solid rgb(130, 170, 255);
-                selection-background-color: rgb(130, 170, 255); selection-color: black;
-            }}
-            QLineEdit, QPlainTextEdit {{
-                background-color: rgba(12, 15, 32, 0.9); border: 1px solid rgba(140, 150, 190, 0.5);
-                border-radius: 8px; padding: 10px; color: rgb(225, 230, 245); font-size: 10pt;
-            }}
-            QLineEdit:focus, QPlainTextEdit:focus {{ border: 1.5px solid rgb(160, 190, 255); }}
-            QPushButton {{
-                background-color: rgb(65, 75, 115); border: none; border-radius: 8px;
-                padding: 10px 18px; font-weight: bold; color: rgb(225, 230, 245);
-            }}
-            QPushButton:hover {{ background-color: rgb(85, 100, 145); }}
-            QPushButton:disabled {{ background-color: #555; color: #888; }}
-            QPushButton#runButton {{
-                background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 rgb(60, 110, 220), stop:1 rgb(130, 170, 255));
-                font-size: 12pt; color: white;
-            }}
-            QPushButton#runButton:hover {{
-                background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 rgb(80, 130, 240), stop:1 rgb(150, 190, 255));
-            }}
-            QProgressBar {{
-                border: 1px solid rgba(140, 150, 190, 0.5); border-radius: 7px;
-                background-color: rgba(12, 15, 32, 0.9); height: 12px;
-            }}
-            QProgressBar::chunk {{
-                background-color: rgb(80, 180, 120); border-radius: 6px; margin: 1px;
-            }}
-            QScrollBar:vertical {{
-                border: none; background: rgba(0,0,0,0.2); width: 12px;
-                margin: 15px 0 15px 0; border-radius: 6px;
-            }}
-            QScrollBar::handle:vertical {{
-                background: rgb(65, 75, 115); min-height: 30px; border-radius: 5px;
-            }}
-            QScrollBar::handle:vertical:hover {{ background: rgb(85, 100, 145); }}
-        """)
-        self.update()
+        # Bảng kiểu lớn của cửa sổ chỉ được đặt một lần
+        self.setStyleSheet(APP_STYLESHEET)
 
     @Slot(int)
     def _on_language_change(self, index):
@@ -236,7 +541,6 @@ class TreeBuilderApp(QMainWindow):
         if lang_code and lang_code != Translations.current_lang:
             Translations.set_language(lang_code)
             self.retranslate_ui()
-            self._apply_styles()
 
     def _toggle_maximize(self):
         if self.isMaximized():
@@ -247,44 +551,380 @@ class TreeBuilderApp(QMainWindow):
 
     @Slot()
     def _browse_output_directory(self):
-        directory = QFileDialog.getExistingDirectory(self, Translations.get("output_group_title"))
-        if directory:
-            self.output_path_entry.setText(os.path.normpath(directory))
+        fmt = self.output_format_combo.currentData()
+        if fmt == FORMAT_DIR:
+            directory = QFileDialog.getExistingDirectory(self, Translations.get("output_group_title"))
+            if directory:
+                self.output_path_entry.setText(os.path.normpath(directory))
+            return
+        extension = FORMAT_EXTENSIONS[fmt]
+        path, _ = QFileDialog.getSaveFileName(self, Translations.get("output_group_title"), "", f"*{extension}")
+        if path:
+            if detect_format(path) != fmt:
+                path += extension
+            self.output_path_entry.setText(os.path.normpath(path))
+
+    @Slot(int)
+    def _on_output_format_change(self, index):
+        fmt = self.output_format_combo.itemData(index)
+        # Đồng bộ chỉ có nghĩa khi ghi vào thư mục thật
+        is_dir = fmt == FORMAT_DIR
+        self.sync_checkbox.setEnabled(is_dir)
+        self.resume_checkbox.setEnabled(is_dir)
+        self.keep_journal_checkbox.setEnabled(is_dir)
+        if not is_dir:
+            self.sync_checkbox.setChecked(False)
+            self.resume_checkbox.setChecked(False)
+            self.keep_journal_checkbox.setChecked(False)
+        path = self.output_path_entry.text()
+        if path and detect_format(path) not in (FORMAT_DIR, fmt):
+            # Đổi đuôi của đường dẫn tệp nén đã chọn cho khớp định dạng mới
+            base = strip_archive_extension(path)
+            self.output_path_entry.setText(base if is_dir else base + FORMAT_EXTENSIONS[fmt])
+        self._update_watch_button()
             
     @Slot()
-    def _start_process(self):
-        tree_text = self.tree_input_text.toPlainText()
+    def _choose_templates(self):
+        path, _ = QFileDialog.getOpenFileName(self, Translations.get("templates_button"), "", "*.json")
+        self.templates_path = os.path.normpath(path) if path else None
+        self._update_templates_button()
+
+    def _update_templates_button(self):
+        if self.templates_path:
+            self.templates_btn.setText(Translations.get("templates_selected",
+                                                        name=os.path.basename(self.templates_path)))
+        else:
+            self.templates_btn.setText(Translations.get("templates_button"))
+        self.templates_btn.setToolTip(Translations.get("templates_tooltip"))
+
+    def _copy_base_dir(self):
+        """Thư mục gốc cho "# @copy" tương đối: thư mục của tệp cây như CLI và --batch,
+        nếu không có thì thư mục của tệp đăng ký mẫu (None = thư mục hiện tại)."""
+        if self.tree_file_path:
+            return os.path.dirname(os.path.abspath(self.tree_file_path))
+        return os.path.dirname(self.templates_path) if self.templates_path else None
+
+    @Slot()
+    def _load_tree_from_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, Translations.get("from_folder_button"))
+        if not directory:
+            return
+        self._set_tree_file(None)
+        self.from_folder_btn.setEnabled(False)
+        self.tree_input_text.clear()
+        self.dump_thread = QThread()
+        self.dump_worker = TreeDumpWorker(os.path.normpath(directory), Translations)
+        self.dump_worker.moveToThread(self.dump_thread)
+        self.dump_thread.started.connect(self.dump_worker.run)
+        self.dump_worker.finished.connect(self.dump_thread.quit)
+        self.dump_worker.finished.connect(self.dump_worker.deleteLater)
+        self.dump_thread.finished.connect(self.dump_thread.deleteLater)
+        self.dump_worker.chunk_ready.connect(self.tree_input_text.appendPlainText)
+        self.dump_worker.error_occurred.connect(self.log_warning)
+        self.dump_worker.finished.connect(lambda: self.from_folder_btn.setEnabled(True))
+        self.dump_thread.start()
+
+    @Slot()
+    def _toggle_tree_file(self):
+        if self.tree_file_path:
+            self._set_tree_file(None)
+            return
+        path, _ = QFileDialog.getOpenFileName(self, Translations.get("open_file_button"))
+        if path:
+            self._set_tree_file(os.path.normpath(path))
+
+    def _set_tree_file(self, path):
+        """Chuyển giữa đầu vào là ô soạn thảo (path=None) và một tệp cây.
+
+        Nội dung tệp không bao giờ được nạp vào ô soạn thảo: khung xem trước
+        phân tích tệp trên luồng của nó và chỉ hiển thị tóm tắt, còn worker tự đọc
+        tệp khi dựng (Core/ingest.py).
+        """
+        if path == self.tree_file_path:
+            return
+        if self.watch_btn.isChecked():
+            self.worker.stop()
+        self.tree_file_path = path
+        self._preview_result = None
+        self.preview_model.set_result(None)
+        if path is not None:
+            # Giải phóng văn bản đã dán; chỉnh sửa này vẫn được gửi để luồng xem trước khớp với ô soạn thảo
+            self.tree_input_text.clear()
+            self.preview_file_requested.emit(path)
+        else:
+            self.preview_requested.emit([])
+        self.tree_input_text.setReadOnly(path is not None)
+        self._update_input_mode()
+        self._update_watch_button()
+        self._update_preview_summary()
+
+    def _update_input_mode(self):
+        if self.tree_file_path:
+            self.open_file_btn.setText(Translations.get("close_file_button"))
+            self.tree_input_text.setPlaceholderText(Translations.get(
+                "input_file_placeholder", name=os.path.basename(self.tree_file_path)))
+        else:
+            self.open_file_btn.setText(Translations.get("open_file_button"))
+            self.tree_input_text.setPlaceholderText(Translations.get("input_placeholder"))
+        self.open_file_btn.setToolTip(Translations.get("open_file_tooltip"))
+
+    def _update_watch_button(self):
+        # Khi đang theo dõi nút vẫn bật để tắt được; nếu không cần tệp cây, đầu ra thư mục và không có gì đang chạy
+        idle = self.thread is None
+        self.watch_btn.setEnabled(self.watch_btn.isChecked() or (
+            idle and self.tree_file_path is not None and self.output_format_combo.currentData() == FORMAT_DIR))
+
+    def _tree_file_mb(self):
+        try:
+            return os.path.getsize(self.tree_file_path) / (1024 * 1024)
+        except OSError:
+            return 0.0
+
+    def _checked_inputs(self):
+        """Văn bản cây (None khi đọc từ tệp cây) và đường dẫn đầu ra, hoặc None (kèm cảnh báo) nếu thiếu."""
+        tree_text = None
         output_path = self.output_path_entry.text()
-        if not tree_text.strip():
-            QMessageBox.warning(self, Translations.get("warn_missing_input"), Translations.get("warn_paste_tree"))
+        if self.tree_file_path is None:
+            tree_text = self.tree_input_text.toPlainText()
+            if not tree_text.strip():
+                QMessageBox.warning(self, Translations.get("warn_missing_input"), Translations.get("warn_paste_tree"))
+                return None
+        if not output_path:
+            QMessageBox.warning(self, Translations.get("warn_missing_input"), Translations.get("warn_select_output"))
+            return None
+        return tree_text, output_path
+
+    @Slot()
+    def _start_process(self):
+        inputs = self._checked_inputs()
+        if inputs is None:
+            return
+        tree_text, output_path = inputs
+        sync = self.sync_checkbox.isChecked()
+        output_format = self.output_format_combo.currentData()
+        # Nhật ký thao tác cạnh thư mục đầu ra chỉ khi được yêu cầu: giữ để hoàn tác, hoặc
+        # tiếp tục bản dựng dở (khi đó nó bị xóa sau khi dựng xong)
+        resume = self.resume_checkbox.isChecked()
+        keep_journal = self.keep_journal_checkbox.isChecked()
+        journal_path = None
+        if output_format == FORMAT_DIR and (resume or keep_journal):
+            journal_path = default_journal_path(output_path)
+        worker = StructureBuilderWorker(tree_text, output_path,
+                                        sync=sync, prune=sync and self.prune_checkbox.isChecked(),
+                                        log_path=self.full_log_path,
+                                        output_format=output_format,
+                                        templates_path=self.templates_path,
+                                        base_dir=self._copy_base_dir(),
+                                        allow_copy_outside=self.allow_copy_outside_checkbox.isChecked(),
+                                        journal_path=journal_path,
+                                        resume=resume, keep_journal=keep_journal,
+                                        cache=None if cache_disabled() else TreeCache(),
+                                        tree_path=self.tree_file_path)
+        worker.plan_ready.connect(self._on_plan_ready)
+        worker.report_ready.connect(self.show_report)
+        self._start_worker(worker)
+
+    @Slot(bool)
+    def _toggle_watch(self, checked):
+        if not checked:
+            if self.worker is not None:
+                self.worker.stop()
+            return
+        inputs = self._checked_inputs()
+        if inputs is None:
+            self.watch_btn.blockSignals(True)
+            self.watch_btn.setChecked(False)
+            self.watch_btn.blockSignals(False)
             return
+        _, output_path = inputs
+        prune = self.sync_checkbox.isChecked() and self.prune_checkbox.isChecked()
+        worker = WatchWorker(self.tree_file_path, output_path, prune=prune, log_path=self.full_log_path,
+                             templates_path=self.templates_path, base_dir=self._copy_base_dir(),
+                             allow_copy_outside=self.allow_copy_outside_checkbox.isChecked())
+        worker.plan_ready.connect(self._on_plan_ready)
+        worker.report_ready.connect(self.show_report)
+        self._start_worker(worker)
+
+    @Slot()
+    def _rollback_build(self):
+        output_path = self.output_path_entry.text()
         if not output_path:
             QMessageBox.warning(self, Translations.get("warn_missing_input"), Translations.get("warn_select_output"))
             return
+        journal_path = default_journal_path(output_path)
+        if not os.path.exists(journal_path):
+            QMessageBox.information(self, Translations.get("rollback_button"), Translations.get("rollback_no_journal"))
+            return
+        answer = QMessageBox.question(self, Translations.get("rollback_button"),
+                                      Translations.get("rollback_confirm", path=output_path))
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self._start_worker(RollbackWorker(journal_path))
+
+    @Slot()
+    def _add_job(self):
+        inputs = self._checked_inputs()
+        if inputs is None:
+            return
+        tree_text, output_path = inputs
+        self.job_model.add_job(BuildJob(tree_text, output_path, self.output_format_combo.currentData(),
+                                        templates_path=self.templates_path, base_dir=self._copy_base_dir(),
+                                        tree_path=self.tree_file_path,
+                                        allow_copy_outside=self.allow_copy_outside_checkbox.isChecked()))
+
+    @Slot()
+    def _run_queue(self):
+        rows = self.job_model.pending_rows()
+        if not rows:
+            QMessageBox.information(self, Translations.get("queue_run_button"), Translations.get("queue_empty"))
+            return
+        self.job_queue = JobQueue([self.job_model.job(row) for row in rows], processes=self.processes_spin.value(),
+                                  cache_dir=None if cache_disabled() else default_cache_dir())
+        self._reported_jobs = set()
+        self.job_model.attach(rows, self.job_queue.states)
+        self.queue_run_btn.setEnabled(False)
+        self.log_model.clear()
+        self.log_model.set_renderer(EventRenderer(Translations))
+        self.progress_bar.setValue(0)
+        started = (SEVERITY_INFO, 0, EVENT_QUEUE_STARTED, NO_NODE,
+                   {"count": len(rows), "processes": self.job_queue.processes})
+        self._status_entry = started
+        self.log_model.append_entries([started])
+        self._update_status_label()
+        self.job_queue.start()
+        self.queue_timer.start()
+
+    @Slot()
+    def _cancel_selected_jobs(self):
+        # Hàng đã gắn vào hàng đợi đang chạy thì hủy qua hàng đợi; hàng chưa chạy chỉ cần đánh dấu
+        queue_index = {id(state): i for i, state in enumerate(self.job_queue.states)} if self.job_queue else {}
+        for index in self.queue_view.selectionModel().selectedRows():
+            state = self.job_model.state(index.row())
+            if id(state) in queue_index:
+                self.job_queue.cancel(queue_index[id(state)])
+            elif not state.finished:
+                state.status = JOB_CANCELLED
+        self.job_model.refresh()
+
+    @Slot()
+    def _poll_queue(self):
+        queue = self.job_queue
+        finished = queue.poll()
+        self.job_model.refresh()
+        entries = []
+        for index, state in enumerate(queue.states):
+            if not state.finished or index in self._reported_jobs:
+                continue
+            self._reported_jobs.add(index)
+            entries.extend(_job_entries(queue.jobs[index], state))
+        done = sum(state.done for state in queue.states)
+        total = sum(state.total for state in queue.states)
+        self.progress_bar.setValue(int(done * 100 / total) if total else 0)
+        if entries:
+            self._status_entry = entries[-1]
+            self.log_model.append_entries(entries)
+            self.log_view.scrollToBottom()
+            self._update_status_label()
+        if finished:
+            self.queue_timer.stop()
+            queue.shutdown()
+            self.job_queue = None
+            self.queue_run_btn.setEnabled(True)
+
+    def _start_worker(self, worker):
+        """Chạy worker dựng/hoàn tác trên một QThread mới, với bảng nhật ký làm mới."""
         self.run_btn.setEnabled(False)
-        self.log_output_text.clear()
+        self.rollback_btn.setEnabled(False)
+        self.log_model.clear()
+        self.log_model.set_renderer(EventRenderer(Translations))
         self.progress_bar.setValue(0)
+        self._gui_signal_seconds = 0.0
+        self._status_entry = None
         self.thread = QThread()
-        self.worker = StructureBuilderWorker(tree_text, output_path, Translations)
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker = worker
+        worker.moveToThread(self.thread)
+        self.thread.started.connect(worker.run)
+        worker.finished.connect(self.thread.quit)
+        worker.finished.connect(worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
-        self.worker.progress_update.connect(self.update_progress)
-        self.worker.error_occurred.connect(self.log_message)
-        self.worker.finished.connect(lambda: self.run_btn.setEnabled(True))
+        self.thread.finished.connect(self._on_build_thread_finished)
+        worker.progress_update.connect(self.update_progress)
+        worker.log_batch.connect(self.append_log_batch)
+        self._update_watch_button()
         self.thread.start()
 
-    @Slot(int, str)
-    def update_progress(self, value, message):
+    @Slot()
+    def _on_build_thread_finished(self):
+        # Đối tượng C++ của luồng và worker sắp bị deleteLater; không giữ tham chiếu tới chúng
+        self.thread = None
+        self.worker = None
+        self.run_btn.setEnabled(True)
+        self.rollback_btn.setEnabled(True)
+        self.watch_btn.blockSignals(True)
+        self.watch_btn.setChecked(False)
+        self.watch_btn.blockSignals(False)
+        self._update_watch_button()
+
+    @Slot(int, object)
+    def update_progress(self, value, entry):
+        started = time.perf_counter()
         self.progress_bar.setValue(value)
-        self.status_label.setText(message)
-        self.log_message(f"[{value}%] {message}")
+        self._status_entry = entry
+        self._update_status_label()
+        self._gui_signal_seconds += time.perf_counter() - started
+
+    def _update_status_label(self):
+        if self._status_entry is None:
+            self.status_label.setText(Translations.get("status_ready"))
+        else:
+            self.status_label.setText(self.log_model.renderer.message(self._status_entry))
+
+    @Slot(object)
+    def _on_plan_ready(self, plan):
+        # Tên và đường dẫn của nút chỉ được tra khi một hàng nhật ký được vẽ
+        self.log_model.set_renderer(EventRenderer(Translations, plan, self.worker.output_path))
+
+    @Slot(list)
+    def append_log_batch(self, events):
+        started = time.perf_counter()
+        # Một lần chèn hàng cho cả lô; view chỉ vẽ các hàng đang hiển thị
+        self.log_model.append_entries(events)
+        self.log_view.scrollToBottom()
+        self._gui_signal_seconds += time.perf_counter() - started
+
+    @Slot(dict)
+    def show_report(self, report):
+        report["phases"]["gui_signals"] = self._gui_signal_seconds
+        self.log_model.append_entries([text_entry(SEVERITY_INFO, line) for line in format_report(report, Translations)])
+        self.log_view.scrollToBottom()
 
     @Slot(str)
-    def log_message(self, message):
-        self.log_output_text.appendPlainText(message)
+    def log_warning(self, message):
+        self.log_model.append_entries([text_entry(SEVERITY_WARNING, message)])
+        self.log_view.scrollToBottom()
+
+    @Slot(int)
+    def _on_log_filter_change(self, index):
+        severity = self.log_filter_combo.itemData(index)
+        if severity is not None:
+            self.log_model.set_min_severity(severity)
+
+    @Slot()
+    def _export_log(self):
+        path, _ = QFileDialog.getSaveFileName(self, Translations.get("export_log_button"), "tree_builder.log")
+        if not path:
+            return
+        try:
+            if os.path.exists(self.full_log_path) and not (self.thread and self.thread.isRunning()):
+                # Tệp do worker ghi chứa cả những dòng đã rơi khỏi bộ đệm vòng; nó chỉ
+                # có mục có cấu trúc nên được dịch sang ngôn ngữ hiện tại lúc xuất
+                entries = read_entries(self.full_log_path)
+            else:
+                entries = self.log_model.entries()
+            write_text_log(path, entries, self.log_model.renderer)
+        except OSError as e:
+            QMessageBox.warning(self, Translations.get("export_log_button"),
+                                Translations.get("err_os", path=path, error=e))
 
     #  HÀM SHOW
     def show(self):
@@ -302,12 +942,14 @@ class TreeBuilderApp(QMainWindow):
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        if not self.original_pixmap.isNull():
-            scaled_pixmap = self.original_pixmap.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-            self.background_label.setPixmap(scaled_pixmap)
-            self.background_label.setGeometry(self.rect())
+        self.background.resize(self.size())
         self.background_label.lower()
 
+    @Slot()
+    def _on_background_failed(self):
+        self.background_label.setText(Translations.get("background_not_found"))
+        self.background_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             if self.title_bar.geometry().contains(event.position().toPoint()):
@@ -324,18 +966,48 @@ class TreeBuilderApp(QMainWindow):
         self._is_dragging = False
         event.accept()
         
+    def _stop_preview(self):
+        self._preview_timer.stop()
+        self.preview_thread.quit()
+        self.preview_thread.wait()
+
     def closeEvent(self, event):
-        if self.thread and self.thread.isRunning():
+        building = self.thread is not None and self.thread.isRunning()
+        if building or self.job_queue is not None:
             reply = QMessageBox.question(self, Translations.get("confirm_exit_title"), 
                                          Translations.get("confirm_exit_text"),
                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                          QMessageBox.StandardButton.No)
-            if reply == QMessageBox.StandardButton.Yes:
+            if reply != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            if building:
                 self.worker.stop()
                 self.thread.quit()
                 self.thread.wait()
-                event.accept()
-            else:
-                event.ignore()
-        else:
-            event.accept()
\ No newline at end of file
+            if self.job_queue is not None:
+                self.queue_timer.stop()
+                self.job_queue.shutdown(cancel=True)
+                self.job_queue = None
+        event.accept()
+        self._stop_preview()
+        try:
+            os.remove(self.full_log_path)
+        except OSError:
+            pass
+
+
+def _job_entries(job, state):
+    """Các mục nhật ký cho một việc vừa kết thúc của hàng đợi."""
+    if state.status == JOB_FAILED:
+        return [(SEVERITY_ERROR, None, EVENT_JOB_FAILED, NO_NODE, {"job": job.label, "error": str(state.error)})]
+    result = state.result or {"created": 0, "errors": 0, "error_samples": [], "issues": [], "seconds": 0.0}
+    entries = list(result["issues"])
+    entries += [(SEVERITY_ERROR, None, EVENT_ERR_OS, NO_NODE, {"path": path, "error": error})
+               for path, error in result["error_samples"]]
+    code = EVENT_JOB_DONE if state.status == JOB_DONE else EVENT_JOB_CANCELLED
+    severity = SEVERITY_INFO if state.status == JOB_DONE and not result["errors"] else SEVERITY_WARNING
+    entries.append((severity, None, code, NO_NODE, {
+        "job": job.label, "output": job.output_path, "created": result["created"],
+        "errors": result["errors"], "seconds": result["seconds"]}))
+    return entries
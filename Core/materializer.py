@@ -0,0 +1,227 @@
+# Core/materializer.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .parser import ROOT
+from .planner import CHUNK_SIZE, SUPPORTS_DIR_FD
+from .templates import TemplateError
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+_FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0)
+# Dùng khi đồng bộ: không bao giờ làm rỗng tệp đã có
+_FILE_FLAGS_KEEP = _FILE_FLAGS & ~os.O_TRUNC
+
+
+def default_workers():
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class Materializer:
+    """Thực thi một BuildPlan trên đĩa bằng thread pool, theo từng cấp.
+
+    Cấp d chỉ bắt đầu khi mọi thư mục ở cấp d - 1 đã xong, nên cha luôn được tạo
+    trước con. Mỗi tác vụ nhận một nhóm con của cùng một thư mục cha, mở cha một
+    lần và tạo các con bằng mkdir/open tương đối (dir_fd) nếu hệ điều hành hỗ trợ.
+    Các callback on_created(op) và on_error(op, path, exc) luôn được gọi trên
+    luồng đã gọi run(), không phải trên luồng của pool.
+
+    skip là tập op đã tồn tại (ví dụ SyncReport.existing) và sẽ không được tạo
+    lại; truncate=False giữ nguyên nội dung nếu tệp đã có sẵn. contents là một
+    ContentResolver tùy chọn cung cấp nội dung ghi vào tệp ngay sau khi mở.
+    journal là BuildJournal tùy chọn (xem Core/journal.py); khi có, tệp được mở
+    với O_EXCL để phân biệt mục tạo mới với mục đã có từ trước.
+    """
+
+    def __init__(self, plan, output_path, max_workers=None,
+                 on_created=None, on_error=None, is_cancelled=None, use_dir_fd=SUPPORTS_DIR_FD,
+                 skip=None, truncate=True, contents=None, journal=None):
+        self.plan = plan
+        self.output_path = output_path
+        self.max_workers = max_workers or default_workers()
+        self.on_created = on_created
+        self.on_error = on_error
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.use_dir_fd = use_dir_fd
+        self.skip = skip
+        self._file_flags = _FILE_FLAGS if truncate else _FILE_FLAGS_KEEP
+        # Không có chỉ thị lẫn tệp đăng ký thì giữ nguyên đường tạo tệp rỗng nhanh nhất
+        self.contents = contents if contents is not None and (plan.contents or contents.registry) else None
+        self.journal = journal
+        # Số syscall đã phát, số byte nội dung và thời gian cộng dồn trên mọi luồng, cho RunReport
+        self.stats = {"mkdir": 0, "file_open": 0, "dir_open": 0, "content_bytes": 0,
+                      "mkdir_seconds": 0.0, "file_seconds": 0.0}
+
+    def path(self, op):
+        return os.path.join(self.output_path, self.plan.rel_path(op))
+
+    def _create_chunk(self, parent_op, ops):
+        plan = self.plan
+        parent_path = os.path.join(self.output_path, plan.dir_paths[parent_op])
+        results = []
+        # Op đã có trên đĩa trước khi tạo (chỉ theo dõi khi ghi nhật ký)
+        existed = []
+        resolver = self.contents
+        exclusive = self.journal is not None
+        file_flags = self._file_flags | os.O_EXCL if exclusive else self._file_flags
+        # [mkdir, file_open, dir_open, mkdir_seconds, file_seconds, content_bytes]
+        stats = [0, 0, 0, 0.0, 0.0, 0]
+        perf_counter = time.perf_counter
+        dir_fd = None
+        if self.use_dir_fd:
+            stats[2] += 1
+            try:
+                dir_fd = os.open(parent_path, _DIR_FLAGS)
+            except OSError as e:
+                return [(op, e) for op in ops], stats, existed
+        try:
+            for op in ops:
+                if self.is_cancelled():
+                    break
+                name = plan.names[op]
+                target = name if dir_fd is not None else os.path.join(parent_path, name)
+                started = perf_counter()
+                is_dir = plan.is_dir(op)
+                try:
+                    if is_dir:
+                        stats[0] += 1
+                        try:
+                            os.mkdir(target, dir_fd=dir_fd)
+                        except FileExistsError:
+                            if not os.path.isdir(os.path.join(parent_path, name)):
+                                raise
+                            existed.append(op)
+                    elif resolver is None and not exclusive:
+                        stats[1] += 1
+                        os.close(os.open(target, file_flags, 0o666, dir_fd=dir_fd))
+                    else:
+                        content = resolver.for_file(name, plan.contents.get(op)) if resolver is not None else None
+                        stats[1] += 1
+                        try:
+                            fd = os.open(target, file_flags, 0o666, dir_fd=dir_fd)
+                        except FileExistsError:
+                            # Chỉ xảy ra với O_EXCL: tệp có từ trước. Ghi nhận điều đó xuống
+                            # nhật ký trước khi mở lại (O_TRUNC, ghi nội dung đổi ctime của nó)
+                            self.journal.record_existed(op)
+                            existed.append(op)
+                            stats[1] += 1
+                            fd = os.open(target, self._file_flags, 0o666, dir_fd=dir_fd)
+                        try:
+                            if content is not None:
+                                stats[5] += content.write_to(fd)
+                        finally:
+                            os.close(fd)
+                    results.append((op, None))
+                except (OSError, TemplateError) as e:
+                    results.append((op, e))
+                stats[3 if is_dir else 4] += perf_counter() - started
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+        return results, stats, existed
+
+    def run(self):
+        """Tạo toàn bộ kế hoạch; trả về False nếu bị hủy giữa chừng."""
+        os.makedirs(self.output_path, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for level in self.plan.levels:
+                if self.is_cancelled():
+                    return False
+                pending = self._pending(level)
+                if self.journal is not None:
+                    # Ý định phải nằm trên đĩa trước mọi mkdir/open của cấp này
+                    self.journal.record_intents([op for _, ops in pending for op in ops])
+                futures = [pool.submit(self._create_chunk, parent_op, ops[start:start + CHUNK_SIZE])
+                           for parent_op, ops in pending
+                           for start in range(0, len(ops), CHUNK_SIZE)]
+                for future in as_completed(futures):
+                    self._dispatch(future.result())
+                if self.journal is not None:
+                    # Mỗi cấp xong là một điểm tiếp tục an toàn
+                    self.journal.flush()
+        return not self.is_cancelled()
+
+    def _pending(self, level):
+        skip = self.skip
+        if not skip:
+            return level
+        pending = []
+        for parent_op, ops in level:
+            ops = [op for op in ops if op not in skip]
+            if ops:
+                pending.append((parent_op, ops))
+        return pending
+
+    def _dispatch(self, chunk):
+        results, stats, existed = chunk
+        if self.journal is not None:
+            self.journal.record_results(results, existed)
+        totals = self.stats
+        totals["mkdir"] += stats[0]
+        totals["file_open"] += stats[1]
+        totals["dir_open"] += stats[2]
+        totals["mkdir_seconds"] += stats[3]
+        totals["file_seconds"] += stats[4]
+        totals["content_bytes"] += stats[5]
+        for op, error in results:
+            if error is None:
+                if self.on_created:
+                    self.on_created(op)
+            elif self.on_error:
+                self.on_error(op, self.path(op), error)
+
+
+class StreamingMaterializer:
+    """Tạo từng nút ngay khi TreeParser đã chốt nút đó (ready), không cần chờ hết đầu vào.
+
+    Dùng cho đầu vào dạng luồng (stdin, tệp lớn): tạo tuần tự theo thứ tự dòng nên
+    cha luôn có trước con, và cha của nút mới luôn nằm trên chuỗi tổ tiên của nút
+    trước. Vì vậy chỉ giữ đường dẫn của chuỗi thư mục đó, theo độ sâu.
+    """
+
+    def __init__(self, tree, output_path, on_created=None, on_error=None, contents=None):
+        self.tree = tree
+        self.output_path = output_path
+        self.on_created = on_created
+        self.on_error = on_error
+        self.contents = contents
+        # Chuỗi (chỉ số thư mục, đường dẫn) từ gốc tới thư mục tạo gần nhất
+        self._dir_stack = [(ROOT, output_path)]
+        self.stats = {"mkdir": 0, "file_open": 0, "dir_open": 0, "content_bytes": 0,
+                      "mkdir_seconds": 0.0, "file_seconds": 0.0}
+        os.makedirs(output_path, exist_ok=True)
+
+    def create(self, index):
+        tree = self.tree
+        stack = self._dir_stack
+        parent = tree.parents[index]
+        # Bỏ các thư mục mà nhánh con đã kết thúc
+        while stack[-1][0] != parent:
+            stack.pop()
+        path = os.path.join(stack[-1][1], tree.names[index])
+        is_dir = tree.is_dir(index)
+        started = time.perf_counter()
+        try:
+            if is_dir:
+                stack.append((index, path))
+                self.stats["mkdir"] += 1
+                os.makedirs(path, exist_ok=True)
+            else:
+                content = None
+                if self.contents is not None:
+                    content = self.contents.for_file(tree.names[index], tree.contents.get(index))
+                self.stats["file_open"] += 1
+                fd = os.open(path, _FILE_FLAGS, 0o666)
+                try:
+                    if content is not None:
+                        self.stats["content_bytes"] += content.write_to(fd)
+                finally:
+                    os.close(fd)
+        except (OSError, TemplateError) as e:
+            if self.on_error:
+                self.on_error(index, path, e)
+            return
+        finally:
+            self.stats["mkdir_seconds" if is_dir else "file_seconds"] += time.perf_counter() - started
+        if self.on_created:
+            self.on_created(index)
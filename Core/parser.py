@@ -0,0 +1,364 @@
+# Core/parser.py
+import os
+import re
+import sys
+from array import array
+
+from .formats import SAMPLE_LINES, InputFormat, detect_format
+from .templates import SPEC_TEXT, parse_directive
+
+# Chỉ số cha của các nút nằm ngay dưới thư mục đầu ra
+ROOT = -1
+
+# Số tên gốc khác nhau tối đa trong bộ đệm làm sạch; đầy thì xóa hết rồi điền lại
+_NAME_CACHE_SIZE = 1 << 14
+
+_PAREN_RE = re.compile(r'\(.*\)')
+_INVALID_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+
+
+def sanitize_name(name):
+    """Bỏ chú thích '#', phần trong ngoặc và thay các ký tự không hợp lệ bằng '_'."""
+    name_no_hash = name.split('#', 1)[0]
+    name_no_paren = _PAREN_RE.sub('', name_no_hash)
+    return _INVALID_CHARS_RE.sub('_', name_no_paren.strip())
+
+
+class ParsedTree:
+    """Bảng nút gọn: mảng chỉ số cha, tên đã intern và bitmap cờ thư mục.
+
+    Nút i có cha parents[i] (ROOT nếu nằm ngay dưới thư mục đầu ra); cha luôn
+    đứng trước con nên duyệt theo chỉ số tăng dần là thứ tự tạo hợp lệ.
+    """
+    __slots__ = ("parents", "names", "dir_bits", "line_nums", "contents", "originals", "warnings",
+                 "total_lines", "skipped")
+
+    def __init__(self):
+        self.parents = array('i')
+        self.names = []
+        self.dir_bits = bytearray()
+        # Số dòng (từ 1) của từng nút; 0 khi đầu vào không có dòng (JSON được đọc cả khối)
+        self.line_nums = array('I')
+        # Chỉ thị nội dung (loại, giá trị) của các tệp có "# @template/@copy/@text"
+        self.contents = {}
+        # Tên như đã viết (bỏ chú thích '#') của các nút mà sanitize_name đã đổi tên
+        self.originals = {}
+        # Số dòng có cấu trúc thụt lề bất thường (warn_indent), theo thứ tự gặp
+        self.warnings = []
+        self.total_lines = 0
+        # Số dòng có nội dung nhưng tên rỗng sau khi làm sạch
+        self.skipped = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_dir(self, index):
+        return bool(self.dir_bits[index >> 3] & (1 << (index & 7)))
+
+    def _append(self, parent, name, is_dir, line_num, content=None, original=None):
+        index = len(self.names)
+        if index & 7 == 0:
+            self.dir_bits.append(0)
+        if is_dir:
+            self.dir_bits[index >> 3] |= 1 << (index & 7)
+        self.parents.append(parent)
+        self.names.append(name)
+        self.line_nums.append(line_num)
+        if content is not None and not is_dir:
+            self.contents[index] = content
+        if original is not None:
+            self.originals[index] = original
+        return index
+
+    def _set_dir(self, index):
+        self.dir_bits[index >> 3] |= 1 << (index & 7)
+        self.contents.pop(index, None)
+
+    def path_parts(self, index):
+        parts = []
+        while index != ROOT:
+            parts.append(self.names[index])
+            index = self.parents[index]
+        parts.reverse()
+        return parts
+
+    def rel_path(self, index):
+        return os.path.join(*self.path_parts(index))
+
+
+class TreeParser:
+    """Phân tích văn bản cây thư mục thành ParsedTree trong một lượt tuyến tính.
+
+    Có thể nạp từng dòng qua feed_line() (dùng cho đầu vào dạng luồng) rồi gọi
+    close() để lấy kết quả, hoặc dùng TreeParser.parse(text) cho cả khối văn bản.
+
+    input_format là tên định dạng trong Core.formats, một InputFormat đã cấu hình,
+    hoặc None để tự đoán. Khi chưa có InputFormat, SAMPLE_LINES dòng đầu được giữ
+    lại làm mẫu rồi mới phân tích; không dòng nào bị quét hai lần.
+    """
+
+    def __init__(self, input_format=None):
+        self.tree = ParsedTree()
+        self.format = None
+        self._format_name = None
+        if isinstance(input_format, InputFormat):
+            self._use_format(input_format)
+        else:
+            self._format_name = input_format
+        # Các dòng đang chờ đủ mẫu để đoán định dạng (hoặc cả văn bản với JSON)
+        self._pending = []
+        # Ngăn xếp chỉ số thư mục theo cấp; phần tử 0 là thư mục đầu ra
+        self._stack = [ROOT]
+        # Với danh sách đường dẫn: chuỗi thư mục hiện tại dạng (tên, chỉ số)
+        self._path_stack = []
+        self._name_cache = {}
+        self._line_num = 0
+        self._base_level = 0
+        self._started = False
+        self._closed = False
+
+    @classmethod
+    def parse(cls, text, input_format=None):
+        parser = cls(input_format)
+        parser.feed(text.split('\n'))
+        return parser.close()
+
+    @property
+    def ready(self):
+        """Số nút đầu tiên đã chốt, có thể tạo ngay khi đọc dạng luồng.
+
+        Khi thư mục không được đánh dấu bằng '/', nút cuối cùng có thể còn trở
+        thành thư mục nếu dòng sau là con của nó nên chưa được tính.
+        """
+        count = len(self.tree)
+        if count and not self._closed and self._implicit_dirs:
+            return count - 1
+        return count
+
+    @property
+    def base_level(self):
+        """1 khi dòng đầu là gốc "." của `tree` (các mục bên dưới mới là cấp 0)."""
+        return self._base_level
+
+    def resume(self, tree, lexed, base_level):
+        """Tiếp tục sau các nút đã có của tree, như thể vừa nạp xong các dòng lexed.
+
+        lexed là kết quả lex() của các dòng đã tạo ra tree, base_level là của lần
+        phân tích đó. Ngăn xếp thư mục được dựng lại từ chuỗi tổ tiên của nút cuối
+        nên chỉ tốn theo độ sâu; dùng khi giữ phần đầu của một cây cũ và chỉ phân
+        tích lại phần sau (Core/watch.py).
+        """
+        self.tree = tree
+        self._line_num = len(lexed)
+        self._started = any(entry is not None for entry in lexed)
+        self._base_level = base_level if self._started else 0
+        if not len(tree):
+            return
+        last = len(tree) - 1
+        chain = [last] if tree.is_dir(last) else []
+        node = tree.parents[last]
+        while node != ROOT:
+            chain.append(node)
+            node = tree.parents[node]
+        chain.reverse()
+        if self._paths:
+            self._path_stack = [((tree.names[node], tree.originals.get(node)), node) for node in chain]
+            return
+        first = next(index for index, entry in enumerate(lexed) if entry is not None)
+
+        def level(node):
+            line = tree.line_nums[node] - 1
+            prefix_len = lexed[line][0] - (lexed[line][1] if line == first else 0)
+            return max(prefix_len // self._width - base_level, 0)
+
+        stack = [ROOT]
+        for node in chain:
+            while len(stack) <= level(node):
+                stack.append(stack[-1])
+            stack.append(node)
+        if not tree.is_dir(last):
+            while len(stack) <= level(last):
+                stack.append(stack[-1])
+        self._stack = stack
+
+    def feed(self, lines):
+        feed_line = self.feed_line
+        for line in lines:
+            feed_line(line)
+
+    def feed_line(self, line):
+        """Nạp một dòng; các nút đã chốt được báo qua thuộc tính ready."""
+        self._line_num += 1
+        if self.format is None or self.format.whole_text:
+            self._pending.append(line)
+            if self.format is None and len(self._pending) >= SAMPLE_LINES:
+                self._detect()
+            return
+        lexed = self.lex(line)
+        if lexed is not None:
+            self.add_lexed(lexed, self._line_num)
+
+    def _use_format(self, fmt):
+        self.format = fmt
+        # Chép ra thuộc tính riêng để add_lexed() không phải tra qua self.format mỗi dòng
+        self._width = fmt.width
+        self._implicit_dirs = not fmt.explicit_dirs
+        self._paths = fmt.paths
+        self._split = fmt.split
+
+    def _detect(self):
+        self._use_format(detect_format(self._pending, self._format_name))
+        if self.format.whole_text:
+            return
+        pending, self._pending = self._pending, []
+        lex, add_lexed = self.lex, self.add_lexed
+        for line_num, line in enumerate(pending, self._line_num - len(pending) + 1):
+            lexed = lex(line)
+            if lexed is not None:
+                add_lexed(lexed, line_num)
+
+    def _clean(self, raw_name):
+        cache = self._name_cache
+        cached = cache.get(raw_name)
+        if cached is None:
+            clean = sys.intern(sanitize_name(raw_name))
+            original = raw_name.split('#', 1)[0].strip()
+            cached = clean, parse_directive(raw_name), original if original != clean else None
+            if len(cache) >= _NAME_CACHE_SIZE:
+                cache.clear()
+            cache[raw_name] = cached
+        return cached
+
+    def lex(self, line):
+        """Tách một dòng thành (độ dài tiền tố, độ dài thụt lề đầu, tên đã làm sạch,
+        chỉ thị nội dung hoặc None, tên gốc nếu bị làm sạch đổi hoặc None, là thư mục).
+
+        Với danh sách đường dẫn, phần tử đầu là bộ (tên đã làm sạch, tên gốc) của
+        các thư mục cha và phần tử thứ hai luôn là 0. Kết quả chỉ phụ thuộc vào nội dung dòng (và định dạng)
+        nên có thể lưu lại và dùng lại khi chỉ một phần văn bản thay đổi. Trả về
+        None với dòng trống hoặc dòng mà định dạng bỏ qua.
+        """
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+        if not stripped or stripped[0] == '`' and stripped.startswith('```'):
+            return None
+        if self._paths:
+            return self._lex_path(line)
+
+        split = self._split(line)
+        if split is None:
+            return None
+        prefix_len, indent_len, name_part = split
+
+        is_dir = name_part.endswith('/')
+        raw_name = name_part.rstrip('/') if is_dir else name_part
+        cached = self._name_cache.get(raw_name)
+        if cached is None:
+            cached = self._clean(raw_name)
+        return (prefix_len, indent_len) + cached + (is_dir,)
+
+    def _lex_path(self, line):
+        body, sep, comment = line.partition('#')
+        path = body.strip().replace('\\', '/')
+        is_dir = path.endswith('/')
+        parts = [part for part in path.split('/') if part not in ('', '.', '..')]
+        if not parts:
+            return None
+        clean = self._clean
+        parents = tuple(clean(part)[0::2] for part in parts[:-1])
+        return (parents, 0) + clean(parts[-1] + sep + comment) + (is_dir,)
+
+    def add_lexed(self, lexed, line_num):
+        """Thêm một dòng đã qua lex() vào cây; trả về chỉ số nút hoặc None."""
+        if self._paths:
+            return self._add_path(lexed, line_num)
+        prefix_len, indent_len, clean_name, content, original, is_dir = lexed
+        if not self._started:
+            # Dòng đầu tiên luôn là cấp 0, kể cả khi bị thụt lề khi dán
+            self._started = True
+            prefix_len -= indent_len
+            if clean_name == '.':
+                # Gốc "." của `tree`: các mục bên dưới mới là cấp 0
+                self._base_level = 1
+                return None
+        if not clean_name:
+            self.tree.skipped += 1
+            return None
+        level = prefix_len // self._width - self._base_level
+        if level < 0:
+            level = 0
+
+        tree = self.tree
+        stack = self._stack
+        if level == len(stack) and self._implicit_dirs:
+            # Mục vừa thêm có con nên là thư mục
+            last = len(tree) - 1
+            if last >= 0 and tree.parents[last] == stack[-1] and not tree.is_dir(last):
+                tree._set_dir(last)
+                stack.append(last)
+        while level >= len(stack):
+            tree.warnings.append(line_num)
+            stack.append(stack[-1])
+        del stack[level + 1:]
+
+        index = tree._append(stack[level], clean_name, is_dir, line_num, content, original)
+        if is_dir:
+            stack.append(index)
+        return index
+
+    def _add_path(self, lexed, line_num):
+        parents, _, clean_name, content, original, is_dir = lexed
+        if not clean_name:
+            self.tree.skipped += 1
+            return None
+        tree = self.tree
+        path_stack = self._path_stack
+        common = 0
+        for (key, _), part in zip(path_stack, parents):
+            if key != part:
+                break
+            common += 1
+        del path_stack[common:]
+        for part, part_original in parents[common:]:
+            parent = path_stack[-1][1] if path_stack else ROOT
+            last = len(tree) - 1
+            if (last >= 0 and tree.names[last] == part and tree.parents[last] == parent
+                    and tree.originals.get(last) == part_original):
+                # "src" rồi "src/main.py": mục trước đó thực ra là thư mục
+                if not tree.is_dir(last):
+                    tree._set_dir(last)
+                index = last
+            else:
+                index = tree._append(parent, part, True, line_num, original=part_original)
+            path_stack.append(((part, part_original), index))
+
+        index = tree._append(path_stack[-1][1] if path_stack else ROOT, clean_name, is_dir, line_num, content,
+                             original)
+        if is_dir:
+            path_stack.append(((clean_name, original), index))
+        return index
+
+    def _add_json(self, text):
+        """Dựng cây từ JSON lồng nhau; chuỗi con trở thành nội dung @text của tệp."""
+        width = self.format.width
+        add_lexed = self.add_lexed
+        for depth, name, is_dir, text_value in self.format.entries(text):
+            clean_name, content, original = self._clean(name)
+            if text_value is not None:
+                content = SPEC_TEXT, text_value
+            add_lexed((depth * width, 0, clean_name, content, original, is_dir), 0)
+
+    def close(self, total_lines=None):
+        """Kết thúc đầu vào; ValueError nếu văn bản JSON không hợp lệ."""
+        if self.format is None:
+            self._detect()
+        if self.format.whole_text:
+            pending, self._pending = self._pending, []
+            self._add_json('\n'.join(pending))
+        self._closed = True
+        self.tree.total_lines = self._line_num if total_lines is None else total_lines
+        self._name_cache = {}
+        self._stack = [ROOT]
+        self._path_stack = []
+        self._started = False
+        return self.tree
@@ -0,0 +1,127 @@
+# Core/planner.py
+import os
+from array import array
+
+from .parser import ROOT
+
+# Có thể tạo nút tương đối với fd của thư mục cha (POSIX) hay phải dùng đường dẫn đầy đủ
+SUPPORTS_DIR_FD = os.mkdir in os.supports_dir_fd and os.open in os.supports_dir_fd
+
+# Số op tối đa trong một tác vụ của trình thực thi; mỗi tác vụ mở thư mục cha một lần
+CHUNK_SIZE = 256
+
+
+class BuildPlan:
+    """Kế hoạch thực thi được biên dịch từ ParsedTree trước khi chạm vào đĩa.
+
+    Mỗi thao tác (op) là một mkdir hoặc một lần tạo tệp. Đường dẫn trùng lặp được
+    gộp lại: thư mục lặp lại dùng chung một op, tệp lặp lại bị bỏ. Các op được
+    nhóm theo (cấp, thư mục cha) để trình thực thi chỉ mở thư mục cha một lần cho
+    cả nhóm con thay vì phân giải lại đường dẫn từ gốc cho mỗi nút.
+    """
+    __slots__ = ("parents", "names", "dir_bits", "nodes", "levels", "dir_paths", "contents", "duplicates")
+
+    def __init__(self):
+        self.parents = array('i')
+        self.names = []
+        self.dir_bits = bytearray()
+        # Chỉ số nút đầu tiên trong ParsedTree ứng với mỗi op, dùng để báo cáo
+        self.nodes = array('i')
+        # levels[d] là danh sách (op cha, [op con]) của các op ở độ sâu d
+        self.levels = []
+        # Đường dẫn tương đối của các op thư mục (tệp không cần lưu đường dẫn)
+        self.dir_paths = {ROOT: ""}
+        # Chỉ thị nội dung theo op tệp (xem ParsedTree.contents); tệp trùng giữ chỉ thị đầu tiên
+        self.contents = {}
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_dir(self, op):
+        return bool(self.dir_bits[op >> 3] & (1 << (op & 7)))
+
+    def rel_path(self, op):
+        if self.is_dir(op):
+            return self.dir_paths[op]
+        return os.path.join(self.dir_paths[self.parents[op]], self.names[op])
+
+    @classmethod
+    def compile(cls, tree):
+        plan = cls()
+        # (op cha, tên, là thư mục) -> op, để phát hiện đường dẫn trùng
+        seen = {}
+        node_to_op = {ROOT: ROOT}
+        depths = {ROOT: -1}
+        groups = {}
+        names = tree.names
+        parents = tree.parents
+        contents = tree.contents
+        join = os.path.join
+
+        for i in range(len(tree)):
+            parent_op = node_to_op[parents[i]]
+            is_dir = tree.is_dir(i)
+            key = (parent_op, names[i], is_dir)
+            op = seen.get(key)
+            if op is not None:
+                plan.duplicates += 1
+                if is_dir:
+                    node_to_op[i] = op
+                continue
+
+            op = len(plan.names)
+            if op & 7 == 0:
+                plan.dir_bits.append(0)
+            plan.parents.append(parent_op)
+            plan.names.append(names[i])
+            plan.nodes.append(i)
+            seen[key] = op
+            if contents and i in contents:
+                plan.contents[op] = contents[i]
+
+            depth = depths[parent_op] + 1
+            if depth == len(plan.levels):
+                plan.levels.append([])
+            group = groups.get(parent_op)
+            if group is None:
+                group = groups[parent_op] = []
+                plan.levels[depth].append((parent_op, group))
+            group.append(op)
+
+            if is_dir:
+                plan.dir_bits[op >> 3] |= 1 << (op & 7)
+                node_to_op[i] = op
+                depths[op] = depth
+                plan.dir_paths[op] = join(plan.dir_paths[parent_op], names[i])
+        return plan
+
+    def syscall_counts(self, use_dir_fd=SUPPORTS_DIR_FD):
+        """Số syscall trình thực thi sẽ phát ra (không tính lỗi và thư mục đã tồn tại)."""
+        mkdirs = sum(bin(b).count("1") for b in self.dir_bits)
+        files = len(self) - mkdirs
+        dir_opens = 0
+        if use_dir_fd:
+            dir_opens = sum(-(-len(ops) // CHUNK_SIZE) for level in self.levels for _, ops in level)
+        return {
+            "mkdir": mkdirs,
+            "open": files + dir_opens,
+            "close": files + dir_opens,
+            "stat": 0,
+        }
+
+
+def baseline_syscall_counts(tree):
+    """Ước lượng syscall của cách làm cũ: os.makedirs cho mỗi thư mục và cho cha của mỗi tệp.
+
+    os.makedirs(exist_ok=True) kiểm tra cha bằng stat rồi gọi mkdir; khi thư mục
+    đã tồn tại, mkdir thất bại và thêm một stat để xác nhận đó là thư mục.
+    """
+    dirs = sum(1 for i in range(len(tree)) if tree.is_dir(i))
+    files = len(tree) - dirs
+    return {
+        "mkdir": dirs + files,
+        "open": files,
+        "close": files,
+        "stat": dirs + 2 * files,
+    }
@@ -0,0 +1,269 @@
+# Core/preview.py
+from bisect import bisect_left
+
+from PySide6.QtCore import Qt, QObject, Signal, Slot, QAbstractItemModel, QModelIndex
+
+from .ingest import TreeFile
+from .parser import TreeParser, ParsedTree, ROOT
+from .validator import validate_tree
+from .watch import SplicingParser, nodes_at, splice_issues
+
+# Số hàng con được nạp mỗi lần view yêu cầu thêm (fetchMore)
+FETCH_BATCH = 500
+
+
+class PreviewResult:
+    """Kết quả phân tích cho khung xem trước: cây, các vấn đề và danh sách con của các nút đã mở.
+
+    Danh sách con chỉ được tính khi view cần (nút được mở), bằng một lượt quét
+    nhánh con của nút đó: mọi định dạng đặt nhánh con liền ngay sau nút.
+    """
+    __slots__ = ("tree", "format_name", "error", "issues", "dir_count", "path", "base_tree", "splice",
+                 "_children")
+
+    def __init__(self, tree, format_name=None, error=None, path=None, issues=None, base_tree=None, splice=None):
+        self.tree = tree
+        self.format_name = format_name
+        # Tệp cây đã đọc (None khi cây đến từ ô soạn thảo)
+        self.path = path
+        # Lỗi đọc cả khối (JSON không hợp lệ); khi đó cây rỗng
+        self.error = error
+        # Tên va chạm tìm được khi kiểm tra trước (chưa biết nơi nhận nên không xét độ dài)
+        self.issues = validate_tree(tree) if issues is None else issues
+        self.dir_count = bin(int.from_bytes(tree.dir_bits, "little")).count("1")
+        # Cây của kết quả trước và Splice từ nó sang tree (None khi đã phân tích lại toàn bộ)
+        self.base_tree = base_tree
+        self.splice = splice
+        self._children = {}
+
+    def has_children(self, node):
+        if node == ROOT:
+            return len(self.tree) > 0
+        parents = self.tree.parents
+        return node + 1 < len(parents) and parents[node + 1] == node
+
+    def children(self, node):
+        """Các nút con của node theo thứ tự, tính một lần cho mỗi nút."""
+        children = self._children.get(node)
+        if children is None:
+            children = []
+            parents = self.tree.parents
+            # Nút đầu tiên sau nhánh con có cha đứng trước node
+            for child in range(node + 1, len(parents)):
+                parent = parents[child]
+                if parent == node:
+                    children.append(child)
+                elif parent < node:
+                    break
+            self._children[node] = children
+        return children
+
+    def row(self, node):
+        return bisect_left(self.children(self.tree.parents[node]), node)
+
+
+class PreviewParseWorker(QObject):
+    """Phân tích lại văn bản cho khung xem trước trên một luồng nền.
+
+    Mỗi yêu cầu chỉ mang các đoạn dòng đã thay đổi (vị trí, số dòng cũ, các dòng
+    mới). SplicingParser (Core/watch.py) chỉ lex và dựng lại đoạn đã đổi rồi nối
+    phần còn lại của cây cũ; các vấn đề tên cũng chỉ được kiểm tra lại ở những
+    nhóm anh em mà đoạn đó chạm tới (splice_issues).
+    """
+    parsed = Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        self._lines = []
+        self._parser = SplicingParser()
+        self._issues = []
+
+    @Slot(list)
+    def apply_edits(self, edits):
+        lines = self._lines
+        for start, old_count, new_lines in edits:
+            lines[start:start + old_count] = new_lines
+        parser = self._parser
+        old = parser.tree
+        try:
+            splice = parser.parse(lines)
+        except ValueError as e:
+            self.parsed.emit(PreviewResult(ParsedTree(), parser.format.name, e))
+            return
+        tree = parser.tree
+        if splice is None:
+            self._issues = validate_tree(tree)
+        else:
+            self._issues = splice_issues(old, self._issues, tree, splice)
+        self.parsed.emit(PreviewResult(tree, parser.format.name, issues=self._issues, base_tree=old, splice=splice))
+
+    @Slot(str)
+    def load_file(self, path):
+        """Phân tích cả một tệp cây (Core/ingest.py) cho khung xem trước, không giữ các dòng."""
+        parser = TreeParser()
+        try:
+            parser.feed(TreeFile(path))
+            tree = parser.close()
+        except (OSError, ValueError) as e:
+            self.parsed.emit(PreviewResult(ParsedTree(), error=e, path=path))
+            return
+        self.parsed.emit(PreviewResult(tree, parser.format.name, path=path))
+
+
+def _node_mapper(old, new):
+    """Hàm đổi nút của old.tree sang nút tương ứng của new.tree (None nếu không còn).
+
+    Khi new được ghép từ old (new.splice), nút trước đoạn đã đổi giữ chỉ số, nút
+    sau nó dời đi một khoảng cố định; các nút còn lại được tìm theo đường dẫn.
+    """
+    old_tree, tree = old.tree, new.tree
+
+    def by_path(node):
+        if node == ROOT:
+            return ROOT
+        same_path = nodes_at(tree, old_tree.rel_path(node))
+        is_dir = old_tree.is_dir(node)
+        return next((other for other in same_path if tree.is_dir(other) == is_dir),
+                    same_path[0] if same_path else None)
+
+    splice = new.splice
+    if splice is None or new.base_tree is not old_tree:
+        return by_path
+    shift = splice.new_rest - splice.old_rest
+
+    def mapped(node):
+        if node < splice.pre:
+            return node
+        if node >= splice.old_rest:
+            return node + shift
+        return by_path(node)
+    return mapped
+
+
+class TreePreviewModel(QAbstractItemModel):
+    """Mô hình cây lười: hàng con chỉ được tạo khi nút được mở (canFetchMore/fetchMore).
+
+    internalId của một chỉ mục là chỉ số nút + 1 (0 dành cho gốc ảo). Kết quả
+    mới của cùng nguồn không đặt lại mô hình: các nút đã nạp con và chỉ mục bền
+    của view (nút đang mở, đang chọn) được chuyển sang nút tương ứng của cây mới.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._result = None
+        # Số hàng con đã nạp của từng nút đã mở (ROOT dùng khóa -1)
+        self._loaded = {}
+
+    def set_result(self, result):
+        """Thay kết quả; trả về True nếu mô hình bị đặt lại (mọi nút đóng lại)."""
+        old = self._result
+        if (old is None or result is None or result.path != old.path or old.error is not None
+                or result.error is not None or not len(old.tree) or not len(result.tree)):
+            self.beginResetModel()
+            self._result = result
+            self._loaded = {}
+            self.endResetModel()
+            return True
+
+        self.layoutAboutToBeChanged.emit()
+        node_map = _node_mapper(old, result)
+        loaded = {}
+        for node, count in self._loaded.items():
+            new_node = node_map(node)
+            if new_node is None:
+                continue
+            old_total = len(old.children(node))
+            new_total = len(result.children(new_node))
+            # Danh sách đã nạp hết vẫn nạp hết khi có thêm con
+            count = min(new_total, count + max(0, new_total - old_total))
+            if count > loaded.get(new_node, 0):
+                loaded[new_node] = count
+        old_indexes = self.persistentIndexList()
+        new_indexes = []
+        parents = result.tree.parents
+        self._result = result
+        for index in old_indexes:
+            new_node = node_map(index.internalId() - 1)
+            if new_node is None:
+                new_indexes.append(QModelIndex())
+                continue
+            # Nút và tổ tiên của nó phải nằm trong các hàng đã nạp
+            node = new_node
+            while node != ROOT:
+                parent = parents[node]
+                row = result.row(node)
+                if loaded.get(parent, 0) <= row:
+                    loaded[parent] = row + 1
+                node = parent
+            new_indexes.append(self.createIndex(result.row(new_node), index.column(), new_node + 1))
+        self._loaded = loaded
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+        return False
+
+    def _node(self, index):
+        return index.internalId() - 1 if index.isValid() else ROOT
+
+    def index(self, row, column, parent=QModelIndex()):
+        if self._result is None or column != 0:
+            return QModelIndex()
+        node = self._node(parent)
+        if row < 0 or row >= self._loaded.get(node, 0):
+            return QModelIndex()
+        return self.createIndex(row, 0, self._result.children(node)[row] + 1)
+
+    def parent(self, index):
+        if not index.isValid() or self._result is None:
+            return QModelIndex()
+        parent = self._result.tree.parents[index.internalId() - 1]
+        if parent == ROOT:
+            return QModelIndex()
+        return self.createIndex(self._result.row(parent), 0, parent + 1)
+
+    def rowCount(self, parent=QModelIndex()):
+        if self._result is None or parent.column() > 0:
+            return 0
+        return self._loaded.get(self._node(parent), 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if self._result is None:
+            return False
+        return self._result.has_children(self._node(parent))
+
+    def canFetchMore(self, parent):
+        if self._result is None:
+            return False
+        node = self._node(parent)
+        return self._loaded.get(node, 0) < len(self._result.children(node))
+
+    def fetchMore(self, parent):
+        if self._result is None:
+            return
+        node = self._node(parent)
+        fetched = self._loaded.get(node, 0)
+        count = min(FETCH_BATCH, len(self._result.children(node)) - fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(parent, fetched, fetched + count - 1)
+        self._loaded[node] = fetched + count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self._result is None:
+            return None
+        node = index.internalId() - 1
+        tree = self._result.tree
+        if role == Qt.ItemDataRole.DisplayRole:
+            return tree.names[node] + ("/" if tree.is_dir(node) else "")
+        if role == Qt.ItemDataRole.ToolTipRole:
+            # Nút của đầu vào JSON không có số dòng (0)
+            line = tree.line_nums[node]
+            content = tree.contents.get(node)
+            if content is None:
+                return f"#{line}" if line else None
+            text = f"@{content[0]} {content[1][:80]!r}"
+            return f"#{line} {text}" if line else text
+        return None
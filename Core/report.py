@@ -0,0 +1,102 @@
+# Core/report.py
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+
+
+class RunReport:
+    """Thời gian theo từng giai đoạn và bộ đếm của một lần tạo cây.
+
+    Giai đoạn được đo bằng phase(); các bộ đếm cộng dồn qua count(). Thời gian
+    của mkdir/tạo tệp được cộng trên mọi luồng của pool nên có thể lớn hơn thời
+    gian thực của giai đoạn "create".
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+        self.errors_by_type = {}
+        self.started = time.time()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def error(self, error):
+        name = type(error).__name__
+        self.errors_by_type[name] = self.errors_by_type.get(name, 0) + 1
+
+    def as_dict(self):
+        return {
+            "started": self.started,
+            "phases": dict(self.phases),
+            "counters": dict(self.counters),
+            "errors_by_type": dict(self.errors_by_type),
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+def record_materializer_stats(report, stats):
+    """Chép bộ đếm syscall và thời gian cộng dồn của Materializer vào báo cáo."""
+    report.count("mkdirs", stats["mkdir"])
+    report.count("file_opens", stats["file_open"])
+    report.count("dir_opens", stats["dir_open"])
+    report.count("content_bytes", stats["content_bytes"])
+    report.add_time("mkdir_threads", stats["mkdir_seconds"])
+    report.add_time("file_threads", stats["file_seconds"])
+
+
+def record_journal_stats(report, journal):
+    """Chi phí ghi nhật ký thao tác (BuildJournal), để so với thời gian tạo trên đĩa."""
+    report.count("journal_records", journal.records)
+    report.count("journal_bytes", journal.bytes_written)
+    report.add_time("journal_writes", journal.write_seconds)
+
+
+def record_cache_stats(report, cache):
+    """Trúng/trượt và số byte của bộ nhớ đệm phân tích (TreeCache)."""
+    report.count("cache_hits", cache.hits)
+    report.count("cache_misses", cache.misses)
+    report.count("cache_bytes_read", cache.bytes_read)
+    report.count("cache_bytes_written", cache.bytes_written)
+
+
+def format_report(report, translations):
+    """Các dòng tóm tắt dễ đọc của một báo cáo (dạng dict) cho bảng nhật ký."""
+    phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in report["phases"].items())
+    counters = ", ".join(f"{name}={value}" for name, value in report["counters"].items())
+    lines = [translations.get("log_report_phases", phases=phases or "-"),
+             translations.get("log_report_counters", counters=counters or "-")]
+    if report["errors_by_type"]:
+        errors = ", ".join(f"{name}={value}" for name, value in report["errors_by_type"].items())
+        lines.append(translations.get("log_report_errors", errors=errors))
+    return lines
+
+
+@contextmanager
+def profiled(path):
+    """Chạy khối lệnh dưới cProfile và ghi kết quả ra path; path rỗng thì không làm gì."""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
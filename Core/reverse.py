@@ -0,0 +1,155 @@
+# Core/reverse.py
+# Chiều ngược lại: sinh văn bản cây (├──/└──) từ một thư mục có sẵn, đúng định dạng
+# mà TreeParser đọc được để có thể sửa rồi áp dụng lại.
+import fnmatch
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .materializer import default_workers
+from .parser import sanitize_name
+
+BRANCH = "├── "
+LAST_BRANCH = "└── "
+PIPE = "│   "
+SPACE = "    "
+
+# Tiền tố ký tự vẽ cây/khoảng trắng mà TreeParser bỏ khỏi đầu tên
+_LINE_RE = re.compile(r'^(?P<prefix>[│├└─\s]*)(?P<name>.*)')
+
+
+class IgnoreRules:
+    """Tập mẫu bỏ qua kiểu .gitignore (rút gọn).
+
+    Hỗ trợ glob trên tên (`*.pyc`), mẫu có '/' so với đường dẫn tương đối
+    (`build/out`, `/dist`), hậu tố '/' chỉ áp dụng cho thư mục và tiền tố '!' để
+    loại trừ lại. Mẫu khớp sau cùng quyết định, giống git.
+    """
+
+    def __init__(self, patterns=()):
+        self._rules = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add_file(self, path):
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for pattern in f:
+                self.add(pattern)
+
+    def add(self, pattern):
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith("#"):
+            return
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        regex = re.compile(fnmatch.translate(pattern.lstrip("/")))
+        self._rules.append((regex, negate, dir_only, anchored))
+
+    def __bool__(self):
+        return bool(self._rules)
+
+    def ignored(self, rel_path, name, is_dir):
+        result = False
+        for regex, negate, dir_only, anchored in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path if anchored else name):
+                result = not negate
+        return result
+
+
+def is_lossless_name(name):
+    """Tên có đi qua TreeParser mà không bị đổi hay không."""
+    if sanitize_name(name) != name:
+        return False
+    match = _LINE_RE.match(name)
+    return not match.group("prefix") and not name.endswith("/")
+
+
+class TreeTextGenerator:
+    """Duyệt thư mục bằng os.scandir song song và sinh từng dòng văn bản cây.
+
+    Khi bước vào một thư mục, danh sách của mọi thư mục con được gửi vào thread
+    pool ngay, nên trong lúc dòng của con đầu tiên đang được sinh thì các con còn
+    lại đã được quét sẵn. Bộ nhớ chỉ tỉ lệ với độ sâu nhân số anh em, không phải
+    kích thước cây; đầu ra được phát từng dòng qua write().
+    """
+
+    def __init__(self, root, max_depth=None, ignore=None, include_root=True,
+                 dirs_first=False, max_workers=None, on_lossy=None):
+        self.root = os.path.abspath(root)
+        self.max_depth = max_depth
+        self.ignore = ignore or IgnoreRules()
+        self.include_root = include_root
+        self.dirs_first = dirs_first
+        self.max_workers = max_workers or default_workers()
+        # Gọi với đường dẫn tương đối của các tên sẽ bị TreeParser làm sạch khác đi
+        self.on_lossy = on_lossy
+
+    def _list(self, rel_dir):
+        entries = []
+        ignore = self.ignore
+        try:
+            with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                for entry in it:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    if ignore and ignore.ignored(rel_path.replace(os.sep, "/"), entry.name, is_dir):
+                        continue
+                    entries.append((entry.name, is_dir, rel_path))
+        except OSError:
+            return []
+        if self.dirs_first:
+            entries.sort(key=lambda e: (not e[1], e[0]))
+        else:
+            entries.sort()
+        return entries
+
+    def lines(self):
+        """Sinh từng dòng (không có ký tự xuống dòng)."""
+        max_depth = self.max_depth
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            def expand(entries, depth):
+                # depth là độ sâu của chính các mục này (0 = ngay dưới thư mục gốc)
+                if max_depth is not None and depth + 1 >= max_depth:
+                    return [(entry, None) for entry in entries]
+                return [(entry, pool.submit(self._list, entry[2]) if entry[1] else None)
+                        for entry in entries]
+
+            base = 0
+            if self.include_root:
+                yield os.path.basename(self.root.rstrip(os.sep)) + "/"
+                base = 1
+            # Mỗi khung: [danh sách con, vị trí kế tiếp, tiền tố cho cấp con]
+            stack = [[expand(self._list(""), 0), 0, ""]]
+            while stack:
+                frame = stack[-1]
+                children, position, prefix = frame
+                if position == len(children):
+                    stack.pop()
+                    continue
+                frame[1] = position + 1
+                (name, is_dir, rel_path), future = children[position]
+                if self.on_lossy and not is_lossless_name(name):
+                    self.on_lossy(rel_path)
+                is_last = position + 1 == len(children)
+                if len(stack) - 1 + base == 0:
+                    connector, child_prefix = "", ""
+                else:
+                    connector = LAST_BRANCH if is_last else BRANCH
+                    child_prefix = prefix + (SPACE if is_last else PIPE)
+                yield prefix + connector + name + ("/" if is_dir else "")
+                if future is not None:
+                    stack.append([expand(future.result(), len(stack)), 0, child_prefix])
+
+    def write_to(self, stream):
+        count = 0
+        for line in self.lines():
+            stream.write(line)
+            stream.write("\n")
+            count += 1
+        return count
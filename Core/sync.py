@@ -0,0 +1,108 @@
+# Core/sync.py
+import os
+import shutil
+
+from .parser import ROOT
+
+
+class SyncReport:
+    """Chênh lệch giữa một BuildPlan và thư mục đầu ra hiện có."""
+    __slots__ = ("missing", "extras", "conflicts", "existing", "scanned_dirs")
+
+    def __init__(self):
+        # Các op chưa có trên đĩa, theo thứ tự của kế hoạch
+        self.missing = []
+        # (đường dẫn tương đối, là thư mục) của các mục có trên đĩa nhưng không có trong cây
+        self.extras = []
+        # Các op có trên đĩa nhưng sai loại (tệp thay vì thư mục hoặc ngược lại)
+        self.conflicts = []
+        # Tập op đã tồn tại đúng loại; trình thực thi sẽ bỏ qua các op này
+        self.existing = set()
+        self.scanned_dirs = 0
+
+
+def _children_by_parent(plan):
+    children = {}
+    for level in plan.levels:
+        for parent_op, ops in level:
+            children[parent_op] = ops
+    return children
+
+
+def diff_tree(plan, output_path):
+    """So sánh kế hoạch với đĩa bằng một lần os.scandir cho mỗi thư mục đã tồn tại.
+
+    Thư mục còn thiếu không được quét: mọi con của nó chắc chắn cũng thiếu.
+    Thư mục thừa không được duyệt sâu, chỉ báo cáo ở cấp cao nhất.
+    """
+    report = SyncReport()
+    children = _children_by_parent(plan)
+    names = plan.names
+    pending = [ROOT]
+
+    if not os.path.isdir(output_path):
+        report.missing.extend(range(len(plan)))
+        return report
+
+    while pending:
+        parent_op = pending.pop()
+        rel_dir = plan.dir_paths[parent_op]
+        on_disk = {}
+        try:
+            with os.scandir(os.path.join(output_path, rel_dir)) as it:
+                for entry in it:
+                    on_disk[entry.name] = entry.is_dir()
+        except OSError:
+            pass
+        report.scanned_dirs += 1
+
+        expected = set()
+        for op in children.get(parent_op, ()):
+            name = names[op]
+            expected.add(name)
+            disk_is_dir = on_disk.get(name)
+            if disk_is_dir is None:
+                _mark_missing(op, children, report)
+            elif disk_is_dir != plan.is_dir(op):
+                report.conflicts.append(op)
+                _mark_missing(op, children, report)
+            else:
+                report.existing.add(op)
+                if disk_is_dir:
+                    pending.append(op)
+
+        for name, is_dir in on_disk.items():
+            if name not in expected:
+                report.extras.append((os.path.join(rel_dir, name), is_dir))
+
+    report.missing.sort()
+    return report
+
+
+def _mark_missing(op, children, report):
+    stack = [op]
+    while stack:
+        current = stack.pop()
+        report.missing.append(current)
+        stack.extend(children.get(current, ()))
+
+
+def prune(report, plan, output_path, on_removed=None, on_error=None):
+    """Xóa các mục thừa và các mục sai loại để chúng được tạo lại đúng."""
+    targets = list(report.extras)
+    targets.extend((plan.rel_path(op), not plan.is_dir(op)) for op in report.conflicts)
+    removed = 0
+    for rel_path, is_dir in targets:
+        path = os.path.join(output_path, rel_path)
+        try:
+            if is_dir and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            removed += 1
+            if on_removed:
+                on_removed(path)
+        except OSError as e:
+            if on_error:
+                on_error(path, e)
+    return removed
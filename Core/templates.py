@@ -0,0 +1,278 @@
+# Core/templates.py
+# Nội dung cho các tệp được tạo: chỉ thị trong chú thích của dòng cây
+# (`main.py  # @template python`, `# @copy mau/logo.png`, `# @text print("hi")\n`)
+# và tệp đăng ký mẫu JSON với mẫu mặc định theo tên tệp hoặc phần mở rộng:
+#
+#   {
+#     "templates": {"python": {"text": "#!/usr/bin/env python3\n"}, "logo": {"copy": "logo.png"}},
+#     "extensions": {".py": "python", ".md": {"text": "# TODO\n"}},
+#     "files": {"LICENSE": {"copy": "LICENSE.mit"}}
+#   }
+import errno
+import json
+import mmap
+import os
+import re
+import threading
+import zlib
+
+# Chỉ thị nằm trong phần chú thích (sau '#') của một dòng tệp
+_DIRECTIVE_RE = re.compile(r'@(?P<kind>template|copy|text)\s+(?P<value>.*?)\s*$')
+_ESCAPE_RE = re.compile(r'\\(.)')
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\"}
+
+SPEC_TEMPLATE = "template"
+SPEC_COPY = "copy"
+SPEC_TEXT = "text"
+# Nguồn @copy của tệp đăng ký, đã phân giải và kiểm tra khi nạp (dòng cây không tạo được loại này)
+_SPEC_SOURCE = "source"
+
+# Tệp nguồn nhỏ hơn ngưỡng này được đọc vào bộ nhớ một lần; lớn hơn thì sao chép
+# trực tiếp giữa hai fd trong nhân (copy_file_range/sendfile)
+COPY_THRESHOLD = 1 << 16
+_COPY_CHUNK = 1 << 24
+
+
+class TemplateError(Exception):
+    """Không lấy được nội dung cho một tệp (mẫu không tồn tại, tệp đăng ký sai...)."""
+
+
+def copy_source(base_dir, value, allow_outside=False):
+    """Đường dẫn thật (realpath) của nguồn @copy value, tương đối với base_dir.
+
+    Nguồn nằm ngoài base_dir (đường dẫn tuyệt đối, '..' hoặc liên kết mềm trỏ ra
+    ngoài) gây TemplateError, trừ khi allow_outside.
+    """
+    base = os.path.realpath(base_dir)
+    path = os.path.realpath(os.path.join(base, value))
+    if not allow_outside and os.path.commonpath((base, path)) != base:
+        raise TemplateError(f"copy source outside {base}: {value}")
+    return path
+
+
+def parse_directive(raw_name):
+    """Trả về (loại, giá trị) của chỉ thị nội dung trong chú thích, hoặc None."""
+    _, sep, comment = raw_name.partition('#')
+    if not sep or '@' not in comment:
+        return None
+    match = _DIRECTIVE_RE.search(comment)
+    if match is None:
+        return None
+    kind, value = match.group('kind'), match.group('value')
+    if kind == SPEC_TEXT:
+        value = _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(0)), value)
+    return kind, value
+
+
+class Content:
+    """Nội dung đã phân giải của một mẫu, dùng chung cho mọi tệp trỏ tới nó.
+
+    Hoặc data là bytes, hoặc fd là tệp nguồn lớn đang mở (đọc theo offset nên
+    nhiều luồng dùng chung được).
+    """
+    __slots__ = ("data", "fd", "size", "_crc", "_map")
+
+    def __init__(self, data=None, fd=None, size=0):
+        self.data = data
+        self.fd = fd
+        self.size = len(data) if data is not None else size
+        self._crc = None
+        self._map = None
+
+    def buffer(self):
+        """Nội dung dạng buffer cho các sink ghi tuần tự (tệp lớn được mmap)."""
+        if self.data is not None:
+            return self.data
+        if self._map is None:
+            self._map = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def crc32(self):
+        if self._crc is None:
+            self._crc = zlib.crc32(self.buffer())
+        return self._crc
+
+    def write_to(self, fd):
+        """Ghi toàn bộ nội dung vào fd đích; trả về số byte đã ghi."""
+        if self.data is not None:
+            view = memoryview(self.data)
+            while view:
+                view = view[os.write(fd, view):]
+            return self.size
+        return _copy_fd(self.fd, fd, self.size)
+
+
+def _copy_file_range(src, dst, offset, count):
+    return os.copy_file_range(src, dst, count, offset_src=offset)
+
+
+def _sendfile(src, dst, offset, count):
+    return os.sendfile(dst, src, offset, count)
+
+
+def _pread_write(src, dst, offset, count):
+    data = os.pread(src, min(count, _COPY_CHUNK), offset)
+    view = memoryview(data)
+    while view:
+        view = view[os.write(dst, view):]
+    return len(data)
+
+
+_COPIERS = [copier for copier, available in (
+    (_copy_file_range, hasattr(os, "copy_file_range")),
+    (_sendfile, hasattr(os, "sendfile")),
+    (_pread_write, True),
+) if available]
+
+# Lỗi cho biết cách sao chép này không dùng được với cặp tệp hiện tại
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def _copy_fd(src, dst, size):
+    offset = 0
+    for copier in _COPIERS:
+        try:
+            while offset < size:
+                copied = copier(src, dst, offset, min(size - offset, _COPY_CHUNK))
+                if copied == 0:
+                    break
+                offset += copied
+            return offset
+        except OSError as e:
+            # Chỉ chuyển sang cách khác khi chưa ghi byte nào
+            if offset or e.errno not in _UNSUPPORTED:
+                raise
+    return offset
+
+
+class TemplateRegistry:
+    """Mẫu có tên và mẫu mặc định theo tên tệp/phần mở rộng, nạp từ JSON."""
+
+    def __init__(self, base_dir=None, allow_outside=False):
+        self.base_dir = base_dir or os.getcwd()
+        # Cho phép nguồn "copy" nằm ngoài thư mục của tệp đăng ký
+        self.allow_outside = allow_outside
+        self.templates = {}
+        self.extensions = {}
+        self.files = {}
+
+    @classmethod
+    def load(cls, path, allow_outside=False):
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                data = json.load(f)
+        except ValueError as e:
+            raise TemplateError(f"{path}: {e}") from e
+        registry = cls(os.path.dirname(os.path.abspath(path)), allow_outside)
+        try:
+            for name, template in data.get("templates", {}).items():
+                registry.templates[name] = registry._spec(template)
+            for extension, template in data.get("extensions", {}).items():
+                registry.extensions[extension.lower()] = registry._spec(template)
+            for name, template in data.get("files", {}).items():
+                registry.files[name] = registry._spec(template)
+        except (AttributeError, TypeError) as e:
+            raise TemplateError(f"{path}: {e}") from e
+        return registry
+
+    def _spec(self, template):
+        if isinstance(template, str):
+            return SPEC_TEMPLATE, template
+        if SPEC_TEXT in template:
+            return SPEC_TEXT, template[SPEC_TEXT]
+        if SPEC_COPY in template:
+            return _SPEC_SOURCE, copy_source(self.base_dir, template[SPEC_COPY], self.allow_outside)
+        raise TemplateError(f"template needs 'text' or 'copy': {template!r}")
+
+    def default_spec(self, name):
+        spec = self.files.get(name)
+        if spec is None and self.extensions:
+            spec = self.extensions.get(os.path.splitext(name)[1].lower())
+        return spec
+
+
+class ContentResolver:
+    """Phân giải chỉ thị thành Content, mỗi nội dung khác nhau chỉ đọc một lần.
+
+    Được gọi đồng thời từ các luồng của Materializer: tra cứu bộ đệm không cần
+    khóa, chỉ lần phân giải đầu tiên của một mẫu mới giữ khóa.
+    """
+
+    def __init__(self, registry=None, base_dir=None, allow_outside=False):
+        self.registry = registry
+        # Thư mục gốc cho đường dẫn tương đối của @copy trong văn bản cây; nguồn phải nằm trong nó
+        # trừ khi allow_outside
+        self.base_dir = base_dir or os.getcwd()
+        self.allow_outside = allow_outside
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def for_file(self, name, spec):
+        """Content cho tệp name với chỉ thị spec (có thể None); None = tệp rỗng."""
+        if spec is None:
+            if self.registry is None:
+                return None
+            spec = self.registry.default_spec(name)
+            if spec is None:
+                return None
+        content = self._cache.get(spec)
+        if content is None:
+            with self._lock:
+                content = self._cache.get(spec)
+                if content is None:
+                    content = self._cache[spec] = self._resolve(spec, ())
+        if isinstance(content, Exception):
+            # Mỗi lần một ngoại lệ mới: lỗi đã lưu dùng chung giữa các luồng, raise lại nó
+            # sẽ nối thêm frame vào __traceback__ của nó mãi
+            raise TemplateError(str(content)) from content
+        return content
+
+    def _resolve(self, spec, seen):
+        kind, value = spec
+        try:
+            if kind == SPEC_TEXT:
+                return Content(value.encode("utf-8"))
+            if kind == SPEC_COPY:
+                return self._open_source(copy_source(self.base_dir, value, self.allow_outside))
+            if kind == _SPEC_SOURCE:
+                return self._open_source(value)
+            template = self.registry.templates.get(value) if self.registry else None
+            if template is None:
+                raise TemplateError(f"unknown template '{value}'")
+            if template in seen:
+                raise TemplateError(f"template '{value}' refers to itself")
+            cached = self._cache.get(template)
+            return cached if cached is not None else self._resolve(template, seen + (spec,))
+        except (OSError, TemplateError) as e:
+            # Lỗi cũng được lưu lại (không kèm traceback) để không thử lại cho từng tệp
+            return e.with_traceback(None)
+
+    def _open_source(self, path):
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        size = os.fstat(fd).st_size
+        if size < COPY_THRESHOLD:
+            try:
+                chunks = []
+                while True:
+                    chunk = os.read(fd, COPY_THRESHOLD)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                return Content(b"".join(chunks))
+            finally:
+                os.close(fd)
+        return Content(fd=fd, size=size)
+
+    def close(self):
+        for content in self._cache.values():
+            if isinstance(content, Content):
+                content.close()
+        self._cache = {}
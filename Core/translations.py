@@ -22,12 +22,63 @@ class Translations:
         # Nhóm UI
         "input_group_title": {"vi": "1. Dán cây thư mục vào đây", "en": "1. Paste Directory Tree Here", "ja": "1. ディレクトリツリーをここに貼り付け"},
         "input_placeholder": {"vi": "Ví dụ:\nmy_project/\n├── src/\n│   └── main.py\n└── README.md", "en": "Example:\nmy_project/\n├── src/\n│   └── main.py\n└── README.md", "ja": "例:\nmy_project/\n├── src/\n│   └── main.py\n└── README.md"},
+        "preview_summary": {"vi": "Xem trước: {nodes} mục ({dirs} thư mục), {warnings} cảnh báo thụt lề", "en": "Preview: {nodes} entries ({dirs} folders), {warnings} indentation warnings", "ja": "プレビュー: {nodes} 項目（フォルダー {dirs}）、インデント警告 {warnings} 件"},
+        "preview_format": {"vi": "Định dạng đầu vào: {name}", "en": "Input format: {name}", "ja": "入力形式: {name}"},
+        "preview_error": {"vi": "Không đọc được đầu vào: {error}", "en": "Cannot read input: {error}", "ja": "入力を読み取れません: {error}"},
+        "input_format_tree": {"vi": "cây (tree)", "en": "tree", "ja": "ツリー (tree)"},
+        "input_format_json": {"vi": "JSON lồng nhau", "en": "nested JSON", "ja": "入れ子の JSON"},
+        "input_format_markdown": {"vi": "danh sách markdown", "en": "markdown list", "ja": "Markdown リスト"},
+        "input_format_paths": {"vi": "danh sách đường dẫn", "en": "path list", "ja": "パス一覧"},
+        "input_format_indent": {"vi": "dàn ý thụt lề", "en": "indented outline", "ja": "インデントのアウトライン"},
+        "preview_warning_lines": {"vi": "Các dòng: {lines}", "en": "Lines: {lines}", "ja": "行: {lines}"},
+        "preview_file": {"vi": "Tệp: {name} ({size:.1f} MB, {lines} dòng)", "en": "File: {name} ({size:.1f} MB, {lines} lines)", "ja": "ファイル: {name}（{size:.1f} MB、{lines} 行）"},
+        "preview_file_loading": {"vi": "Đang đọc {name} ({size:.1f} MB)...", "en": "Reading {name} ({size:.1f} MB)...", "ja": "{name}（{size:.1f} MB）を読み込み中..."},
+        "input_file_placeholder": {"vi": "Đang dùng tệp cây {name}; nội dung tệp không được nạp vào ô này.\nBấm \"Đóng tệp\" để dán văn bản.", "en": "Using the tree file {name}; its contents are not loaded into this box.\nClick \"Close File\" to paste text instead.", "ja": "ツリーファイル {name} を使用中です。内容はこの欄に読み込まれません。\nテキストを貼り付けるには「ファイルを閉じる」をクリックしてください。"},
+        "format_dir": {"vi": "Thư mục", "en": "Folder", "ja": "フォルダー"},
+        "format_archive": {"vi": "Tệp nén {ext}", "en": "{ext} archive", "ja": "{ext} アーカイブ"},
+        "templates_button": {"vi": "Mẫu nội dung...", "en": "Templates...", "ja": "テンプレート..."},
+        "templates_selected": {"vi": "Mẫu: {name}", "en": "Templates: {name}", "ja": "テンプレート: {name}"},
+        "templates_tooltip": {"vi": "Chọn tệp đăng ký mẫu (JSON). Hủy hộp thoại để bỏ chọn.", "en": "Choose a template registry (JSON). Cancel the dialog to clear it.", "ja": "テンプレート登録ファイル（JSON）を選択します。キャンセルすると解除されます。"},
+        "allow_copy_outside_checkbox": {"vi": "Cho phép @copy ngoài thư mục", "en": "Allow @copy outside folder", "ja": "フォルダー外の @copy を許可"},
+        "allow_copy_outside_tooltip": {"vi": "Cho phép nguồn \"# @copy\" nằm ngoài thư mục của tệp cây (hoặc của tệp đăng ký mẫu): đường dẫn tuyệt đối, '..' hay liên kết mềm trỏ ra ngoài.", "en": "Let \"# @copy\" sources lie outside the tree file's (or template registry's) folder: absolute paths, '..' or symlinks pointing elsewhere.", "ja": "\"# @copy\" のコピー元がツリーファイル（またはテンプレート登録ファイル）のフォルダー外にあることを許可します（絶対パス、'..'、外を指すシンボリックリンク）。"},
         "output_group_title": {"vi": "2. Chọn thư mục đầu ra", "en": "2. Select Output Directory", "ja": "2. 出力ディレクトリを選択"},
         "output_placeholder": {"vi": "Chọn một nơi để tạo cây thư mục...", "en": "Choose a place to create the tree...", "ja": "ツリーを作成する場所を選択..."},
         "log_group_title": {"vi": "3. Nhật ký & Kết quả", "en": "3. Log & Results", "ja": "3. ログと結果"},
         
         # Nút
+        "sync_checkbox": {"vi": "Chỉ tạo phần còn thiếu", "en": "Only create missing", "ja": "不足分のみ作成"},
+        "prune_checkbox": {"vi": "Xóa mục thừa", "en": "Remove extras", "ja": "余分な項目を削除"},
+        "resume_checkbox": {"vi": "Tiếp tục bản dựng dở", "en": "Resume interrupted build", "ja": "中断したビルドを再開"},
+        "resume_tooltip": {"vi": "Bỏ qua những mục mà lần dựng trước vào thư mục này đã tạo (theo nhật ký thao tác).", "en": "Skip entries that the previous build into this folder already created (from its operation journal).", "ja": "このフォルダーへの前回のビルドで作成済みの項目をスキップします（操作ジャーナルに基づく）。"},
+        "rollback_button": {"vi": "Hoàn tác lần dựng", "en": "Roll Back Build", "ja": "ビルドを元に戻す"},
+        "keep_journal_checkbox": {"vi": "Giữ nhật ký để hoàn tác", "en": "Keep rollback journal", "ja": "元に戻すためのジャーナルを保持"},
+        "keep_journal_tooltip": {"vi": "Ghi nhật ký thao tác cạnh thư mục đầu ra và giữ nó sau khi dựng, để \"Hoàn tác lần dựng\" xóa đúng những gì lần dựng này tạo.", "en": "Write an operation journal next to the output folder and keep it after the build, so \"Roll Back Build\" can remove exactly what this build created.", "ja": "出力フォルダーの隣に操作ジャーナルを書き込みビルド後も保持します。「ビルドを元に戻す」でこのビルドが作成したものだけを削除できます。"},
+        "rollback_confirm": {"vi": "Xóa mọi mục mà lần dựng trước đã tạo trong:\n{path}?", "en": "Remove every entry the last build created in:\n{path}?", "ja": "前回のビルドで作成されたすべての項目を削除しますか:\n{path}"},
+        "rollback_no_journal": {"vi": "Không có nhật ký thao tác cho thư mục này.", "en": "There is no operation journal for this folder.", "ja": "このフォルダーの操作ジャーナルがありません。"},
+        "from_folder_button": {"vi": "Đọc từ thư mục...", "en": "From Folder...", "ja": "フォルダーから読み込み..."},
+        "open_file_button": {"vi": "Mở tệp cây...", "en": "Open Tree File...", "ja": "ツリーファイルを開く..."},
+        "open_file_tooltip": {"vi": "Đọc cây thẳng từ tệp (kể cả tệp rất lớn) thay vì dán vào ô soạn thảo.", "en": "Read the tree straight from a file (even a very large one) instead of pasting it into the editor.", "ja": "エディターに貼り付ける代わりに、ファイルから直接ツリーを読み込みます（非常に大きなファイルにも対応）。"},
+        "watch_button": {"vi": "Theo dõi tệp", "en": "Watch File", "ja": "ファイルを監視"},
+        "watch_tooltip": {"vi": "Dựng một lần rồi áp dụng mỗi lần tệp cây được lưu: chỉ thêm, chuyển, đổi tên hoặc xóa những mục đã sửa; tệp có nội dung chỉ bị xóa khi bật \"Xóa mục thừa\".", "en": "Build once, then apply every save of the tree file: only the edited entries are added, moved, renamed or removed; files with content are only deleted with \"Remove extras\".", "ja": "一度作成した後、ツリーファイルが保存されるたびに適用します。編集された項目だけを追加・移動・名前変更・削除します。内容のあるファイルは「余分な項目を削除」が有効なときだけ削除されます。"},
+        "close_file_button": {"vi": "Đóng tệp", "en": "Close File", "ja": "ファイルを閉じる"},
+        "export_log_button": {"vi": "Xuất nhật ký...", "en": "Export Log...", "ja": "ログをエクスポート..."},
+        "log_filter_all": {"vi": "Tất cả", "en": "All", "ja": "すべて"},
+        "log_filter_warnings": {"vi": "Cảnh báo & lỗi", "en": "Warnings & errors", "ja": "警告とエラー"},
+        "log_filter_errors": {"vi": "Chỉ lỗi", "en": "Errors only", "ja": "エラーのみ"},
         "browse_button": {"vi": "Duyệt...", "en": "Browse...", "ja": "参照..."},
+        "queue_group_title": {"vi": "Hàng đợi dựng", "en": "Build Queue", "ja": "ビルドキュー"},
+        "queue_add_button": {"vi": "Thêm vào hàng đợi", "en": "Add to Queue", "ja": "キューに追加"},
+        "queue_run_button": {"vi": "Chạy hàng đợi", "en": "Run Queue", "ja": "キューを実行"},
+        "queue_cancel_button": {"vi": "Hủy việc đã chọn", "en": "Cancel Selected", "ja": "選択したジョブを取消"},
+        "queue_clear_button": {"vi": "Xóa việc đã xong", "en": "Clear Finished", "ja": "完了したジョブを削除"},
+        "queue_processes_label": {"vi": "Tiến trình:", "en": "Processes:", "ja": "プロセス数:"},
+        "queue_processes_tooltip": {"vi": "Số tiến trình chạy song song các việc trong hàng đợi.", "en": "Number of processes running queued jobs in parallel.", "ja": "キューのジョブを並列に実行するプロセス数。"},
+        "queue_empty": {"vi": "Không có việc nào đang chờ trong hàng đợi.", "en": "There are no pending jobs in the queue.", "ja": "キューに待機中のジョブがありません。"},
+        "job_status_pending": {"vi": "đang chờ", "en": "pending", "ja": "待機中"},
+        "job_status_running": {"vi": "{percent}% ({done}/{total})", "en": "{percent}% ({done}/{total})", "ja": "{percent}%（{done}/{total}）"},
+        "job_status_done": {"vi": "xong, {created} mục, {errors} lỗi", "en": "done, {created} entries, {errors} errors", "ja": "完了、{created} 項目、エラー {errors} 件"},
+        "job_status_failed": {"vi": "thất bại: {error}", "en": "failed: {error}", "ja": "失敗: {error}"},
+        "job_status_cancelled": {"vi": "đã hủy", "en": "cancelled", "ja": "取消済み"},
         "run_button": {"vi": "Bắt đầu tạo", "en": "Start Building", "ja": "作成開始"},
         
         # Trạng thái
@@ -41,6 +92,7 @@ class Translations:
         "err_syntax": {"vi": "Lỗi cú pháp dòng {line_num}: Không thể phân tích '{line_content}'", "en": "Syntax error on line {line_num}: Cannot parse '{line_content}'", "ja": "行 {line_num} の構文エラー: '{line_content}' を解析できません"},
         "warn_indent": {"vi": "Cảnh báo: Cấu trúc thụt lề bất thường ở dòng {line_num}. Đang cố gắng xử lý.", "en": "Warning: Unusual indentation structure at line {line_num}. Attempting to process.", "ja": "警告: 行 {line_num} のインデント構造が異常です。処理を試みます。"},
         "err_permission": {"vi": "Lỗi quyền truy cập khi tạo: {path}", "en": "Permission error while creating: {path}", "ja": "作成中の権限エラー: {path}"},
+        "err_template": {"vi": "Không thể lấy nội dung cho '{path}': {error}", "en": "Could not get content for '{path}': {error}", "ja": "'{path}' の内容を取得できません: {error}"},
         "err_os": {"vi": "Lỗi hệ thống khi tạo {path}: {error}", "en": "System error creating {path}: {error}", "ja": "{path} の作成中にシステムエラー: {error}"},
         "err_critical": {"vi": "Lỗi nghiêm trọng trong quá trình xử lý: {error}", "en": "Critical error during processing: {error}", "ja": "処理中に重大なエラー: {error}"},
 
@@ -49,18 +101,69 @@ class Translations:
         "log_stopped_by_user": {"vi": "Đã dừng bởi người dùng.", "en": "Stopped by user.", "ja": "ユーザーによって停止されました。"},
         "log_folder_created": {"vi": "Đã tạo thư mục: {name}", "en": "Created directory: {name}", "ja": "ディレクトリを作成しました: {name}"},
         "log_file_created": {"vi": "Đã tạo tệp: {name}", "en": "Created file: {name}", "ja": "ファイルを作成しました: {name}"},
+        "log_sync_summary": {"vi": "Đồng bộ: đã quét {scanned} thư mục, thiếu {missing}, thừa {extras}, sai loại {conflicts}.", "en": "Sync: scanned {scanned} directories, {missing} missing, {extras} extra, {conflicts} type conflicts.", "ja": "同期: {scanned} 個のディレクトリを走査、不足 {missing}、余分 {extras}、種類の競合 {conflicts}。"},
+        "log_extra_entry": {"vi": "Mục thừa: {path}", "en": "Extra entry: {path}", "ja": "余分な項目: {path}"},
+        "log_conflict_entry": {"vi": "Sai loại (tệp/thư mục): {path}", "en": "Type conflict (file/directory): {path}", "ja": "種類の競合（ファイル/ディレクトリ）: {path}"},
+        "log_removed": {"vi": "Đã xóa: {path}", "en": "Removed: {path}", "ja": "削除しました: {path}"},
+        "log_resumed": {"vi": "Tiếp tục bản dựng dở: bỏ qua {done} mục đã xong.", "en": "Resuming the interrupted build: skipping {done} entries already done.", "ja": "中断されたビルドを再開します: 完了済みの {done} 項目をスキップします。"},
+        "log_rolled_back": {"vi": "Đã hoàn tác {removed} mục.", "en": "Rolled back {removed} entries.", "ja": "{removed} 項目を元に戻しました。"},
+        "log_queue_started": {"vi": "Bắt đầu {count} việc trên {processes} tiến trình.", "en": "Starting {count} jobs on {processes} processes.", "ja": "{processes} プロセスで {count} 個のジョブを開始します。"},
+        "job_done_entry": {"vi": "Xong {job} → {output}: {created} mục, {errors} lỗi, {seconds:.2f} giây.", "en": "Finished {job} → {output}: {created} entries, {errors} errors, {seconds:.2f}s.", "ja": "完了 {job} → {output}: {created} 項目、エラー {errors} 件、{seconds:.2f} 秒。"},
+        "job_cancelled_entry": {"vi": "Đã hủy {job} → {output} sau {created} mục.", "en": "Cancelled {job} → {output} after {created} entries.", "ja": "{job} → {output} を {created} 項目で取り消しました。"},
+        "job_failed_entry": {"vi": "Việc {job} thất bại: {error}", "en": "Job {job} failed: {error}", "ja": "ジョブ {job} が失敗しました: {error}"},
+        "check_duplicate": {"vi": "Dòng {line}: tệp '{path}' đã có ở dòng {other_line}, bản sau bị bỏ qua.", "en": "Line {line}: file '{path}' already listed on line {other_line}; the later one is ignored.", "ja": "{line} 行目: ファイル '{path}' は {other_line} 行目にもあり、後のものは無視されます。"},
+        "check_type_conflict": {"vi": "Dòng {line}: '{path}' vừa là tệp vừa là thư mục (dòng {other_line}).", "en": "Line {line}: '{path}' is both a file and a folder (line {other_line}).", "ja": "{line} 行目: '{path}' はファイルとフォルダーの両方です（{other_line} 行目）。"},
+        "check_sanitized": {"vi": "Dòng {line}: '{original}' và '{other_name}' (dòng {other_line}) cùng thành '{path}' sau khi làm sạch tên.", "en": "Line {line}: '{original}' and '{other_name}' (line {other_line}) both become '{path}' after name cleanup.", "ja": "{line} 行目: '{original}' と '{other_name}'（{other_line} 行目）は名前の整形後どちらも '{path}' になります。"},
+        "check_case": {"vi": "Dòng {line}: '{path}' chỉ khác '{other_name}' (dòng {other_line}) ở chữ hoa/thường.", "en": "Line {line}: '{path}' differs from '{other_name}' (line {other_line}) only in letter case.", "ja": "{line} 行目: '{path}' は '{other_name}'（{other_line} 行目）と大文字小文字だけが異なります。"},
+        "check_name_length": {"vi": "Dòng {line}: tên của '{path}' dài {length}, vượt giới hạn {limit}.", "en": "Line {line}: the name of '{path}' is {length} long, over the limit of {limit}.", "ja": "{line} 行目: '{path}' の名前の長さ {length} は上限 {limit} を超えています。"},
+        "check_path_length": {"vi": "Dòng {line}: đường dẫn '{path}' dài {length}, vượt giới hạn {limit}.", "en": "Line {line}: the path '{path}' is {length} long, over the limit of {limit}.", "ja": "{line} 行目: パス '{path}' の長さ {length} は上限 {limit} を超えています。"},
+        "check_duplicate_no_line": {"vi": "Tệp '{path}' có hai lần, bản sau bị bỏ qua.", "en": "File '{path}' is listed twice; the later one is ignored.", "ja": "ファイル '{path}' が 2 回あり、後のものは無視されます。"},
+        "check_type_conflict_no_line": {"vi": "'{path}' vừa là tệp vừa là thư mục.", "en": "'{path}' is both a file and a folder.", "ja": "'{path}' はファイルとフォルダーの両方です。"},
+        "check_sanitized_no_line": {"vi": "'{original}' và '{other_name}' cùng thành '{path}' sau khi làm sạch tên.", "en": "'{original}' and '{other_name}' both become '{path}' after name cleanup.", "ja": "'{original}' と '{other_name}' は名前の整形後どちらも '{path}' になります。"},
+        "check_case_no_line": {"vi": "'{path}' chỉ khác '{other_name}' ở chữ hoa/thường.", "en": "'{path}' differs from '{other_name}' only in letter case.", "ja": "'{path}' は '{other_name}' と大文字小文字だけが異なります。"},
+        "check_name_length_no_line": {"vi": "Tên của '{path}' dài {length}, vượt giới hạn {limit}.", "en": "The name of '{path}' is {length} long, over the limit of {limit}.", "ja": "'{path}' の名前の長さ {length} は上限 {limit} を超えています。"},
+        "check_path_length_no_line": {"vi": "Đường dẫn '{path}' dài {length}, vượt giới hạn {limit}.", "en": "The path '{path}' is {length} long, over the limit of {limit}.", "ja": "パス '{path}' の長さ {length} は上限 {limit} を超えています。"},
+        "check_failed": {"vi": "Kiểm tra trước thấy {errors} lỗi và {warnings} cảnh báo; không tạo mục nào.", "en": "Pre-flight check found {errors} errors and {warnings} warnings; nothing was created.", "ja": "事前チェックでエラー {errors} 件と警告 {warnings} 件が見つかりました。何も作成していません。"},
+        "log_cache_hit": {"vi": "Nạp {nodes} mục đã phân tích từ bộ nhớ đệm.", "en": "Loaded {nodes} parsed entries from the cache.", "ja": "キャッシュから解析済みの {nodes} 項目を読み込みました。"},
+        "log_renamed": {"vi": "Đã đổi tên: {old} → {path}", "en": "Renamed: {old} → {path}", "ja": "名前を変更しました: {old} → {path}"},
+        "log_watch_started": {"vi": "Đang theo dõi {path} ({method}); mỗi lần lưu sẽ được áp dụng.", "en": "Watching {path} ({method}); every save is applied.", "ja": "{path} を監視しています（{method}）。保存するたびに適用されます。"},
+        "log_watch_applied": {"vi": "Đã áp dụng thay đổi: thêm {added}, chuyển {moved}, đổi tên {renamed}, xóa {removed}, giữ lại {kept} ({seconds:.3f} giây).", "en": "Applied change: {added} added, {moved} moved, {renamed} renamed, {removed} removed, {kept} kept ({seconds:.3f}s).", "ja": "変更を適用しました: 追加 {added}、移動 {moved}、名前変更 {renamed}、削除 {removed}、保持 {kept}（{seconds:.3f} 秒）。"},
+        "log_moved": {"vi": "Đã chuyển: {old} → {path}", "en": "Moved: {old} → {path}", "ja": "移動しました: {old} → {path}"},
+        "log_watch_kept": {"vi": "Giữ lại {path}: không còn trong cây nhưng có nội dung (dùng --prune hoặc \"Xóa mục thừa\" để xóa).", "en": "Kept {path}: no longer in the tree but not empty (use --prune or \"Remove extras\" to delete it).", "ja": "{path} を保持しました: ツリーにはもうありませんが空ではありません（削除するには --prune または「余分な項目を削除」を使用してください）。"},
+        "log_journal_unavailable": {"vi": "Không ghi được nhật ký thao tác {path} ({error}); vẫn dựng nhưng không tiếp tục hay hoàn tác được.", "en": "Could not write the operation journal {path} ({error}); building without it, so this build cannot be resumed or rolled back.", "ja": "操作ジャーナル {path} を書き込めませんでした（{error}）。ジャーナルなしで作成するため、再開や元に戻すことはできません。"},
+        "log_report_phases": {"vi": "Thời gian theo giai đoạn: {phases}", "en": "Phase times: {phases}", "ja": "フェーズ別の時間: {phases}"},
+        "log_report_counters": {"vi": "Bộ đếm: {counters}", "en": "Counters: {counters}", "ja": "カウンター: {counters}"},
+        "log_report_errors": {"vi": "Lỗi theo loại: {errors}", "en": "Errors by type: {errors}", "ja": "種類別のエラー: {errors}"},
+
+        # Dòng lệnh
+        "cli_description": {"vi": "Tạo cây thư mục từ văn bản dạng tree mà không cần giao diện.", "en": "Build a directory tree from tree-formatted text without the GUI.", "ja": "GUI なしでツリー形式のテキストからディレクトリツリーを作成します。"},
+        "cli_input_not_found": {"vi": "Không tìm thấy tệp đầu vào: {path}", "en": "Input file not found: {path}", "ja": "入力ファイルが見つかりません: {path}"},
+        "warn_lossy_name": {"vi": "Cảnh báo: tên '{path}' sẽ bị đổi khi áp dụng lại (chứa '#', ngoặc hoặc ký tự không hợp lệ).", "en": "Warning: name '{path}' will change when re-applied (contains '#', parentheses or invalid characters).", "ja": "警告: 名前 '{path}' は再適用時に変更されます（'#'、括弧、または無効な文字を含みます）。"},
+        "cli_summary": {"vi": "Đã tạo {created} mục, {errors} lỗi, trong {seconds:.2f} giây.", "en": "Created {created} entries with {errors} errors in {seconds:.2f}s.", "ja": "{created} 個の項目を作成しました（エラー {errors} 件、{seconds:.2f} 秒）。"},
     }
 
+    # Bảng phẳng khóa -> chuỗi của ngôn ngữ hiện tại, dựng lại mỗi lần đổi ngôn ngữ
+    _table = {}
+
     @classmethod
     def set_language(cls, lang_code):
         if lang_code in cls.lang_map:
             cls.current_lang = lang_code
+        lang, fallback = cls.current_lang, cls.LANG_EN
+        cls._table = {key: entry.get(lang, entry.get(fallback, key.upper()))
+                      for key, entry in cls.translations.items()}
 
     @classmethod
     def get(cls, key, **kwargs):
+        raw_text = cls._table.get(key)
+        if raw_text is None:
+            return key.upper()
+        if not kwargs:
+            return raw_text
         try:
-            entry = cls.translations.get(key, {})
-            raw_text = entry.get(cls.current_lang, entry.get(cls.LANG_EN, key.upper()))
-            return raw_text.format(**kwargs) if kwargs else raw_text
+            return raw_text.format(**kwargs)
         except KeyError:
-            return key.upper()
\ No newline at end of file
+            return key.upper()
+
+
+Translations.set_language(Translations.current_lang)
\ No newline at end of file
@@ -0,0 +1,143 @@
+# Core/validator.py
+# Kiểm tra trước khi dựng: tìm các tên va chạm và đường dẫn vượt giới hạn của
+# hệ thống tệp trên ParsedTree, trong một lượt tuyến tính, trước mọi thao tác I/O.
+#
+# Mỗi vấn đề là một mục nhật ký (xem Core/events.py) mang sẵn đường dẫn và số
+# dòng trong chi tiết, nên worker, dòng lệnh và khung xem trước dựng cùng một
+# thông điệp theo ngôn ngữ đang chọn.
+import os
+import sys
+
+from .events import (
+    SEVERITY_ERROR, SEVERITY_WARNING, NO_NODE, EVENT_CHECK_CASE, EVENT_CHECK_DUPLICATE,
+    EVENT_CHECK_NAME_LENGTH, EVENT_CHECK_PATH_LENGTH, EVENT_CHECK_SANITIZED, EVENT_CHECK_TYPE_CONFLICT,
+)
+from .parser import ROOT
+
+# Giới hạn dùng khi không hỏi được hệ thống tệp (giá trị của Linux)
+DEFAULT_NAME_MAX = 255
+DEFAULT_PATH_MAX = 4096
+# MAX_PATH của Windows trừ ký tự kết thúc, khi chưa bật đường dẫn dài
+WINDOWS_PATH_MAX = 259
+
+
+class PathLimits:
+    """Giới hạn của nơi nhận: độ dài một tên, độ dài cả đường dẫn và việc phân biệt hoa/thường.
+
+    Độ dài được đo bằng byte UTF-8 trên POSIX và bằng đơn vị UTF-16 trên Windows,
+    đúng đơn vị mà hệ thống tệp tương ứng giới hạn. None nghĩa là không kiểm tra.
+    """
+
+    __slots__ = ("name_max", "path_max", "case_insensitive", "utf16")
+
+    def __init__(self, name_max=None, path_max=None, case_insensitive=False, utf16=False):
+        self.name_max = name_max
+        self.path_max = path_max
+        self.case_insensitive = case_insensitive
+        self.utf16 = utf16
+
+    def length(self, name):
+        if self.utf16:
+            return len(name.encode("utf-16-le", "surrogatepass")) // 2
+        return len(name.encode("utf-8", "surrogateescape"))
+
+
+def target_limits(output_path):
+    """Giới hạn của hệ thống tệp chứa output_path (hỏi thư mục tổ tiên gần nhất đã tồn tại)."""
+    if os.name == "nt":
+        return PathLimits(DEFAULT_NAME_MAX, WINDOWS_PATH_MAX, case_insensitive=True, utf16=True)
+    probe = os.path.abspath(output_path)
+    while not os.path.isdir(probe) and os.path.dirname(probe) != probe:
+        probe = os.path.dirname(probe)
+    name_max, path_max = DEFAULT_NAME_MAX, DEFAULT_PATH_MAX
+    try:
+        name_max = os.pathconf(probe, "PC_NAME_MAX")
+        path_max = os.pathconf(probe, "PC_PATH_MAX")
+    except (OSError, ValueError, AttributeError):
+        pass
+    # APFS/HFS+ mặc định không phân biệt hoa/thường
+    return PathLimits(name_max, path_max, case_insensitive=sys.platform == "darwin")
+
+
+def has_errors(issues):
+    return any(entry[0] == SEVERITY_ERROR for entry in issues)
+
+
+def validate_tree(tree, output_path="", limits=None):
+    """Trả về danh sách mục nhật ký cho mọi vấn đề của tree, theo thứ tự dòng.
+
+    Các thư mục trùng tên dưới cùng một cha được gộp như BuildPlan.compile làm,
+    nên con của chúng được so với nhau như con của một thư mục. Với mỗi thư mục
+    có hai bảng băm: tên chính xác và tên đã casefold. Vượt giới hạn đường dẫn
+    chỉ được báo ở nút đầu tiên của một nhánh, không lặp lại cho mọi nút con.
+    limits=None bỏ qua kiểm tra độ dài (ví dụ khi ghi vào tệp nén).
+    """
+    issues = []
+    names = tree.names
+    parents = tree.parents
+    is_dir = tree.is_dir
+    originals = tree.originals
+    # Nút thư mục -> nút thư mục đại diện sau khi gộp các thư mục trùng
+    canonical = {ROOT: ROOT}
+    exact = {}
+    folded = {}
+    name_max = limits.name_max if limits else None
+    path_max = limits.path_max if limits else None
+    length = limits.length if limits else None
+    # Độ dài đường dẫn của thư mục đại diện; None khi nhánh đã bị báo quá dài
+    path_lengths = {ROOT: length(os.path.abspath(output_path)) if path_max else 0}
+    case_severity = SEVERITY_ERROR if limits and limits.case_insensitive else SEVERITY_WARNING
+
+    def report(severity, code, node, other_node=None, **fields):
+        fields["path"] = tree.rel_path(node)
+        fields["line"] = tree.line_nums[node]
+        if other_node is not None:
+            fields["other_line"] = tree.line_nums[other_node]
+        issues.append((severity, None, code, NO_NODE, fields))
+
+    for i in range(len(names)):
+        parent = canonical[parents[i]]
+        name = names[i]
+        node_is_dir = is_dir(i)
+        key = (parent, name)
+        first = exact.get(key)
+        if first is not None:
+            if is_dir(first) != node_is_dir:
+                report(SEVERITY_ERROR, EVENT_CHECK_TYPE_CONFLICT, i, first)
+            elif originals.get(i, name) != originals.get(first, name):
+                report(SEVERITY_ERROR, EVENT_CHECK_SANITIZED, i, first,
+                       original=originals.get(i, name), other_name=originals.get(first, name))
+            elif not node_is_dir:
+                report(SEVERITY_WARNING, EVENT_CHECK_DUPLICATE, i, first)
+            if node_is_dir and is_dir(first):
+                # Thư mục trùng được gộp: con của nó là con của thư mục đầu tiên
+                canonical[i] = canonical[first]
+                continue
+            if not node_is_dir:
+                continue
+            # Thư mục trùng tên với một tệp vẫn có nhánh riêng cần kiểm tra tiếp
+        else:
+            exact[key] = i
+            folded_key = (parent, name.casefold())
+            other = folded.get(folded_key)
+            if other is None:
+                folded[folded_key] = i
+            else:
+                report(case_severity, EVENT_CHECK_CASE, i, other, other_name=names[other])
+
+        total = None
+        if length is not None:
+            size = length(name)
+            if name_max and size > name_max and first is None:
+                report(SEVERITY_ERROR, EVENT_CHECK_NAME_LENGTH, i, length=size, limit=name_max)
+            parent_length = path_lengths[parent]
+            if parent_length is not None:
+                total = parent_length + 1 + size
+                if path_max and total > path_max:
+                    if first is None:
+                        report(SEVERITY_ERROR, EVENT_CHECK_PATH_LENGTH, i, length=total, limit=path_max)
+                    total = None
+        if node_is_dir:
+            canonical[i] = i
+            path_lengths[i] = total
+    return issues
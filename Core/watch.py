@@ -0,0 +1,946 @@
+# Core/watch.py
+# Chế độ theo dõi: một tệp cây được đọc lại mỗi lần lưu và chỉ phần khác biệt
+# được áp dụng lên thư mục đầu ra; không phụ thuộc Qt.
+#
+# Các dòng và kết quả lex() của lần trước được giữ lại. Khi tệp đổi, phần đầu và
+# phần cuối giống nhau được bỏ qua, chỉ các dòng ở giữa được lex (làm sạch tên,
+# regex) lại; cây mới được dựng từ các bộ đã lex bằng thao tác số nguyên. Nút
+# của phần đầu giống hệt nút cũ, nút của phần cuối chỉ lệch chỉ số, nên so cây
+# cũ và mới ở mức nút chỉ cần xét phần giữa và cha của các nút phía sau. Việc
+# chạm vào đĩa (tạo, đổi tên, xóa) chỉ tỉ lệ với thay đổi.
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+from .formats import SAMPLE_LINES, detect_format
+from .ingest import TreeFile
+from .materializer import Materializer
+from .parser import ROOT, ParsedTree, TreeParser
+from .planner import BuildPlan
+from .validator import validate_tree
+
+WATCH_INOTIFY = "inotify"
+WATCH_POLL = "poll"
+# Chu kỳ so mtime/kích thước khi không có inotify (giây)
+POLL_INTERVAL = 0.5
+# Tệp phải đứng yên chừng này (giây) mới được đọc, để không đọc giữa lúc trình soạn thảo đang ghi
+SETTLE_SECONDS = 0.1
+# Thời gian chờ tối đa của mỗi lần wait() trong vòng lặp theo dõi, để kịp nhận lệnh dừng
+WATCH_WAIT_SECONDS = 0.25
+# Số dòng so một lần khi tìm phần đầu/cuối giống nhau của hai văn bản
+_BLOCK_LINES = 1024
+# Tới chừng này tên cần tìm ở một cấp thì tìm nút theo tên bằng list.index thay vì duyệt mảng cha
+_INDEX_SCAN_NAMES = 16
+# Quá chừng này đường dẫn bị chạm thì kiểm tra lại cả cây: mỗi đường dẫn là một lượt list.index qua mọi tên
+_SPLICE_ISSUE_PATHS = 32
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+# Theo dõi thư mục chứa tệp: trình soạn thảo thường ghi tệp tạm rồi đổi tên đè lên
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _inotify_open(directory):
+    """fd inotify đang theo dõi directory, hoặc None nếu hệ thống không có inotify."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), _IN_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher:
+    """Báo khi một tệp đổi: inotify nếu có, nếu không thì so (mtime, kích thước, inode) định kỳ.
+
+    wait() chỉ trả về True khi chữ ký của tệp đã khác lần trước và đứng yên qua
+    SETTLE_SECONDS; tệp tạm thời biến mất (đang được thay) thì chờ tiếp.
+    """
+
+    def __init__(self, path, interval=POLL_INTERVAL, settle=SETTLE_SECONDS):
+        self.path = os.path.abspath(path)
+        self.interval = interval
+        self.settle = settle
+        self._name = os.fsencode(os.path.basename(self.path))
+        self._signature = self._stat()
+        self._fd = _inotify_open(os.path.dirname(self.path))
+        self.method = WATCH_INOTIFY if self._fd is not None else WATCH_POLL
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _drain(self):
+        """Đọc hết các sự kiện inotify đang chờ; True nếu có sự kiện của tệp đang theo dõi."""
+        matched = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except OSError:
+                return matched
+            if not data:
+                return matched
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                if data[offset:offset + length].rstrip(b"\0") == self._name:
+                    matched = True
+                offset += length
+
+    def wait(self, timeout):
+        """Chờ tối đa timeout giây; True nếu tệp đã đổi (và đã ghi xong)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._fd is not None:
+                ready, _, _ = select.select([self._fd], [], [], remaining)
+                if not ready or not self._drain():
+                    continue
+            else:
+                time.sleep(min(self.interval, remaining))
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                continue
+            while True:
+                time.sleep(self.settle)
+                if self._fd is not None:
+                    self._drain()
+                current = self._stat()
+                if current == signature:
+                    break
+                signature = current
+            if signature is None:
+                continue
+            self._signature = signature
+            return True
+
+
+class TreeDelta:
+    """Khác biệt ở mức nút giữa cây cũ và cây mới của một tệp đang theo dõi.
+
+    removed là (đường dẫn tương đối cũ, là thư mục), con trước cha; renamed là
+    (đường dẫn cũ, đường dẫn mới, nút mới), con trước cha: con được đổi tên khi
+    cha còn ở chỗ cũ; added là chỉ số nút trong tree (cây mới), cha trước con.
+    unmatched là mọi nút mới không ghép được với nút cũ, kể cả nút mà đường dẫn
+    đã có sẵn nên không nằm trong added (cho validate_delta).
+    """
+    __slots__ = ("tree", "added", "removed", "renamed", "unmatched")
+
+    def __init__(self, tree, added, removed, renamed, unmatched=()):
+        self.tree = tree
+        self.added = added
+        self.removed = removed
+        self.renamed = renamed
+        self.unmatched = unmatched
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.renamed)
+
+
+def _key(tree, node):
+    return tree.rel_path(node), tree.is_dir(node)
+
+
+def _positions(names, name):
+    """Chỉ số mọi nút mang tên name (list.index quét trong C)."""
+    found = []
+    start = 0
+    try:
+        while True:
+            start = names.index(name, start) + 1
+            found.append(start - 1)
+    except ValueError:
+        return found
+
+
+def _claims(tree, keys):
+    """Các khóa (đường dẫn, là thư mục) trong keys có ít nhất một nút của tree mang.
+
+    Dò từ trên xuống theo từng cấp của đường dẫn: mỗi cấp chỉ xét con của các
+    thư mục đã khớp, tìm theo tên khi cần ít tên, nếu không thì một lượt qua
+    mảng cha; thư mục trùng tên (được gộp khi dựng) đều được dò.
+    """
+    names, parents = tree.names, tree.parents
+    found = set()
+    # Thư mục đã khớp -> {tên con cần tìm: [(các phần của đường dẫn, khóa)]}
+    frontier = {}
+    for key in keys:
+        parts = key[0].split(os.sep)
+        frontier.setdefault(ROOT, {}).setdefault(parts[0], []).append((parts, key))
+    depth = 0
+    while frontier:
+        wanted = set().union(*frontier.values())
+        if len(wanted) <= _INDEX_SCAN_NAMES:
+            candidates = [node for name in wanted for node in _positions(names, name)]
+        else:
+            candidates = [node for node in range(min(frontier) + 1, len(names)) if parents[node] in frontier]
+        below = {}
+        for node in candidates:
+            matches = frontier.get(parents[node], {}).get(names[node])
+            if not matches:
+                continue
+            node_is_dir = tree.is_dir(node)
+            for parts, key in matches:
+                if len(parts) == depth + 1:
+                    if node_is_dir == key[1]:
+                        found.add(key)
+                elif node_is_dir:
+                    below.setdefault(node, {}).setdefault(parts[depth + 1], []).append((parts, key))
+        frontier = below
+        depth += 1
+    return found
+
+
+class Splice:
+    """Vùng cần so giữa cây cũ và cây mới khi chỉ một đoạn dòng thay đổi.
+
+    Nút dưới pre giống hệt nhau; [pre, *_middle) là nút của các dòng đã đổi;
+    [*_middle, *_rest) là nút của các dòng giống nhau được phân tích lại cho tới
+    khi trạng thái bộ phân tích khớp; từ *_rest trở đi nút mới là nút cũ dời đi
+    new_rest - old_rest vị trí, với cùng tên, loại và cha tương ứng.
+    """
+    __slots__ = ("pre", "old_middle", "new_middle", "old_rest", "new_rest")
+
+    def __init__(self, pre, old_middle, new_middle, old_rest, new_rest):
+        self.pre = pre
+        self.old_middle = old_middle
+        self.new_middle = new_middle
+        self.old_rest = old_rest
+        self.new_rest = new_rest
+
+    @classmethod
+    def whole(cls, old, new):
+        return cls(0, len(old), len(new), len(old), len(new))
+
+
+def _match(old, new, splice, forbidden):
+    """Ghép nút mới với nút cũ theo vị trí; trả về (thêm, bỏ, [(cũ, mới)] đổi tên).
+
+    Các dòng đã đổi được ghép theo thứ tự nếu hai bên có cùng số nút, các dòng
+    phân tích lại theo độ lệch cố định. Một cặp được giữ khi cùng loại và cha cũ
+    ứng với cha mới; khác tên là đổi tên, trừ khi nút cũ nằm trong forbidden.
+    Phần từ *_rest chỉ phải duyệt khi một thư mục mà nó treo vào không được giữ.
+    """
+    pre, old_rest, new_rest = splice.pre, splice.old_rest, splice.new_rest
+    old_middle, new_middle = splice.old_middle, splice.new_middle
+    if old_rest - old_middle != new_rest - new_middle:
+        # Dòng đầu phân tích lại sinh số nút khác (danh sách đường dẫn): gộp vào phần đã đổi
+        old_middle, new_middle = old_rest, new_rest
+    region_pairs = old_middle == new_middle
+    middle_shift = new_middle - old_middle
+    rest_shift = new_rest - old_rest
+    paired = {}
+    kept = bytearray(len(old) - pre)
+    replaced = set()
+    added = []
+    renamed = []
+    removed = []
+
+    def to_new(node):
+        if node < pre:
+            # Kể cả ROOT
+            return node
+        if node >= old_rest:
+            return node + rest_shift
+        if node >= old_middle:
+            return node + middle_shift
+        return paired.get(node)
+
+    if pre and old.is_dir(pre - 1) != new.is_dir(pre - 1):
+        # Nút cuối của phần đầu thành thư mục (hoặc thôi là thư mục) vì dòng ngay sau nó
+        added.append(pre - 1)
+        replaced.add(pre - 1)
+        removed.append(pre - 1)
+
+    new_parents, old_parents = new.parents, old.parents
+    new_names, old_names = new.names, old.names
+
+    def visit(node, previous):
+        parent = new_parents[node]
+        if (previous is not None and parent not in replaced and new.is_dir(node) == old.is_dir(previous)
+                and to_new(old_parents[previous]) == parent
+                and (new_names[node] == old_names[previous] or previous not in forbidden)):
+            kept[previous - pre] = 1
+            if node < new_middle:
+                paired[previous] = node
+            if new_names[node] != old_names[previous]:
+                renamed.append((previous, node))
+        else:
+            added.append(node)
+            replaced.add(node)
+
+    for node in range(pre, new_middle):
+        visit(node, node if region_pairs else None)
+    for node in range(new_middle, new_rest):
+        visit(node, node - middle_shift)
+    scanned = old_rest
+    if replaced and new_rest < len(new):
+        # Phần sau chỉ treo vào các thư mục trên chuỗi tổ tiên của nút cuối đã duyệt
+        ancestor = new_rest - 1
+        while ancestor != ROOT and ancestor not in replaced:
+            ancestor = new_parents[ancestor]
+        if ancestor != ROOT:
+            for node in range(new_rest, len(new)):
+                visit(node, node - rest_shift)
+            scanned = len(old)
+    removed.extend(node for node in range(pre, scanned) if not kept[node - pre])
+    return added, removed, renamed
+
+
+def diff_trees(old, new, splice=None):
+    """So hai ParsedTree ở mức nút; splice giới hạn phần phải duyệt (None = so toàn bộ).
+
+    So ở mức đường dẫn: mục bỏ đi mà cây mới vẫn có (thư mục trùng được gộp,
+    dòng dời chỗ) được giữ, mục thêm mà cây cũ đã có thì không tạo lại; đổi tên
+    có đường dẫn cũ dính vào những mục đó, hoặc đường dẫn mới trùng một mục cũ
+    (ví dụ hai dòng đổi chỗ), bị hủy và các nút được ghép lại.
+    """
+    splice = splice or Splice.whole(old, new)
+    forbidden = set()
+    while True:
+        added, removed, renamed = _match(old, new, splice, forbidden)
+        removed_keys = {node: _key(old, node) for node in removed}
+        added_keys = {node: _key(new, node) for node in added}
+        moves = [(_key(old, previous), _key(new, node)) for previous, node in renamed]
+        kept_paths = _claims(new, set(removed_keys.values()).union(source for source, _ in moves))
+        # Đổi tên chạy trước khi xóa nên đích không được trùng mục cũ nào, kể cả khác loại
+        targets = {(path, is_dir) for _, (path, _) in moves for is_dir in (False, True)}
+        existing = _claims(old, targets.union(added_keys.values()))
+        clashes = {previous for (previous, _), (source, target) in zip(renamed, moves)
+                   if source in kept_paths or (target[0], False) in existing or (target[0], True) in existing}
+        if not clashes:
+            break
+        forbidden |= clashes
+
+    return TreeDelta(
+        new, [node for node in added if added_keys[node] not in existing],
+        [removed_keys[node] for node in sorted(removed, reverse=True) if removed_keys[node] not in kept_paths],
+        [(source[0], target[0], node) for (_, node), (source, target) in sorted(zip(renamed, moves), reverse=True)],
+        added)
+
+
+def _common_prefix(old, new):
+    """Số phần tử đầu giống nhau, so từng khối bằng phép so danh sách rồi mới so từng phần tử."""
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit:
+        end = min(start + _BLOCK_LINES, limit)
+        if old[start:end] != new[start:end]:
+            break
+        start = end
+    while start < limit and old[start] == new[start]:
+        start += 1
+    return start
+
+
+def _common_suffix(old, new, limit):
+    """Số phần tử cuối giống nhau, không quá limit."""
+    start = 0
+    while start < limit:
+        end = min(start + _BLOCK_LINES, limit)
+        if old[len(old) - end:len(old) - start] != new[len(new) - end:len(new) - start]:
+            break
+        start = end
+    while start < limit and old[-1 - start] == new[-1 - start]:
+        start += 1
+    return start
+
+
+def _skipped(lexed):
+    """Số dòng có nội dung nhưng tên rỗng trong các bộ đã lex (như ParsedTree.skipped)."""
+    return sum(1 for entry in lexed if entry is not None and not entry[2])
+
+
+def _head(tree, count, lexed):
+    """ParsedTree gồm count nút đầu của tree, sinh từ các dòng lexed.
+
+    Nút cuối có thể đã thành thư mục vì dòng ngay sau nó; nó được đưa về đúng
+    như dòng của chính nó viết, để các dòng phân tích lại quyết định lần nữa.
+    """
+    lines = len(lexed)
+    head = ParsedTree()
+    head.parents = tree.parents[:count]
+    head.names = tree.names[:count]
+    head.line_nums = tree.line_nums[:count]
+    head.dir_bits = tree.dir_bits[:(count + 7) >> 3]
+    if count & 7:
+        head.dir_bits[-1] &= (1 << (count & 7)) - 1
+    head.contents = {node: value for node, value in tree.contents.items() if node < count}
+    head.originals = {node: value for node, value in tree.originals.items() if node < count}
+    head.warnings = tree.warnings[:bisect_right(tree.warnings, lines)]
+    if count:
+        last = count - 1
+        entry = lexed[tree.line_nums[last] - 1]
+        if not entry[-1] and head.is_dir(last):
+            head.dir_bits[last >> 3] &= ~(1 << (last & 7))
+            if entry[3] is not None:
+                head.contents[last] = entry[3]
+    return head
+
+
+def _append_rest(tree, old, start, threshold, line_shift, after_line):
+    """Nối các nút từ start của old vào cuối tree.
+
+    Chỉ số dời đi len(tree) - start, áp cho cha từ threshold trở lên (cha nhỏ
+    hơn là nút của phần đầu hoặc ROOT, giữ nguyên); số dòng dời đi line_shift.
+    """
+    shift = len(tree) - start
+    parents = old.parents[start:]
+    if shift:
+        parents = array('i', [parent + shift if parent >= threshold else parent for parent in parents])
+    line_nums = old.line_nums[start:]
+    if line_shift:
+        line_nums = array('I', map(line_shift.__add__, line_nums))
+    count = len(tree)
+    total = count + len(old) - start
+    bits = int.from_bytes(tree.dir_bits, "little") | (int.from_bytes(old.dir_bits, "little") >> start << count)
+    tree.parents.extend(parents)
+    tree.names.extend(old.names[start:])
+    tree.line_nums.extend(line_nums)
+    tree.dir_bits = bytearray(bits.to_bytes((total + 7) >> 3, "little"))
+    tree.contents.update((node + shift, value) for node, value in old.contents.items() if node >= start)
+    tree.originals.update((node + shift, value) for node, value in old.originals.items() if node >= start)
+    tree.warnings.extend(line + line_shift for line in old.warnings[bisect_right(old.warnings, after_line):])
+
+
+def _same_state(old, new, old_node, new_node, pre, old_middle, new_middle, levels=None):
+    """True nếu hai nút cuối và chuỗi tổ tiên của chúng (trạng thái bộ phân tích) ứng
+    với nhau: cùng nút ở phần đầu, hoặc cùng một độ lệch và cùng cấp ở phần phân
+    tích lại. levels(nút cũ, nút mới) so cấp thụt lề (None với danh sách đường dẫn)."""
+    if old.is_dir(old_node) != new.is_dir(new_node):
+        return False
+    shift = new_node - old_node
+    while old_node >= pre:
+        if (old_node < old_middle or new_node < new_middle or new_node - old_node != shift
+                or levels and not levels(old_node, new_node)):
+            return False
+        old_node, new_node = old.parents[old_node], new.parents[new_node]
+    return old_node == new_node
+
+
+def _first_entry(lexed, start=0):
+    """Chỉ số dòng có nội dung đầu tiên từ start (dòng đầu được bỏ thụt lề khi phân tích)."""
+    return next((index for index in range(start, len(lexed)) if lexed[index] is not None), len(lexed))
+
+
+class SplicingParser:
+    """Các dòng, kết quả lex() và cây của lần phân tích gần nhất, để lần sau chỉ phân tích lại đoạn đã đổi.
+
+    Khi văn bản đổi, các dòng đầu và cuối giống lần trước được giữ: nút của phần
+    đầu được chép nguyên, bộ phân tích tiếp tục từ đó (TreeParser.resume) qua các
+    dòng đã đổi rồi qua các dòng phía sau cho tới khi trạng thái của nó khớp với
+    lần trước; phần còn lại của cây cũ được nối vào với chỉ số dời đi. Không giữ
+    tham chiếu tới danh sách dòng của người gọi sau khi parse() trả về.
+    """
+
+    def __init__(self, input_format=None):
+        self.input_format = input_format
+        # Định dạng đoán được ở lần parse() gần nhất (kể cả khi JSON không hợp lệ)
+        self.format = None
+        self.lines = []
+        self.tree = ParsedTree()
+        self._format = None
+        self._lexer = None
+        self._lexed = []
+        self._base_level = 0
+        self._first = 0
+
+    def parse(self, lines, reuse=True):
+        """Phân tích lines thay cho lần trước; trả về Splice so với cây trước, hoặc None
+        khi đã phân tích lại toàn bộ. ValueError nếu văn bản JSON không hợp lệ (khi đó
+        trạng thái cũ được giữ, trừ việc lần sau phải phân tích lại toàn bộ)."""
+        lines = list(lines)
+        self.tree, self._lexed, splice = self._parse(lines, reuse)
+        self.lines = lines
+        return splice
+
+    def _parse(self, lines, reuse):
+        """(cây, các bộ đã lex, Splice so với cây trước hoặc None khi phải so toàn bộ)."""
+        fmt = self.format = detect_format(lines[:SAMPLE_LINES], self.input_format)
+        if fmt.whole_text:
+            self._format = None
+            return TreeParser.parse("\n".join(lines), fmt), [], None
+        if reuse and self._format is not None and fmt.key() == self._format.key():
+            return self._splice(lines, fmt)
+        self._format = fmt
+        self._lexer = TreeParser(fmt)
+        lex = self._lexer.lex
+        lexed = [lex(line) for line in lines]
+        builder = TreeParser(fmt)
+        add_lexed = builder.add_lexed
+        for line_num, entry in enumerate(lexed, 1):
+            if entry is not None:
+                add_lexed(entry, line_num)
+        self._base_level = builder.base_level
+        self._first = _first_entry(lexed)
+        return builder.close(total_lines=len(lines)), lexed, None
+
+    def _splice(self, lines, fmt):
+        old, old_lines, old_lexed = self.tree, self.lines, self._lexed
+        prefix = _common_prefix(old_lines, lines)
+        suffix = _common_suffix(old_lines, lines, min(len(old_lines), len(lines)) - prefix)
+        old_end, new_end = len(old_lines) - suffix, len(lines) - suffix
+        lex = self._lexer.lex
+        lexed = old_lexed[:prefix] + [lex(line) for line in lines[prefix:new_end]] + old_lexed[old_end:]
+
+        pre = bisect_right(old.line_nums, prefix)
+        builder = TreeParser(fmt)
+        builder.resume(_head(old, pre, lexed[:prefix]), lexed[:prefix], self._base_level)
+        tree = builder.tree
+        add_lexed = builder.add_lexed
+        for index in range(prefix, new_end):
+            if lexed[index] is not None:
+                add_lexed(lexed[index], index + 1)
+        old_middle, new_middle = bisect_right(old.line_nums, old_end), len(tree)
+        line_shift = new_end - old_end
+        old_first, first = self._first, min(self._first, prefix)
+        if first == prefix:
+            first = _first_entry(lexed, prefix)
+        levels = None
+        if not fmt.paths:
+            width, old_base = fmt.width, self._base_level
+
+            def level(entries, line, first_line, base_level):
+                entry = entries[line]
+                return (entry[0] - (entry[1] if line == first_line else 0)) // width - base_level
+
+            def levels(old_node, new_node):
+                return (max(level(old_lexed, old.line_nums[old_node] - 1, old_first, old_base), 0)
+                        == max(level(lexed, tree.line_nums[new_node] - 1, first, builder.base_level), 0))
+        old_rest = len(old)
+        after_line = len(old_lines)
+        for index in range(new_end, len(lines)):
+            if lexed[index] is None:
+                continue
+            count = len(tree)
+            add_lexed(lexed[index], index + 1)
+            if len(tree) == count or builder.base_level != self._base_level:
+                continue
+            old_last = bisect_right(old.line_nums, index + 1 - line_shift) - 1
+            if old_last >= old_middle and _same_state(old, tree, old_last, len(tree) - 1, pre, old_middle,
+                                                      new_middle, levels):
+                old_rest, after_line = old_last + 1, index + 1 - line_shift
+                break
+        fed_skipped = tree.skipped
+        self._base_level, self._first = builder.base_level, first
+        tree = builder.close(total_lines=len(lines))
+        new_rest = len(tree)
+        if old_rest < len(old):
+            _append_rest(tree, old, old_rest, old_middle, line_shift, after_line)
+        tree.skipped = old.skipped - _skipped(old_lexed[prefix:after_line]) + fed_skipped
+        return tree, lexed, Splice(pre, old_middle, new_middle, old_rest, new_rest)
+
+
+class WatchedSpec(SplicingParser):
+    """Tệp cây đang theo dõi: mỗi lần đọc lại chỉ phân tích lại đoạn đã đổi (xem SplicingParser)."""
+
+    def __init__(self, path, input_format=None):
+        super().__init__(input_format)
+        self.tree_file = TreeFile(path)
+
+    def load(self):
+        """Đọc và phân tích toàn bộ tệp; ValueError nếu văn bản JSON không hợp lệ."""
+        self.parse(self.tree_file, reuse=False)
+        return self.tree
+
+    def update(self):
+        """Đọc lại tệp; trả về TreeDelta so với lần trước, hoặc None nếu văn bản không đổi."""
+        lines = list(self.tree_file)
+        if lines == self.lines:
+            return None
+        old = self.tree
+        splice = self.parse(lines)
+        return diff_trees(old, self.tree, splice)
+
+def _descendants(tree, node):
+    """node và mọi nút con cháu của nó; chúng nằm liền nhau ngay sau node trong mọi định dạng."""
+    found = {node}
+    parents = tree.parents
+    for index in range(node + 1, len(tree)):
+        if parents[index] not in found:
+            break
+        found.add(index)
+    return found
+
+
+def _children(tree, parents):
+    """{thư mục: [con]} cho các thư mục trong parents (tìm theo chỉ số khi ít, nếu không một lượt)."""
+    found = {parent: [] for parent in parents}
+    if len(found) <= _INDEX_SCAN_NAMES:
+        parent_list = tree.parents.tolist()
+        for parent in found:
+            found[parent] = _positions(parent_list, parent)
+    else:
+        for node, parent in enumerate(tree.parents):
+            if parent in found:
+                found[parent].append(node)
+    return found
+
+
+def validate_delta(delta, output_path="", limits=None):
+    """validate_tree chỉ trên phần cây mà delta chạm tới; trả về các vấn đề dính tới nút mới.
+
+    Xét các nhóm anh em chứa nút thêm hoặc đổi tên (kể cả con của các thư mục
+    trùng đường dẫn với cha, vốn được gộp khi dựng), tổ tiên của chúng và nhánh
+    con của thư mục đổi tên (đường dẫn của chúng dài ra). Vấn đề chỉ giữa các nút
+    cũ đã được báo ở lần dựng đầy đủ nên bị bỏ.
+    """
+    tree = delta.tree
+    names, parents = tree.names, tree.parents
+    changed = set(delta.unmatched)
+    for _, _, node in delta.renamed:
+        changed |= _descendants(tree, node)
+    if not changed:
+        return []
+    # Cha đã có từ trước: phải tìm đủ con của nó (và của các bản trùng); con của cha mới đều là nút mới
+    old_parents = {parents[node] for node in changed} - changed
+    groups = set()
+    for parent in old_parents:
+        groups.add(parent)
+        if parent == ROOT:
+            continue
+        path = tree.rel_path(parent)
+        groups.update(other for other in _positions(names, names[parent])
+                      if tree.is_dir(other) and tree.rel_path(other) == path)
+    wanted = set(changed)
+    for children in _children(tree, groups).values():
+        wanted.update(children)
+    for node in list(wanted):
+        parent = parents[node]
+        while parent != ROOT and parent not in wanted:
+            wanted.add(parent)
+            parent = parents[parent]
+
+    sub = ParsedTree()
+    index = {ROOT: ROOT}
+    for node in sorted(wanted):
+        index[node] = sub._append(index[parents[node]], names[node], tree.is_dir(node), tree.line_nums[node],
+                                  None, tree.originals.get(node))
+    lines = {tree.line_nums[node] for node in changed}
+    return [entry for entry in validate_tree(sub, output_path, limits)
+            if entry[4]["line"] in lines or entry[4].get("other_line") in lines]
+
+
+def _parent_path(tree, node):
+    parent = tree.parents[node]
+    return "" if parent == ROOT else tree.rel_path(parent)
+
+
+def nodes_at(tree, path):
+    """Mọi nút (tệp hoặc thư mục, kể cả các bản trùng) có đường dẫn tương đối path, theo thứ tự."""
+    return [node for node in _positions(tree.names, os.path.basename(path)) if tree.rel_path(node) == path]
+
+
+def _in_touched(path, groups, subtrees):
+    if path in groups or path in subtrees:
+        return True
+    while path:
+        path = os.path.dirname(path)
+        if path in subtrees:
+            return True
+    return False
+
+
+def splice_issues(old, issues, new, splice):
+    """validate_tree(new) không xét độ dài, dựng từ issues = validate_tree(old) và splice.
+
+    Khi không xét độ dài, mỗi vấn đề nằm trong một nhóm anh em: con của mọi thư
+    mục cùng một đường dẫn. Chỉ các nhóm có nút trong vùng đã đổi của splice
+    (ở cây cũ hoặc cây mới) được kiểm tra lại; vì một nút đổi còn có thể tách hay
+    gộp các thư mục cùng đường dẫn với nó, mọi nhóm bên dưới đường dẫn đó cũng
+    vậy. Vấn đề của các nhóm khác được giữ, với số dòng dời theo phần sau. Khi
+    đoạn đã đổi chạm quá nhiều đường dẫn thì kiểm tra lại cả cây cho nhanh hơn.
+    """
+    start = max(splice.pre - 1, 0)
+    groups = set()
+    subtrees = set()
+    for tree, end in ((old, splice.old_rest), (new, splice.new_rest)):
+        for node in range(start, end):
+            groups.add(_parent_path(tree, node))
+            subtrees.add(tree.rel_path(node))
+    if not groups:
+        return list(issues)
+    if len(groups) + len(subtrees) > _SPLICE_ISSUE_PATHS:
+        return validate_tree(new)
+
+    line_shift = 0
+    rest_line = None
+    if splice.old_rest < len(old):
+        rest_line = old.line_nums[splice.old_rest]
+        line_shift = new.line_nums[splice.new_rest] - rest_line
+    kept = []
+    for entry in issues:
+        fields = entry[4]
+        if _in_touched(os.path.dirname(fields["path"]), groups, subtrees):
+            continue
+        if line_shift and (fields["line"] >= rest_line or fields.get("other_line", 0) >= rest_line):
+            fields = dict(fields)
+            for key in ("line", "other_line"):
+                if fields.get(key, 0) >= rest_line:
+                    fields[key] += line_shift
+            entry = entry[:4] + (fields,)
+        kept.append(entry)
+
+    # Nút của các nhóm cần kiểm tra lại trong cây mới
+    names = new.names
+    wanted = set()
+    dirs = set()
+    for path in groups:
+        if not path:
+            dirs.add(ROOT)
+            continue
+        dirs.update(node for node in nodes_at(new, path) if new.is_dir(node))
+    for children in _children(new, dirs).values():
+        wanted.update(children)
+    for path in subtrees:
+        for node in nodes_at(new, path):
+            if new.is_dir(node):
+                wanted |= _descendants(new, node)
+    # Tổ tiên cùng mọi nút trùng đường dẫn với chúng, để việc gộp thư mục trùng giống hệt cây đầy đủ
+    pending = list(wanted)
+    while pending:
+        parent = new.parents[pending.pop()]
+        if parent == ROOT or parent in wanted:
+            continue
+        for other in nodes_at(new, new.rel_path(parent)):
+            if other not in wanted:
+                wanted.add(other)
+                pending.append(other)
+
+    sub = ParsedTree()
+    index = {ROOT: ROOT}
+    parents = new.parents
+    for node in sorted(wanted):
+        index[node] = sub._append(index[parents[node]], names[node], new.is_dir(node), new.line_nums[node],
+                                  None, new.originals.get(node))
+    fresh = [entry for entry in validate_tree(sub)
+             if _in_touched(os.path.dirname(entry[4]["path"]), groups, subtrees)]
+    return sorted(kept + fresh, key=lambda entry: entry[4]["line"])
+
+def partial_plan(tree, nodes):
+    """BuildPlan chỉ gồm nodes và tổ tiên của chúng; trả về (plan, tập op của tổ tiên).
+
+    Tổ tiên đã có trên đĩa nên được đưa vào skip của Materializer: chúng không
+    được tạo lại, chỉ làm thư mục cha cho các nút mới.
+    """
+    wanted = set(nodes)
+    ancestors = set()
+    for node in nodes:
+        parent = tree.parents[node]
+        while parent != ROOT and parent not in wanted and parent not in ancestors:
+            ancestors.add(parent)
+            parent = tree.parents[parent]
+    order = sorted(wanted | ancestors)
+    sub = ParsedTree()
+    index = {ROOT: ROOT}
+    for node in order:
+        index[node] = sub._append(index[tree.parents[node]], tree.names[node], tree.is_dir(node),
+                                  tree.line_nums[node], tree.contents.get(node), tree.originals.get(node))
+    plan = BuildPlan.compile(sub)
+    skip = {op for op in range(len(plan)) if order[plan.nodes[op]] in ancestors}
+    return plan, skip
+
+
+def _current_path(rel_path, renamed_paths):
+    """Đường dẫn tương đối hiện tại của một mục cũ sau khi các mục trong renamed_paths đã đổi tên."""
+    head = rel_path
+    while True:
+        head = os.path.dirname(head)
+        if not head:
+            return rel_path
+        if head in renamed_paths:
+            return renamed_paths[head] + rel_path[len(head):]
+
+
+def _file_key(stat):
+    return stat.st_dev, stat.st_ino
+
+
+def apply_delta(delta, output_path, contents=None, max_workers=None, prune=False, created=None,
+                on_created=None, on_removed=None, on_renamed=None, on_moved=None, on_kept=None, on_error=None):
+    """Áp dụng một TreeDelta lên output_path; trả về số mục theo từng loại thao tác.
+
+    Đổi tên không bao giờ ghi đè mục đã có; mục cần đổi tên mà không còn trên
+    đĩa thì được tạo mới. Mục mới được tạo bằng Materializer như một lần dựng
+    đồng bộ (không làm rỗng tệp đã có). Với mục bị bỏ khỏi cây:
+
+    - tệp cùng tên với một tệp mới được chuyển sang chỗ mới bằng os.rename, giữ
+      nguyên nội dung (cắt một dòng rồi dán vào thư mục khác);
+    - tệp khác chỉ bị xóa khi prune, khi rỗng, hoặc khi chưa đổi từ lúc được tạo
+      bởi chế độ theo dõi (created: {(thiết bị, inode): (kích thước, mtime_ns)},
+      được cập nhật ở đây); nếu không được giữ lại và báo on_kept;
+    - thư mục bị xóa bằng rmdir, nên thư mục còn chứa gì đó được giữ lại.
+
+    on_created(đường dẫn tương đối, là thư mục), on_removed(đường dẫn), on_kept(đường dẫn),
+    on_renamed / on_moved(đường dẫn cũ, đường dẫn mới), on_error(đường dẫn, ngoại lệ).
+    """
+    counts = {"added": 0, "moved": 0, "renamed": 0, "removed": 0, "kept": 0}
+    created = {} if created is None else created
+    tree = delta.tree
+    added = set(delta.added)
+
+    renamed_paths = {}
+    for old_rel, new_rel, node in delta.renamed:
+        source = os.path.join(output_path, old_rel)
+        # Thư mục cha (nếu cũng đổi tên) chỉ được đổi sau con nên vẫn mang tên cũ
+        target = os.path.join(output_path, os.path.dirname(old_rel), os.path.basename(new_rel))
+        try:
+            if os.path.lexists(target):
+                raise FileExistsError(17, os.strerror(17), target)
+            os.rename(source, target)
+        except FileNotFoundError:
+            added |= _descendants(tree, node)
+            continue
+        except OSError as e:
+            if on_error:
+                on_error(target, e)
+            continue
+        renamed_paths[old_rel] = new_rel
+        counts["renamed"] += 1
+        if on_renamed:
+            on_renamed(source, os.path.join(output_path, new_rel))
+
+    # Ghép tệp bị bỏ với tệp mới cùng tên; nguồn đã mất thì tệp mới được tạo như thường
+    new_files = {}
+    for node in delta.added:
+        if not tree.is_dir(node):
+            new_files.setdefault(tree.names[node], []).append(node)
+    moves = []
+    removals = []
+    # Dòng trùng cho nhiều bản ghi cùng một đường dẫn; mỗi nguồn và mỗi đích chỉ dùng một lần
+    sources = set()
+    targets = set(renamed_paths.values())
+    for rel_path, is_dir in delta.removed:
+        current = _current_path(rel_path, renamed_paths)
+        candidates = None if is_dir or current in sources else new_files.get(os.path.basename(rel_path))
+        while candidates and tree.rel_path(candidates[0]) in targets:
+            candidates.pop(0)
+        if candidates and os.path.lexists(os.path.join(output_path, current)):
+            node = candidates.pop(0)
+            target = tree.rel_path(node)
+            # Các nút trùng đường dẫn với đích cũng không được tạo nữa
+            added.difference_update(other for other in new_files[tree.names[node]]
+                                    if tree.rel_path(other) == target)
+            added.discard(node)
+            sources.add(current)
+            targets.add(target)
+            moves.append((current, node))
+        else:
+            removals.append((current, is_dir))
+    # Nguồn được đưa ra gốc đầu ra trước: chỗ cũ của nó có thể bị xóa hoặc thay bằng mục khác loại
+    staged = []
+    for index, (rel_path, node) in enumerate(moves):
+        source = os.path.join(output_path, rel_path)
+        holding = os.path.join(output_path, f".tbmove-{os.getpid()}-{index}")
+        try:
+            os.rename(source, holding)
+        except OSError:
+            # Không chuyển được thì tệp cũ xử lý như mục bị bỏ, tệp mới được tạo
+            removals.append((rel_path, False))
+            added.add(node)
+            continue
+        staged.append((source, holding, node))
+
+    def remove(rel_path, is_dir):
+        path = os.path.join(output_path, rel_path)
+        try:
+            if is_dir:
+                os.rmdir(path)
+            else:
+                stat = os.lstat(path)
+                if not prune and stat.st_size and created.get(_file_key(stat)) != (stat.st_size, stat.st_mtime_ns):
+                    raise OSError(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY), path)
+                os.unlink(path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            if e.errno in (errno.ENOTEMPTY, errno.EEXIST):
+                counts["kept"] += 1
+                if on_kept:
+                    on_kept(path)
+            elif on_error:
+                on_error(path, e)
+            return
+        counts["removed"] += 1
+        if on_removed:
+            on_removed(path)
+
+    for rel_path, is_dir in removals:
+        remove(rel_path, is_dir)
+
+    if added:
+        plan, skip = partial_plan(tree, sorted(added))
+
+        def on_op_created(op):
+            counts["added"] += 1
+            is_dir = plan.is_dir(op)
+            if not is_dir:
+                try:
+                    stat = os.lstat(os.path.join(output_path, plan.rel_path(op)))
+                    created[_file_key(stat)] = stat.st_size, stat.st_mtime_ns
+                except OSError:
+                    pass
+            if on_created:
+                on_created(plan.rel_path(op), is_dir)
+
+        materializer = Materializer(plan, output_path, max_workers=max_workers, on_created=on_op_created,
+                                    on_error=lambda op, path, e: on_error and on_error(path, e),
+                                    skip=skip, truncate=False, contents=contents)
+        materializer.run()
+
+    for source, holding, node in staged:
+        target = os.path.join(output_path, tree.rel_path(node))
+        try:
+            if os.path.lexists(target):
+                raise FileExistsError(17, os.strerror(17), target)
+            os.rename(holding, target)
+        except OSError as e:
+            if on_error:
+                on_error(target, e)
+            # Trả tệp về chỗ cũ nếu được, nếu không nó nằm lại ở gốc đầu ra dưới tên tạm
+            if not os.path.lexists(source):
+                try:
+                    os.rename(holding, source)
+                except OSError:
+                    pass
+            continue
+        counts["moved"] += 1
+        if on_moved:
+            on_moved(source, target)
+    return counts
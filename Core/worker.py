@@ -1,100 +1,458 @@
 # Core/worker.py
 import os
-import re
 import time
 from PySide6.QtCore import QObject, Signal, Slot
 
+from .ingest import TreeFile
+from .parser import TreeParser
+from .planner import BuildPlan
+from .sinks import FORMAT_DIR, open_sink
+from .templates import ContentResolver, TemplateRegistry
+from .validator import has_errors, target_limits, validate_tree
+from .journal import BuildJournal, JournalError, rollback
+from .sync import diff_tree, prune
+from .reverse import TreeTextGenerator
+from .events import (
+    SEVERITY_INFO, SEVERITY_WARNING, SEVERITY_ERROR, NO_NODE, EVENT_START, EVENT_FOLDER_CREATED,
+    EVENT_FILE_CREATED, EVENT_DONE, EVENT_STOPPED, EVENT_INDENT, EVENT_SYNC_SUMMARY, EVENT_CONFLICT,
+    EVENT_EXTRA, EVENT_REMOVED, EVENT_ERR_CRITICAL, EVENT_RESUMED, EVENT_ROLLED_BACK, EVENT_CHECK_FAILED,
+    EVENT_CACHE_HIT, EVENT_RENAMED, EVENT_WATCH_STARTED, EVENT_WATCH_APPLIED, EVENT_MOVED,
+    EVENT_WATCH_KEPT, EVENT_JOURNAL_UNAVAILABLE, LogFileWriter, error_entry,
+)
+from .watch import WATCH_WAIT_SECONDS, FileWatcher, WatchedSpec, apply_delta, validate_delta
+from .report import RunReport, profiled, record_cache_stats, record_journal_stats, record_materializer_stats
+
+# Giới hạn tần suất gửi tín hiệu về luồng giao diện
+FLUSH_INTERVAL = 0.05
+FLUSH_MAX_EVENTS = 1000
+
+
+class SignalBatcher:
+    """Gom các sự kiện tiến trình/nhật ký và phát theo lô.
+
+    Một lô được đẩy đi khi đã qua FLUSH_INTERVAL giây hoặc đã tích đủ
+    FLUSH_MAX_EVENTS sự kiện, nên luồng giao diện chỉ nhận vài chục tín hiệu mỗi
+    giây bất kể cây lớn đến đâu. Sự kiện là các bộ có cấu trúc (xem Core/events.py);
+    không có chuỗi nào được dịch hay định dạng ở đây.
+    """
+
+    def __init__(self, worker, interval=FLUSH_INTERVAL, max_events=FLUSH_MAX_EVENTS, log_file=None):
+        self.worker = worker
+        # LogFileWriter tùy chọn nhận mọi mục, kể cả những mục đã rơi khỏi bảng nhật ký
+        self.log_file = log_file
+        self.interval = interval
+        self.max_events = max_events
+        self._events = []
+        self._value = 0
+        self._status = None
+        self._last_flush = time.monotonic()
+        # Số tín hiệu đã phát và thời gian nằm trong emit(), cho RunReport
+        self.signals_emitted = 0
+        self.emit_seconds = 0.0
+
+    def progress(self, value, code, node=NO_NODE, detail=None):
+        self._value = value
+        self._status = entry = (SEVERITY_INFO, value, code, node, detail)
+        self._events.append(entry)
+        self._maybe_flush()
+
+    def warning(self, code, node=NO_NODE, detail=None):
+        self._events.append((SEVERITY_WARNING, None, code, node, detail))
+        self._maybe_flush()
+
+    def error(self, entry):
+        # Lỗi được đẩy đi ngay cùng lô đang chờ, giữ đúng thứ tự nhật ký
+        self._events.append(entry)
+        self.flush()
+
+    def entries(self, entries):
+        """Thêm các mục đã dựng sẵn (ví dụ kết quả kiểm tra trước) và đẩy đi ngay."""
+        self._events.extend(entries)
+        self.flush()
+
+    def _maybe_flush(self):
+        if len(self._events) >= self.max_events or time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._events:
+            return
+        events, self._events = self._events, []
+        if self.log_file:
+            self.log_file.write_entries(events)
+        started = time.perf_counter()
+        self.worker.log_batch.emit(events)
+        self.worker.progress_update.emit(self._value, self._status)
+        self.signals_emitted += 2
+        self.emit_seconds += time.perf_counter() - started
+
+
 class StructureBuilderWorker(QObject):
     finished = Signal()
-    progress_update = Signal(int, str)
-    error_occurred = Signal(str)
+    # Phần trăm và mục nhật ký mới nhất (để giao diện dựng dòng trạng thái)
+    progress_update = Signal(int, object)
+    # Danh sách mục nhật ký có cấu trúc đã gom (xem Core/events.py), dùng cho bảng nhật ký
+    log_batch = Signal(list)
+    # BuildPlan của lần chạy, phát trước mọi mục tham chiếu tới nút của nó
+    plan_ready = Signal(object)
+    # Báo cáo có cấu trúc (RunReport.as_dict()), phát ngay trước finished
+    report_ready = Signal(dict)
 
-    def __init__(self, tree_text, output_path, translations):
+    def __init__(self, tree_text, output_path, sync=False, prune=False,
+                 report_path=None, profile_path=None, log_path=None, output_format=FORMAT_DIR,
+                 templates_path=None, base_dir=None, journal_path=None, resume=False, cache=None, tree_path=None,
+                 keep_journal=True, allow_copy_outside=False):
         super().__init__()
         self.tree_text = tree_text
+        # Tùy chọn: đọc cây thẳng từ tệp (Core/ingest.py) thay vì tree_text, không nạp cả tệp vào bộ nhớ
+        self.tree_path = tree_path
         self.output_path = output_path
+        # Định dạng đầu ra (xem Core/sinks.py); sink giữ lại sau khi chạy để đọc MemorySink
+        self.output_format = output_format
+        self.sink = None
         self.is_running = True
-        self.translations = translations
+        # sync: chỉ tạo phần còn thiếu; prune: xóa thêm các mục không có trong cây.
+        # Chỉ có nghĩa với đầu ra là thư mục.
+        self.sync = sync
+        self.prune = prune
+        # Tùy chọn: ghi báo cáo ra JSON và chạy dưới cProfile (chỉ luồng của worker)
+        self.report_path = report_path
+        self.profile_path = profile_path
+        # Tùy chọn: tệp nhận toàn bộ nhật ký để xuất sau này
+        self.log_path = log_path
+        # Tùy chọn: tệp đăng ký mẫu nội dung (JSON) và thư mục gốc cho "# @copy" tương đối
+        self.templates_path = templates_path
+        self.base_dir = base_dir
+        # Cho phép nguồn "@copy" nằm ngoài base_dir (hoặc ngoài thư mục của tệp đăng ký)
+        self.allow_copy_outside = allow_copy_outside
+        # Tùy chọn: nhật ký thao tác (Core/journal.py) và tiếp tục từ nhật ký đã có.
+        # Chỉ dùng được khi đầu ra là thư mục.
+        self.journal_path = journal_path
+        self.resume = resume
+        # False: nhật ký chỉ để tiếp tục, bị xóa khi lần dựng chạy hết
+        self.keep_journal = keep_journal
+        # Tùy chọn: TreeCache; văn bản đã gặp được nạp lại thay vì phân tích và lập kế hoạch lại
+        self.cache = cache
 
     @Slot()
     def run(self):
+        events = SignalBatcher(self)
+        log_file = None
+        if self.log_path:
+            try:
+                log_file = events.log_file = LogFileWriter(self.log_path)
+            except OSError as e:
+                events.error(error_entry(NO_NODE, e, self.log_path))
+        report = RunReport()
         try:
-            self.progress_update.emit(0, self.translations.get("log_start_analysis"))
-            lines = self.tree_text.strip().split('\n')
-            total_lines = len(lines)
-            
-            def sanitize_name(name):
-                name_no_hash = name.split('#', 1)[0]
-                name_no_paren = re.sub(r'\(.*\)', '', name_no_hash)
-                clean_name = name_no_paren.strip()
-                # Biểu thức này vẫn đúng, nó dùng để làm sạch tên sau khi đã loại bỏ các dấu hiệu
-                return re.sub(r'[<>:"/\\|?*]', '_', clean_name)
-
-            path_stack = [self.output_path]
-            os.makedirs(self.output_path, exist_ok=True)
-
-            for i, line in enumerate(lines):
-                if not self.is_running:
-                    self.progress_update.emit(i * 100 // total_lines, self.translations.get("log_stopped_by_user"))
-                    break
-                
-                if not line.strip():
-                    continue
+            with profiled(self.profile_path), report.phase("total"):
+                self._build(events, report)
+        except Exception as e:
+            report.error(e)
+            events.error((SEVERITY_ERROR, None, EVENT_ERR_CRITICAL, NO_NODE, str(e)))
+        finally:
+            events.flush()
+            if log_file:
+                log_file.close()
+            # Cộng thêm report_ready và finished sắp được phát
+            report.count("signals_emitted", events.signals_emitted + 2)
+            if self.cache:
+                record_cache_stats(report, self.cache)
+            report.add_time("signals", events.emit_seconds)
+            if self.report_path:
+                try:
+                    report.write_json(self.report_path)
+                except OSError as e:
+                    events.error(error_entry(NO_NODE, e, self.report_path))
+            self.report_ready.emit(report.as_dict())
+            self.finished.emit()
 
-                match = re.match(r'^(?P<prefix>[│├└─\s]*)(?P<name>.*)', line)
-                if not match:
-                    self.error_occurred.emit(self.translations.get("err_syntax", line_num=i+1, line_content=line))
-                    continue
-                
-                prefix = match.group('prefix')
-                name_part = match.group('name').strip()
-                
-                level = len(prefix.replace('├──', '│  ').replace('└──', '   ')) // 4
-
-                # 1. Kiểm tra xem có phải là thư mục hay không DỰA TRÊN CHUỖI GỐC.
-                is_dir = name_part.rstrip().endswith('/')
-                
-                # 2. Lấy tên cần làm sạch: nếu là thư mục, loại bỏ dấu '/' ở cuối.
-                name_to_clean = name_part.rstrip('/') if is_dir else name_part
-                
-                # 3. Gửi tên đã được xử lý (không còn dấu '/') vào hàm làm sạch.
-                clean_name = sanitize_name(name_to_clean)
-                
-                if not clean_name:
+    def _load(self, events, report):
+        """(cây, kế hoạch đã đệm hoặc None, khóa đệm) của đầu vào."""
+        source = TreeFile(self.tree_path) if self.tree_path else self.tree_text
+        plan = cache_key = None
+        if self.cache:
+            with report.phase("cache_load"):
+                cache_key = self.cache.key(source)
+                cached = self.cache.load(cache_key)
+            if cached is not None:
+                tree, plan = cached
+                events.progress(0, EVENT_CACHE_HIT, detail={"nodes": len(tree)})
+        if plan is None:
+            with report.phase("parse"):
+                tree = source.parse() if self.tree_path else TreeParser.parse(source)
+        return tree, plan, cache_key
+
+    def _build(self, events, report):
+        """Một lần dựng đầy đủ; trả về False nếu kiểm tra trước thất bại, nếu không là đã chạy hết chưa."""
+        events.progress(0, EVENT_START)
+        tree, plan, cache_key = self._load(events, report)
+        report.count("lines_parsed", tree.total_lines)
+        report.count("nodes", len(tree))
+        report.count("nodes_skipped", tree.skipped)
+        report.count("indent_warnings", len(tree.warnings))
+        for line_num in tree.warnings:
+            events.warning(EVENT_INDENT, detail={"line_num": line_num})
+
+        # Kiểm tra trước khi chạm vào đĩa: lỗi ở bất kỳ đâu thì không tạo gì cả
+        with report.phase("check"):
+            limits = target_limits(self.output_path) if self.output_format == FORMAT_DIR else None
+            issues = validate_tree(tree, self.output_path, limits)
+        report.count("check_issues", len(issues))
+        if issues:
+            events.entries(issues)
+        if has_errors(issues):
+            errors = sum(1 for entry in issues if entry[0] == SEVERITY_ERROR)
+            events.error((SEVERITY_ERROR, 0, EVENT_CHECK_FAILED, NO_NODE,
+                          {"errors": errors, "warnings": len(issues) - errors}))
+            return False
+
+        if plan is None:
+            with report.phase("plan"):
+                plan = BuildPlan.compile(tree)
+            if self.cache:
+                with report.phase("cache_store"):
+                    self.cache.store(cache_key, tree, plan)
+        self.plan_ready.emit(plan)
+        report.count("duplicates_merged", plan.duplicates)
+        total_nodes = len(plan)
+        done = 0
+        existing = None
+        sink = self.sink = open_sink(self.output_path, self.output_format)
+        sync = self.sync and sink.supports_sync
+        if sync:
+            with report.phase("sync_scan"):
+                existing = self._sync_prepare(plan, events)
+            total_nodes = len(plan) - len(existing)
+        journal = None
+        if self.journal_path and sink.supports_sync:
+            try:
+                if self.resume and os.path.exists(self.journal_path):
+                    journal, done_ops = BuildJournal.resume(self.journal_path, plan)
+                    existing = done_ops if existing is None else existing | done_ops
+                    events.progress(0, EVENT_RESUMED, detail={"done": len(done_ops)})
+                else:
+                    journal = BuildJournal.create(self.journal_path, plan, self.output_path)
+            except (OSError, JournalError) as e:
+                # Nhật ký là tùy chọn: không ghi được thì vẫn dựng, chỉ không tiếp tục hay hoàn tác được
+                events.warning(EVENT_JOURNAL_UNAVAILABLE, detail={"path": self.journal_path, "error": str(e)})
+            total_nodes = len(plan) - len(existing or ())
+
+        def on_created(op):
+            nonlocal done
+            done += 1
+            code = EVENT_FOLDER_CREATED if plan.is_dir(op) else EVENT_FILE_CREATED
+            events.progress(done * 100 // max(total_nodes, 1), code, op)
+
+        def on_error(op, path, error):
+            report.error(error)
+            events.error(error_entry(op, error))
+
+        contents = None
+        if self.templates_path or plan.contents:
+            registry = (TemplateRegistry.load(self.templates_path, self.allow_copy_outside)
+                        if self.templates_path else None)
+            contents = ContentResolver(registry, self.base_dir, self.allow_copy_outside)
+        materializer = sink.materializer(plan, on_created=on_created, on_error=on_error,
+                                         is_cancelled=lambda: not self.is_running,
+                                         skip=existing, truncate=not sync, contents=contents,
+                                         journal=journal)
+        with report.phase("create"):
+            try:
+                completed = materializer.run()
+            finally:
+                sink.close()
+                if contents:
+                    contents.close()
+                if journal:
+                    journal.close()
+        record_materializer_stats(report, materializer.stats)
+        if journal:
+            record_journal_stats(report, journal)
+        if completed and journal and not self.keep_journal:
+            try:
+                os.remove(self.journal_path)
+            except OSError:
+                pass
+        if completed:
+            events.progress(100, EVENT_DONE)
+        else:
+            events.progress(done * 100 // max(total_nodes, 1), EVENT_STOPPED)
+        return completed
+
+    def _sync_prepare(self, plan, events):
+        """Quét thư mục đầu ra, báo cáo chênh lệch và trả về tập op đã tồn tại."""
+        report = diff_tree(plan, self.output_path)
+        events.progress(0, EVENT_SYNC_SUMMARY, detail={
+            "scanned": report.scanned_dirs, "missing": len(report.missing),
+            "extras": len(report.extras), "conflicts": len(report.conflicts)})
+        for op in report.conflicts:
+            events.warning(EVENT_CONFLICT, op)
+        if self.prune:
+            prune(report, plan, self.output_path,
+                  on_removed=lambda path: events.progress(0, EVENT_REMOVED, detail={"path": path}),
+                  on_error=lambda path, e: events.error(error_entry(NO_NODE, e, path)))
+        else:
+            for rel_path, _ in report.extras:
+                events.warning(EVENT_EXTRA, detail={"path": rel_path})
+        return report.existing
+
+    def stop(self):
+        self.is_running = False
+
+
+class WatchWorker(StructureBuilderWorker):
+    """Dựng đồng bộ từ tệp cây rồi áp dụng mỗi lần tệp được lưu, tới khi stop().
+
+    Mỗi thay đổi chỉ được phân tích lại quanh các dòng đã sửa và chỉ các mục
+    thêm, chuyển, đổi tên hoặc xóa chạm tới đĩa (xem Core/watch.py); tệp có nội
+    dung chỉ bị xóa khi prune. Mỗi thay đổi được kiểm tra trước trên phần cây
+    nó chạm tới; khi kiểm tra đó (hoặc kiểm tra của lần dựng đầy đủ) thất bại,
+    lần lưu sau được dựng đầy đủ lại.
+    """
+
+    def __init__(self, tree_path, output_path, prune=False, log_path=None, templates_path=None, base_dir=None,
+                 allow_copy_outside=False):
+        super().__init__(None, output_path, sync=True, prune=prune, log_path=log_path,
+                         templates_path=templates_path, base_dir=base_dir, tree_path=tree_path,
+                         allow_copy_outside=allow_copy_outside)
+        self.spec = WatchedSpec(tree_path)
+        # Tệp do chế độ theo dõi tạo, để biết tệp nào chưa bị sửa và xóa được khi không prune
+        self.created = {}
+
+    def _load(self, events, report):
+        with report.phase("parse"):
+            return self.spec.load(), None, None
+
+    def _build(self, events, report):
+        synced = super()._build(events, report)
+        with FileWatcher(self.tree_path) as watcher:
+            events.progress(100, EVENT_WATCH_STARTED, detail={"path": self.tree_path, "method": watcher.method})
+            while self.is_running:
+                if not watcher.wait(WATCH_WAIT_SECONDS):
                     continue
+                if synced:
+                    synced = self._apply_change(events, report)
+                else:
+                    synced = super()._build(events, report)
+                events.flush()
+        return True
 
-                while level >= len(path_stack):
-                    self.error_occurred.emit(self.translations.get("warn_indent", line_num=i + 1))
-                    path_stack.append(path_stack[-1])
-                
-                parent_path = path_stack[level]
-                current_path = os.path.join(parent_path, clean_name)
-                path_stack = path_stack[:level + 1]
+    def _apply_change(self, events, report):
+        """Áp dụng lần lưu mới nhất; False nếu kiểm tra trước từ chối nó (cần dựng đầy đủ lại)."""
+        started = time.perf_counter()
+        try:
+            delta = self.spec.update()
+        except (OSError, ValueError) as e:
+            # Tệp đang được ghi dở hoặc JSON chưa hợp lệ: chờ lần lưu sau
+            events.error((SEVERITY_ERROR, None, EVENT_ERR_CRITICAL, NO_NODE, str(e)))
+            return True
+        if delta is None:
+            return True
+        issues = validate_delta(delta, self.output_path, target_limits(self.output_path))
+        if issues:
+            events.entries(issues)
+        if has_errors(issues):
+            errors = sum(1 for entry in issues if entry[0] == SEVERITY_ERROR)
+            events.error((SEVERITY_ERROR, 100, EVENT_CHECK_FAILED, NO_NODE,
+                          {"errors": errors, "warnings": len(issues) - errors}))
+            return False
+        if not delta:
+            return True
 
-                try:
-                    if is_dir:
-                        os.makedirs(current_path, exist_ok=True)
-                        path_stack.append(current_path)
-                        self.progress_update.emit((i + 1) * 100 // total_lines, self.translations.get("log_folder_created", name=clean_name))
-                    else:
-                        os.makedirs(os.path.dirname(current_path), exist_ok=True)
-                        with open(current_path, 'w', encoding='utf-8') as f:
-                            pass
-                        self.progress_update.emit((i + 1) * 100 // total_lines, self.translations.get("log_file_created", name=clean_name))
-                except PermissionError:
-                    self.error_occurred.emit(self.translations.get("err_permission", path=current_path))
-                except OSError as e:
-                    self.error_occurred.emit(self.translations.get("err_os", path=current_path, error=e))
-                
-                time.sleep(0.01)
+        def on_created(rel_path, is_dir):
+            code = EVENT_FOLDER_CREATED if is_dir else EVENT_FILE_CREATED
+            events.progress(100, code, detail={"name": rel_path})
+
+        def on_error(path, error):
+            report.error(error)
+            events.error(error_entry(NO_NODE, error, path))
+
+        contents = None
+        if self.templates_path or delta.tree.contents:
+            registry = (TemplateRegistry.load(self.templates_path, self.allow_copy_outside)
+                        if self.templates_path else None)
+            contents = ContentResolver(registry, self.base_dir, self.allow_copy_outside)
+        try:
+            counts = apply_delta(
+                delta, self.output_path, contents, prune=self.prune, created=self.created,
+                on_created=on_created,
+                on_removed=lambda path: events.progress(100, EVENT_REMOVED, detail={"path": path}),
+                on_renamed=lambda old, path: events.progress(100, EVENT_RENAMED, detail={"old": old, "path": path}),
+                on_moved=lambda old, path: events.progress(100, EVENT_MOVED, detail={"old": old, "path": path}),
+                on_kept=lambda path: events.warning(EVENT_WATCH_KEPT, detail={"path": path}),
+                on_error=on_error)
+        finally:
+            if contents:
+                contents.close()
+        events.progress(100, EVENT_WATCH_APPLIED, detail=dict(counts, seconds=time.perf_counter() - started))
+        return True
+
+
+class RollbackWorker(QObject):
+    """Hoàn tác một lần dựng theo nhật ký thao tác của nó (xem Core/journal.py)."""
+    finished = Signal()
+    progress_update = Signal(int, object)
+    log_batch = Signal(list)
+
+    def __init__(self, journal_path):
+        super().__init__()
+        self.journal_path = journal_path
+
+    @Slot()
+    def run(self):
+        events = SignalBatcher(self)
+        try:
+            removed = rollback(self.journal_path,
+                               on_removed=lambda path: events.progress(0, EVENT_REMOVED, detail={"path": path}),
+                               on_error=lambda path, e: events.error(error_entry(NO_NODE, e, path)))
+            events.progress(100, EVENT_ROLLED_BACK, detail={"removed": removed})
+        except Exception as e:
+            events.error((SEVERITY_ERROR, None, EVENT_ERR_CRITICAL, NO_NODE, str(e)))
+        finally:
+            events.flush()
+            self.finished.emit()
+
+    def stop(self):
+        # Hoàn tác luôn chạy tới cuối; dừng giữa chừng chỉ để lại một nửa bản dựng
+        pass
+
+
+class TreeDumpWorker(QObject):
+    """Sinh văn bản cây từ một thư mục có sẵn và gửi về giao diện theo từng khối."""
+    finished = Signal()
+    chunk_ready = Signal(str)
+    error_occurred = Signal(str)
 
-            if self.is_running:
-                self.progress_update.emit(100, self.translations.get("status_done"))
+    def __init__(self, root_path, translations):
+        super().__init__()
+        self.root_path = root_path
+        self.is_running = True
+        self.translations = translations
 
+    @Slot()
+    def run(self):
+        lines = []
+        last_flush = time.monotonic()
+        try:
+            generator = TreeTextGenerator(
+                self.root_path,
+                on_lossy=lambda path: self.error_occurred.emit(self.translations.get("warn_lossy_name", path=path)))
+            for line in generator.lines():
+                if not self.is_running:
+                    break
+                lines.append(line)
+                if len(lines) >= FLUSH_MAX_EVENTS or time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                    self.chunk_ready.emit("\n".join(lines))
+                    lines = []
+                    last_flush = time.monotonic()
+            if lines:
+                self.chunk_ready.emit("\n".join(lines))
         except Exception as e:
             self.error_occurred.emit(self.translations.get("err_critical", error=e))
         finally:
             self.finished.emit()
 
     def stop(self):
-        self.is_running = False
\ No newline at end of file
+        self.is_running = False
@@ -0,0 +1,326 @@
+# benchmarks/run_benchmarks.py
+# Đo thông lượng phân tích, biên dịch kế hoạch và tạo cây trên đĩa, kèm số syscall
+# dự kiến của kế hoạch so với cách làm cũ (BuildPlan.syscall_counts, baseline_syscall_counts).
+#
+#   python benchmarks/run_benchmarks.py --preset large --output results.json
+#   python benchmarks/run_benchmarks.py --preset large --baseline results.json --threshold 0.2
+#
+# Khi có --baseline, chương trình thoát với mã 1 nếu một phép đo chậm hơn mốc
+# quá tỉ lệ --threshold.
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+if BENCH_DIR not in sys.path:
+    sys.path.insert(0, BENCH_DIR)
+
+from Core.parser import TreeParser
+from Core.planner import BuildPlan, baseline_syscall_counts
+from Core.journal import JOURNAL_EXTENSION, BuildJournal
+from Core.materializer import Materializer, StreamingMaterializer
+from Core.sinks import FORMAT_MEMORY, FORMAT_TAR, FORMAT_ZIP, open_sink
+from Core.templates import ContentResolver, TemplateRegistry, SPEC_TEXT
+from synthetic import PRESETS, TreeSpec, generate_text
+
+
+def scratch_root():
+    """Thư mục tạm, ưu tiên tmpfs để đo chi phí của chương trình thay vì của đĩa."""
+    for candidate in ("/dev/shm", None):
+        if candidate is None or os.path.isdir(candidate):
+            return tempfile.mkdtemp(prefix="tree_bench_", dir=candidate)
+
+
+def timed(func, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        func(state)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_parse(text, repeat):
+    return timed(lambda _: TreeParser.parse(text), repeat)
+
+
+def bench_plan(text, repeat):
+    tree = TreeParser.parse(text)
+    return timed(lambda _: BuildPlan.compile(tree), repeat)
+
+
+def bench_materialize(text, repeat, scratch):
+    plan = BuildPlan.compile(TreeParser.parse(text))
+
+    def setup():
+        target = os.path.join(scratch, "parallel")
+        shutil.rmtree(target, ignore_errors=True)
+        return target
+
+    return timed(lambda target: Materializer(plan, target).run(), repeat, setup)
+
+
+def bench_content(text, repeat, scratch):
+    """Như materialize_parallel nhưng mỗi tệp .txt nhận cùng một mẫu nội dung 4 KiB."""
+    plan = BuildPlan.compile(TreeParser.parse(text))
+    registry = TemplateRegistry()
+    registry.extensions[".txt"] = (SPEC_TEXT, "x" * 4095 + "\n")
+
+    def setup():
+        target = os.path.join(scratch, "content")
+        shutil.rmtree(target, ignore_errors=True)
+        return target
+
+    def run(target):
+        contents = ContentResolver(registry)
+        try:
+            Materializer(plan, target, contents=contents).run()
+        finally:
+            contents.close()
+
+    return timed(run, repeat, setup)
+
+
+def bench_journal(text, repeat, scratch):
+    """Như materialize_parallel nhưng có nhật ký thao tác; chênh lệch là chi phí ghi nhật ký."""
+    plan = BuildPlan.compile(TreeParser.parse(text))
+    journal_path = os.path.join(scratch, "journal" + JOURNAL_EXTENSION)
+
+    def setup():
+        target = os.path.join(scratch, "journal")
+        shutil.rmtree(target, ignore_errors=True)
+        return target
+
+    def run(target):
+        journal = BuildJournal.create(journal_path, plan, target)
+        try:
+            Materializer(plan, target, journal=journal).run()
+        finally:
+            journal.close()
+
+    return timed(run, repeat, setup)
+
+
+def bench_stream(text, repeat, scratch):
+    def setup():
+        target = os.path.join(scratch, "stream")
+        shutil.rmtree(target, ignore_errors=True)
+        return target
+
+    def run(target):
+        parser = TreeParser()
+        builder = StreamingMaterializer(parser.tree, target)
+        created = 0
+        for line in text.split("\n"):
+            parser.feed_line(line)
+            while created < parser.ready:
+                builder.create(created)
+                created += 1
+        parser.close()
+        for index in range(created, len(parser.tree)):
+            builder.create(index)
+
+    return timed(run, repeat, setup)
+
+
+def bench_sink(fmt):
+    """Ghi kế hoạch vào một sink không phải thư mục (tệp nén hoặc bộ nhớ)."""
+    def bench(text, repeat, scratch):
+        plan = BuildPlan.compile(TreeParser.parse(text))
+
+        def run(_):
+            sink = open_sink(os.path.join(scratch, "archive." + fmt), fmt)
+            try:
+                sink.materializer(plan).run()
+            finally:
+                sink.close()
+
+        return timed(run, repeat)
+    return bench
+
+
+def bench_stdlib_archive(fmt):
+    """Cùng kế hoạch ghi bằng zipfile/tarfile của thư viện chuẩn: mốc so sánh cho ZipSink/TarSink.
+
+    Đường dẫn được tính sẵn ngoài phần đo, nên mốc này còn được lợi hơn sink.
+    """
+    def bench(text, repeat, scratch):
+        plan = BuildPlan.compile(TreeParser.parse(text))
+        paths = [plan.rel_path(op).replace(os.sep, "/") + ("/" if plan.is_dir(op) else "")
+                 for op in range(len(plan))]
+        path = os.path.join(scratch, "stdlib." + fmt)
+
+        def run_zip(_):
+            date_time = time.localtime()[:6]
+            with zipfile.ZipFile(path, "w") as archive:
+                for name in paths:
+                    archive.writestr(zipfile.ZipInfo(name, date_time), b"")
+
+        def run_tar(_):
+            mtime = int(time.time())
+            with tarfile.open(path, "w", format=tarfile.GNU_FORMAT) as archive:
+                for op, name in enumerate(paths):
+                    info = tarfile.TarInfo(name)
+                    info.type = tarfile.DIRTYPE if plan.is_dir(op) else tarfile.REGTYPE
+                    info.mtime = mtime
+                    archive.addfile(info)
+
+        return timed(run_zip if fmt == FORMAT_ZIP else run_tar, repeat)
+    return bench
+
+
+def bench_worker(text, repeat, scratch):
+    """Toàn bộ StructureBuilderWorker.run (cần PySide6); trả về None nếu không có Qt."""
+    try:
+        from PySide6.QtCore import QCoreApplication
+        from Core.worker import StructureBuilderWorker
+    except ImportError:
+        return None
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setup():
+        target = os.path.join(scratch, "worker")
+        shutil.rmtree(target, ignore_errors=True)
+        return StructureBuilderWorker(text, target)
+
+    samples = timed(lambda worker: worker.run(), repeat, setup)
+    app.processEvents()
+    return samples
+
+
+BENCHMARKS = {
+    "parse": lambda text, repeat, scratch: bench_parse(text, repeat),
+    "plan": lambda text, repeat, scratch: bench_plan(text, repeat),
+    "materialize_parallel": bench_materialize,
+    "materialize_stream": bench_stream,
+    "materialize_content": bench_content,
+    "materialize_journal": bench_journal,
+    "materialize_zip": bench_sink(FORMAT_ZIP),
+    "materialize_tar": bench_sink(FORMAT_TAR),
+    "materialize_zip_stdlib": bench_stdlib_archive(FORMAT_ZIP),
+    "materialize_tar_stdlib": bench_stdlib_archive(FORMAT_TAR),
+    "materialize_memory": bench_sink(FORMAT_MEMORY),
+    "worker_end_to_end": bench_worker,
+}
+
+
+def summarize(samples, nodes):
+    median = statistics.median(samples)
+    return {
+        "median_s": median,
+        "min_s": min(samples),
+        "runs": len(samples),
+        "nodes": nodes,
+        "nodes_per_s": nodes / median if median else None,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Trả về danh sách thông báo cho các phép đo chậm hơn mốc quá ngưỡng.
+
+    So sánh thời gian trên mỗi nút để hai lần chạy với kích thước cây khác nhau
+    vẫn so được với nhau.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        ratio = (result["median_s"] / result["nodes"]) / (previous["median_s"] / previous["nodes"])
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {previous['median_s']:.4f}s -> {result['median_s']:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Directory Tree Builder benchmarks")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium")
+    parser.add_argument("--depth", type=int, help="override preset depth")
+    parser.add_argument("--fanout", type=int, help="override preset directories per directory")
+    parser.add_argument("--files", type=int, help="override preset files per directory")
+    parser.add_argument("--name-length", type=int, help="override preset name length")
+    parser.add_argument("--unicode", type=float, help="ratio of names using non-ASCII characters")
+    parser.add_argument("--comments", type=float, help="ratio of file lines with a '#' comment")
+    parser.add_argument("--annotations", type=float, help="ratio of lines with a '(...)' annotation")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown relative to the baseline (0.2 = 20%%)")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    spec = TreeSpec(**PRESETS[args.preset].as_dict())
+    overrides = {"depth": args.depth, "fanout": args.fanout, "files_per_dir": args.files,
+                 "name_length": args.name_length, "unicode_ratio": args.unicode,
+                 "comment_ratio": args.comments, "annotation_ratio": args.annotations}
+    for key, value in overrides.items():
+        if value is not None:
+            setattr(spec, key, value)
+
+    text = generate_text(spec)
+    tree = TreeParser.parse(text)
+    nodes = len(tree)
+    print(f"{args.preset}: {nodes} nodes, {len(text.encode('utf-8')) / 1e6:.1f} MB of text")
+    # Syscall dự kiến của kế hoạch so với cách làm cũ (os.makedirs cho mỗi nút)
+    syscalls = {"plan": BuildPlan.compile(tree).syscall_counts(), "baseline": baseline_syscall_counts(tree)}
+    for label, counts in syscalls.items():
+        print(f"syscalls {label:<13} " + ", ".join(f"{key}={value}" for key, value in counts.items())
+              + f"  (total {sum(counts.values())})")
+
+    scratch = scratch_root()
+    results = {}
+    try:
+        for name in args.only or BENCHMARKS:
+            samples = BENCHMARKS[name](text, args.repeat, scratch)
+            if samples is None:
+                print(f"{name:<22} skipped (PySide6 not available)")
+                continue
+            results[name] = summarize(samples, nodes)
+            print(f"{name:<22} median {results[name]['median_s']:.4f}s  "
+                  f"{results[name]['nodes_per_s']:,.0f} nodes/s")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "spec": spec.as_dict(),
+        "syscalls": syscalls,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# benchmarks/synthetic.py
+# Sinh văn bản cây tổng hợp để đo hiệu năng, có thể điều chỉnh độ sâu, số nhánh,
+# độ dài tên, tên Unicode, chú thích '#' và phần chú giải trong ngoặc.
+import random
+import string
+
+_ASCII = string.ascii_lowercase + string.digits + "_-"
+_UNICODE = "áàảãạăâđêôơưéèíóúýαβγδλπσωабвгдежзあいうえおかきくけこ漢字木林森"
+
+BRANCH = "├── "
+LAST_BRANCH = "└── "
+PIPE = "│   "
+SPACE = "    "
+
+
+class TreeSpec:
+    """Tham số của cây tổng hợp."""
+
+    def __init__(self, depth=4, fanout=6, files_per_dir=8, name_length=12, unicode_ratio=0.0,
+                 comment_ratio=0.0, annotation_ratio=0.0, seed=1234):
+        self.depth = depth
+        self.fanout = fanout
+        self.files_per_dir = files_per_dir
+        self.name_length = name_length
+        self.unicode_ratio = unicode_ratio
+        self.comment_ratio = comment_ratio
+        self.annotation_ratio = annotation_ratio
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def node_count(self):
+        """Số dòng sẽ được sinh (kể cả dòng gốc)."""
+        total, dirs = 1, 1
+        for _ in range(self.depth):
+            total += dirs * (self.fanout + self.files_per_dir)
+            dirs *= self.fanout
+        # Các thư mục ở cấp cuối vẫn chứa tệp
+        return total + dirs * self.files_per_dir
+
+
+# Các cấu hình có sẵn; "large" khoảng 100 nghìn dòng
+PRESETS = {
+    "small": TreeSpec(depth=3, fanout=4, files_per_dir=5),
+    "medium": TreeSpec(depth=4, fanout=5, files_per_dir=10, unicode_ratio=0.1,
+                       comment_ratio=0.05, annotation_ratio=0.05),
+    "large": TreeSpec(depth=5, fanout=6, files_per_dir=10, unicode_ratio=0.1,
+                      comment_ratio=0.05, annotation_ratio=0.05),
+}
+
+
+def generate_lines(spec):
+    """Sinh từng dòng của cây theo spec (không có ký tự xuống dòng)."""
+    rng = random.Random(spec.seed)
+
+    def name(kind, index):
+        alphabet = _UNICODE if rng.random() < spec.unicode_ratio else _ASCII
+        stem = "".join(rng.choice(alphabet) for _ in range(spec.name_length))
+        return f"{kind}{index}_{stem}"
+
+    def annotate(text):
+        if rng.random() < spec.annotation_ratio:
+            text += " (generated)"
+        return text
+
+    def comment(text):
+        # Chú thích chỉ gắn vào tệp: với thư mục, '/' phải là ký tự cuối dòng
+        if rng.random() < spec.comment_ratio:
+            text += "  # note"
+        return text
+
+    yield "root/"
+    # Mỗi khung: (tiền tố, độ sâu, danh sách con còn lại)
+    stack = []
+
+    def children(depth):
+        entries = []
+        if depth < spec.depth:
+            entries.extend(("d", i) for i in range(spec.fanout))
+        entries.extend(("f", i) for i in range(spec.files_per_dir))
+        return entries
+
+    stack.append(("", 0, children(0), 0))
+    while stack:
+        prefix, depth, entries, position = stack.pop()
+        if position == len(entries):
+            continue
+        stack.append((prefix, depth, entries, position + 1))
+        kind, index = entries[position]
+        is_last = position + 1 == len(entries)
+        connector = LAST_BRANCH if is_last else BRANCH
+        if kind == "d":
+            yield prefix + connector + annotate(name("dir", index)) + "/"
+            stack.append((prefix + (SPACE if is_last else PIPE), depth + 1, children(depth + 1), 0))
+        else:
+            yield prefix + connector + comment(annotate(name("file", index) + ".txt"))
+
+
+def generate_text(spec):
+    return "\n".join(generate_lines(spec))
@@ -0,0 +1,74 @@
+# tests/test_journal.py
+# Kiểm thử nhật ký dựng (Core/journal.py): hoàn tác sau một lần dựng bị chết giữa
+# chừng chỉ xóa những gì lần dựng đó tạo, không đụng tới mục đã có từ trước.
+#
+#   python -m pytest tests        hoặc        python -m unittest discover tests
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Core import journal as journal_module
+from Core.journal import BuildJournal, rollback
+from Core.materializer import Materializer
+from Core.parser import TreeParser
+from Core.planner import BuildPlan
+
+
+class Crash(Exception):
+    """Thay cho tiến trình bị giết: không bị Materializer bắt như OSError."""
+
+
+class CrashingContent:
+    """Nội dung mà việc ghi làm "chết" tiến trình, sau khi tệp đã được mở (và cắt)."""
+
+    def write_to(self, fd):
+        raise Crash()
+
+
+class CrashingResolver:
+    # Materializer chỉ dùng bộ phân giải khi có chỉ thị hoặc tệp đăng ký
+    registry = True
+
+    def for_file(self, name, spec):
+        return CrashingContent() if name == "old.txt" else None
+
+
+class RollbackAfterCrashTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.temp_dir, "out")
+        self.journal_path = self.output + ".tbjournal"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_pre_existing_file_survives_rollback(self):
+        os.makedirs(self.output)
+        old = os.path.join(self.output, "old.txt")
+        with open(old, "w", encoding="utf-8") as f:
+            f.write("keep me")
+        # ctime của tệp cũ phải sớm hơn khối ý định (không dung sai trong kiểm thử)
+        time.sleep(1.1)
+        plan = BuildPlan.compile(TreeParser.parse("new.txt\nold.txt\n"))
+        with mock.patch.object(journal_module, "INTENT_SLACK_SECONDS", 0):
+            journal = BuildJournal.create(self.journal_path, plan, self.output)
+            with self.assertRaises(Crash):
+                Materializer(plan, self.output, contents=CrashingResolver(), journal=journal, max_workers=1).run()
+            # Tiến trình chết: bản ghi kết quả còn trong bộ nhớ không bao giờ được ghi
+            os.close(journal._fd)
+            rollback(self.journal_path)
+        self.assertTrue(os.path.exists(old))
+        self.assertFalse(os.path.exists(os.path.join(self.output, "new.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
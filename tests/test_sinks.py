@@ -0,0 +1,115 @@
+# tests/test_sinks.py
+# Kiểm thử các sink tệp nén (Core/sinks.py): ZipSink và TarSink tự ghi bản ghi,
+# nên kết quả phải đọc lại được bằng zipfile/tarfile của thư viện chuẩn và chứa
+# đúng những mục mà MemorySink nhận cho cùng một cây.
+#
+#   python -m pytest tests        hoặc        python -m unittest discover tests
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Core.parser import TreeParser
+from Core.planner import BuildPlan
+from Core.sinks import (FORMAT_MEMORY, FORMAT_TAR, FORMAT_TAR_BZ2, FORMAT_TAR_GZ, FORMAT_TAR_XZ, FORMAT_ZIP,
+                        open_sink)
+from Core.templates import ContentResolver
+
+LONG_DIR = "d" * 60
+TREE_TEXT = f"""project/
+    src/
+        main.py  # @text print("hi")\\n
+        tiếng_việt.txt  # @text xin chào
+        empty.txt
+    {LONG_DIR}/
+        {LONG_DIR}/
+            {"f" * 90}.txt  # @text ustar prefix
+            {"g" * 120}.txt  # @text gnu longname
+    README.md
+"""
+
+
+def build(text, fmt, path=None):
+    plan = BuildPlan.compile(TreeParser.parse(text))
+    sink = open_sink(path, fmt)
+    errors = []
+    try:
+        sink.materializer(plan, contents=ContentResolver(), on_error=lambda op, p, e: errors.append((p, e))).run()
+    finally:
+        sink.close()
+    return sink, errors
+
+
+def expected(text):
+    sink, errors = build(text, FORMAT_MEMORY)
+    assert not errors, errors
+    return {path + "/" if data is None else path: data for path, data in sink.entries.items()}
+
+
+class ArchiveSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp(prefix="tree_sinks_")
+
+    def tearDown(self):
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+    def read_zip(self, path):
+        with zipfile.ZipFile(path) as archive:
+            self.assertIsNone(archive.testzip())
+            return {info.filename: None if info.is_dir() else archive.read(info) for info in archive.infolist()}
+
+    def read_tar(self, path):
+        with tarfile.open(path) as archive:
+            return {member.name + "/" if member.isdir() else member.name:
+                    None if member.isdir() else archive.extractfile(member).read()
+                    for member in archive.getmembers()}
+
+    def test_zip_round_trip(self):
+        path = os.path.join(self.scratch, "out.zip")
+        _, errors = build(TREE_TEXT, FORMAT_ZIP, path)
+        self.assertEqual(errors, [])
+        entries = self.read_zip(path)
+        want = expected(TREE_TEXT)
+        self.assertEqual(sorted(entries), sorted(want))
+        for name, data in want.items():
+            if data is not None:
+                self.assertEqual(entries[name], data, name)
+
+    def test_zip64_entry_count(self):
+        # Quá 65535 mục: cần bản ghi kết thúc zip64
+        text = "many/\n" + "".join(f"    f{i}.txt\n" for i in range(70000))
+        path = os.path.join(self.scratch, "many.zip")
+        _, errors = build(text, FORMAT_ZIP, path)
+        self.assertEqual(errors, [])
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+        self.assertEqual(len(names), 70001)
+        self.assertEqual(names[-1], "many/f69999.txt")
+
+    def test_tar_round_trip(self):
+        want = expected(TREE_TEXT)
+        for fmt in (FORMAT_TAR, FORMAT_TAR_GZ, FORMAT_TAR_BZ2, FORMAT_TAR_XZ):
+            with self.subTest(fmt=fmt):
+                path = os.path.join(self.scratch, "out." + fmt)
+                _, errors = build(TREE_TEXT, fmt, path)
+                self.assertEqual(errors, [])
+                self.assertEqual(self.read_tar(path), want)
+
+    def test_duplicate_paths_written_once(self):
+        text = "a/\n    b.txt\na/\n    b.txt\n    c.txt\n"
+        for fmt, reader in ((FORMAT_ZIP, self.read_zip), (FORMAT_TAR, self.read_tar)):
+            with self.subTest(fmt=fmt):
+                path = os.path.join(self.scratch, "dup." + fmt)
+                build(text, fmt, path)
+                self.assertEqual(sorted(reader(path)), ["a/", "a/b.txt", "a/c.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# tests/test_templates.py
+# Kiểm thử nguồn "@copy" (Core/templates.py): chỉ được đọc tệp trong thư mục gốc
+# của nó, trừ khi được cho phép rõ ràng.
+#
+#   python -m pytest tests        hoặc        python -m unittest discover tests
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Core.templates import SPEC_COPY, SPEC_TEMPLATE, ContentResolver, TemplateError, TemplateRegistry
+
+
+class CopySourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = os.path.join(self.temp_dir, "base")
+        os.makedirs(os.path.join(self.base, "sub"))
+        self.write(os.path.join(self.base, "sub", "inside.txt"), "inside")
+        self.secret = os.path.join(self.temp_dir, "secret.txt")
+        self.write(self.secret, "secret")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, resolver, value):
+        content = resolver.for_file("x.txt", (SPEC_COPY, value))
+        try:
+            return bytes(content.data)
+        finally:
+            resolver.close()
+
+    def test_source_inside_base(self):
+        self.assertEqual(self.read(ContentResolver(base_dir=self.base), os.path.join("sub", "inside.txt")), b"inside")
+        self.assertEqual(self.read(ContentResolver(base_dir=self.base), "sub/../sub/inside.txt"), b"inside")
+
+    def test_source_outside_base_is_rejected(self):
+        for value in (os.path.join("..", "secret.txt"), self.secret):
+            with self.assertRaises(TemplateError):
+                ContentResolver(base_dir=self.base).for_file("x.txt", (SPEC_COPY, value))
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "needs symlinks")
+    def test_symlink_pointing_outside_is_rejected(self):
+        link = os.path.join(self.base, "link.txt")
+        try:
+            os.symlink(self.secret, link)
+        except OSError:
+            self.skipTest("cannot create symlinks")
+        with self.assertRaises(TemplateError):
+            ContentResolver(base_dir=self.base).for_file("x.txt", (SPEC_COPY, "link.txt"))
+
+    def test_allow_outside(self):
+        resolver = ContentResolver(base_dir=self.base, allow_outside=True)
+        self.assertEqual(self.read(resolver, os.path.join("..", "secret.txt")), b"secret")
+
+    def test_cached_error_is_raised_fresh(self):
+        resolver = ContentResolver(base_dir=self.base)
+        errors = []
+        for _ in range(3):
+            with self.assertRaises(TemplateError) as raised:
+                resolver.for_file("x.txt", (SPEC_COPY, "missing.txt"))
+            errors.append(raised.exception)
+        self.assertEqual(len({id(error) for error in errors}), 3)
+        # Lỗi đã lưu là nguyên nhân chung, không tích thêm traceback
+        cause = errors[0].__cause__
+        self.assertIsInstance(cause, FileNotFoundError)
+        self.assertTrue(all(error.__cause__ is cause for error in errors))
+        self.assertIsNone(cause.__traceback__)
+
+    def test_registry_sources(self):
+        path = os.path.join(self.base, "templates.json")
+        self.write(path, json.dumps({"templates": {"in": {"copy": "sub/inside.txt"}}}))
+        registry = TemplateRegistry.load(path)
+        # Nguồn của tệp đăng ký tính từ thư mục của nó, không phải base_dir của dòng cây
+        resolver = ContentResolver(registry, base_dir=os.path.join(self.base, "sub"))
+        self.assertEqual(bytes(resolver.for_file("x.txt", (SPEC_TEMPLATE, "in")).data), b"inside")
+        resolver.close()
+
+        self.write(path, json.dumps({"templates": {"out": {"copy": "../secret.txt"}}}))
+        with self.assertRaises(TemplateError):
+            TemplateRegistry.load(path)
+        self.assertIn("out", TemplateRegistry.load(path, allow_outside=True).templates)
+
+
+if __name__ == "__main__":
+    unittest.main()
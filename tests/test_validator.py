@@ -0,0 +1,47 @@
+# tests/test_validator.py
+# Kiểm thử thông điệp của kiểm tra trước (Core/validator.py, Core/events.py):
+# có số dòng với đầu vào dạng dòng, không có với JSON (mọi nút mang dòng 0).
+#
+#   python -m pytest tests        hoặc        python -m unittest discover tests
+import os
+import sys
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Core.events import EventRenderer
+from Core.parser import TreeParser
+from Core.translations import Translations
+from Core.validator import validate_tree
+
+
+class CheckMessageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.language = Translations.current_lang
+        Translations.set_language(Translations.LANG_EN)
+
+    def tearDown(self):
+        Translations.set_language(self.language)
+
+    def messages(self, text):
+        renderer = EventRenderer(Translations)
+        return [renderer.message(entry) for entry in validate_tree(TreeParser.parse(text))]
+
+    def test_line_input_names_lines(self):
+        self.assertEqual(self.messages("p/\n  a.txt\n  A.txt\n  a.txt\n"), [
+            "Line 3: 'p/A.txt' differs from 'a.txt' (line 2) only in letter case.",
+            "Line 4: file 'p/a.txt' already listed on line 2; the later one is ignored.",
+        ])
+
+    def test_json_input_omits_lines(self):
+        self.assertEqual(self.messages('{"p": {"a.txt": null, "A.txt": null, "b?": null, "b_": null}}'), [
+            "'p/A.txt' differs from 'a.txt' only in letter case.",
+            "'b_' and 'b?' both become 'p/b_' after name cleanup.",
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
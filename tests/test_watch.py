@@ -0,0 +1,360 @@
+# tests/test_watch.py
+# Kiểm thử chế độ theo dõi (Core/watch.py): cây ghép lại sau mỗi lần sửa phải
+# giống hệt cây phân tích lại từ đầu, và thư mục sau apply_delta phải giống một
+# lần dựng mới của cây mới.
+#
+#   python -m pytest tests        hoặc        python -m unittest discover tests
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from Core.events import SEVERITY_ERROR
+from Core.ingest import TreeFile
+from Core.materializer import Materializer
+from Core.planner import BuildPlan
+from Core.validator import validate_tree
+from Core.watch import FileWatcher, SplicingParser, WatchedSpec, apply_delta, splice_issues, validate_delta
+
+NAMES = ["a", "b", "c", "d", "e.txt", "f.py", "g"]
+
+
+def tree_fields(tree):
+    return {
+        "parents": list(tree.parents), "names": list(tree.names), "dir_bits": bytes(tree.dir_bits),
+        "line_nums": list(tree.line_nums), "contents": dict(tree.contents), "originals": dict(tree.originals),
+        "warnings": list(tree.warnings), "skipped": tree.skipped, "total_lines": tree.total_lines,
+    }
+
+
+def snapshot(root):
+    """{(đường dẫn tương đối, là thư mục)} của mọi mục dưới root."""
+    found = set()
+    for directory, dirs, files in os.walk(root):
+        for name in dirs:
+            found.add((os.path.relpath(os.path.join(directory, name), root), True))
+        for name in files:
+            found.add((os.path.relpath(os.path.join(directory, name), root), False))
+    return found
+
+
+def has_duplicates(tree):
+    return len({tree.rel_path(node) for node in range(len(tree))}) != len(tree)
+
+
+class WatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.spec_path = os.path.join(self.temp_dir, "spec.txt")
+        self.output = os.path.join(self.temp_dir, "out")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, lines):
+        with open(self.spec_path, "w", encoding="utf-8", newline="") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def load(self, lines):
+        self.write(lines)
+        spec = WatchedSpec(self.spec_path)
+        spec.load()
+        return spec
+
+    def update(self, spec, lines):
+        """Sửa tệp thành lines và kiểm tra cây ghép lại khớp với cây phân tích lại từ đầu."""
+        self.write(lines)
+        delta = spec.update()
+        self.assertEqual(tree_fields(spec.tree), tree_fields(TreeFile(self.spec_path).parse()), lines)
+        return delta
+
+    def build(self, tree, output):
+        shutil.rmtree(output, ignore_errors=True)
+        Materializer(BuildPlan.compile(tree), output).run()
+
+    def assert_matches_fresh_build(self, tree):
+        reference = os.path.join(self.temp_dir, "reference")
+        self.build(tree, reference)
+        self.assertEqual(snapshot(self.output), snapshot(reference))
+
+
+class WatchedSpecUpdateTest(WatchTestCase):
+    """WatchedSpec.update() so với TreeParser dựng lại cả tệp."""
+
+    def test_insert_delete_and_replace(self):
+        spec = self.load(["project/", "    src/", "        main.py", "    README.md"])
+        self.update(spec, ["project/", "    src/", "        main.py", "        util.py", "    README.md"])
+        self.update(spec, ["project/", "    src/", "        util.py", "    README.md"])
+        self.update(spec, ["project/", "    lib/", "        a.py", "        b.py", "    README.md"])
+        self.update(spec, ["project/", "    README.md"])
+
+    def test_swap_lines(self):
+        spec = self.load(["root/", "  a.txt", "  b.txt", "  c/", "    d.txt"])
+        delta = self.update(spec, ["root/", "  b.txt", "  a.txt", "  c/", "    d.txt"])
+        # Hai dòng đổi chỗ: cùng tập đường dẫn, không có gì để làm
+        self.assertEqual(len(delta), 0)
+
+    def test_rename(self):
+        spec = self.load(["project/", "    src/", "        main.py", "    README.md"])
+        delta = self.update(spec, ["project/", "    source/", "        main.py", "    README.md"])
+        self.assertEqual([(old, new) for old, new, _ in delta.renamed],
+                         [(os.path.join("project", "src"), os.path.join("project", "source"))])
+        self.assertEqual(delta.added, [])
+        self.assertEqual(delta.removed, [])
+
+    def test_directory_to_file_and_back(self):
+        spec = self.load(["root/", "  a/", "    x.txt", "  b.txt"])
+        self.update(spec, ["root/", "  a", "  b.txt"])
+        self.update(spec, ["root/", "  a", "    y.txt", "  b.txt"])
+        self.update(spec, ["root/", "  a/", "  b.txt"])
+
+    def test_first_line_and_dot_root(self):
+        spec = self.load([".", "├── a/", "│   └── b.txt", "└── c.txt"])
+        self.update(spec, ["├── a/", "│   └── b.txt", "└── c.txt"])
+        self.update(spec, [".", "├── a/", "│   └── b.txt", "└── c.txt"])
+        self.update(spec, ["  x/", "    y.txt"])
+
+    def test_path_lists_and_directives(self):
+        spec = self.load(["a/b/c.txt", "a/d/", "e.txt  # @text hello"])
+        self.update(spec, ["a/b/c.txt", "a/b/x.txt", "a/d/", "e.txt  # @text hello"])
+        self.update(spec, ["a/b/", "a/d/f.txt", "e.txt  # @text bye"])
+
+    def test_random_edits(self):
+        rng = random.Random(1234)
+
+        def line(kind):
+            name = rng.choice(NAMES) + rng.choice(["", "", "/", "  # @text hi", " (note)", "  # c"])
+            if kind == "glyph":
+                return "│   " * rng.randint(0, 3) + rng.choice(["├── ", "└── "]) + name
+            if kind == "tab":
+                return "\t" * rng.randint(0, 3) + name
+            if kind == "paths":
+                return "/".join(rng.choice(NAMES) for _ in range(rng.randint(1, 3))) + rng.choice(["", "/"])
+            return "    " * rng.randint(0, 3) + name
+
+        for _ in range(150):
+            kind = rng.choice(["indent", "paths", "glyph", "tab"])
+            lines = [line(kind) for _ in range(rng.randint(0, 20))]
+            spec = self.load(lines)
+            for _ in range(5):
+                op = rng.random()
+                index = rng.randint(0, len(lines))
+                if op < 0.35:
+                    lines.insert(index, line(kind))
+                elif op < 0.45:
+                    lines.insert(index, "")
+                elif op < 0.7 and lines:
+                    del lines[min(index, len(lines) - 1)]
+                elif op < 0.9 and lines:
+                    lines[min(index, len(lines) - 1)] = line(kind)
+                else:
+                    end = rng.randint(index, len(lines))
+                    lines[index:end] = [line(kind) for _ in range(rng.randint(0, 4))]
+                self.update(spec, lines)
+
+
+class ApplyDeltaTest(WatchTestCase):
+    """apply_delta trên thư mục của cây cũ so với một lần dựng mới của cây mới."""
+
+    def apply(self, spec, lines, **kwargs):
+        delta = self.update(spec, lines)
+        if delta is None:
+            # Văn bản không đổi
+            return None
+        errors = []
+        counts = apply_delta(delta, self.output, on_error=lambda path, e: errors.append((path, e)), **kwargs)
+        self.assertEqual(errors, [])
+        return counts
+
+    def start(self, lines):
+        spec = self.load(lines)
+        self.build(spec.tree, self.output)
+        return spec
+
+    def test_insert_delete_swap_rename(self):
+        spec = self.start(["project/", "    src/", "        main.py", "    README.md"])
+        for lines in (["project/", "    src/", "        main.py", "        util.py", "    README.md"],
+                      ["project/", "    README.md", "    src/", "        util.py", "        main.py"],
+                      ["project/", "    lib/", "        util.py", "        main.py", "    README.md"],
+                      ["project/", "    lib/", "        main.py"]):
+            self.apply(spec, lines)
+            self.assert_matches_fresh_build(spec.tree)
+
+    def test_rename_keeps_directory_contents(self):
+        spec = self.start(["project/", "    src/", "        main.py"])
+        with open(os.path.join(self.output, "project", "src", "main.py"), "w") as f:
+            f.write("print(1)\n")
+        counts = self.apply(spec, ["project/", "    lib/", "        main.py"])
+        self.assertEqual(counts["renamed"], 1)
+        with open(os.path.join(self.output, "project", "lib", "main.py")) as f:
+            self.assertEqual(f.read(), "print(1)\n")
+
+    def test_directory_file_flip(self):
+        spec = self.start(["root/", "  a/", "    x.txt", "  b.txt"])
+        for lines in (["root/", "  a", "  b.txt"], ["root/", "  a/", "  b.txt/", "    c.txt"]):
+            self.apply(spec, lines)
+            self.assert_matches_fresh_build(spec.tree)
+
+    def test_moved_file_keeps_content(self):
+        spec = self.start(["r/", "  a/", "    notes.txt", "  b/"])
+        with open(os.path.join(self.output, "r", "a", "notes.txt"), "w") as f:
+            f.write("hello")
+        counts = self.apply(spec, ["r/", "  a/", "  b/", "    notes.txt"])
+        self.assertEqual(counts["moved"], 1)
+        with open(os.path.join(self.output, "r", "b", "notes.txt")) as f:
+            self.assertEqual(f.read(), "hello")
+        self.assertFalse(os.path.exists(os.path.join(self.output, "r", "a", "notes.txt")))
+
+    def test_file_with_content_is_kept_unless_pruning(self):
+        spec = self.start(["r/", "  keep.txt", "  empty.txt"])
+        path = os.path.join(self.output, "r", "keep.txt")
+        with open(path, "w") as f:
+            f.write("data")
+        kept = []
+        counts = self.apply(spec, ["r/"], on_kept=kept.append)
+        self.assertEqual((counts["removed"], counts["kept"]), (1, 1))
+        self.assertEqual(kept, [path])
+        self.assertTrue(os.path.exists(path))
+        spec = self.start(["r/", "  keep.txt"])
+        with open(path, "w") as f:
+            f.write("data")
+        self.apply(spec, ["r/"], prune=True)
+        self.assertFalse(os.path.exists(path))
+
+    def test_unchanged_watch_created_file_is_removed(self):
+        spec = self.start(["r/"])
+        created = {}
+        self.apply(spec, ["r/", "  new.txt  # @text hello"], created=created)
+        counts = self.apply(spec, ["r/"], created=created)
+        self.assertEqual(counts["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.output, "r", "new.txt")))
+
+    def test_random_edits(self):
+        rng = random.Random(4321)
+
+        def line(kind):
+            if kind == "paths":
+                return "/".join(rng.choice(NAMES) for _ in range(rng.randint(1, 3))) + rng.choice(["", "/"])
+            return "    " * rng.randint(0, 3) + rng.choice(NAMES) + rng.choice(["", "/"])
+
+        for _ in range(100):
+            kind = rng.choice(["indent", "paths"])
+            lines = [line(kind) for _ in range(rng.randint(1, 20))]
+            spec = self.start(lines)
+            if has_duplicates(spec.tree):
+                continue
+            for _ in range(4):
+                op = rng.random()
+                index = rng.randint(0, len(lines))
+                if op < 0.4:
+                    lines.insert(index, line(kind))
+                elif op < 0.7 and lines:
+                    del lines[min(index, len(lines) - 1)]
+                elif lines:
+                    lines[min(index, len(lines) - 1)] = line(kind)
+                self.write(lines)
+                if has_duplicates(TreeFile(self.spec_path).parse()):
+                    break
+                self.apply(spec, lines)
+                self.assert_matches_fresh_build(spec.tree)
+
+
+class ValidateDeltaTest(WatchTestCase):
+
+    def test_cleanup_collision_is_an_error(self):
+        spec = self.load(["p/", "    a*b"])
+        self.write(["p/", "    a*b", "    a?b"])
+        delta = spec.update()
+        issues = validate_delta(delta)
+        self.assertTrue(any(entry[0] == SEVERITY_ERROR for entry in issues))
+
+    def test_old_issues_are_not_repeated(self):
+        spec = self.load(["p/", "    x.txt", "    x.txt", "q/"])
+        self.write(["p/", "    x.txt", "    x.txt", "q/", "    y.txt"])
+        self.assertEqual(validate_delta(spec.update()), [])
+
+
+
+def issue_keys(issues):
+    return sorted((entry[0], entry[2], sorted(entry[4].items())) for entry in issues)
+
+
+class SpliceIssuesTest(unittest.TestCase):
+    """splice_issues() so với validate_tree() trên cả cây mới."""
+
+    def edit(self, parser, issues, lines):
+        old = parser.tree
+        splice = parser.parse(lines)
+        issues = validate_tree(parser.tree) if splice is None else splice_issues(old, issues, parser.tree, splice)
+        self.assertEqual(issue_keys(issues), issue_keys(validate_tree(parser.tree)), lines)
+        return issues
+
+    def test_untouched_issue_moves_with_its_lines(self):
+        parser = SplicingParser()
+        lines = ["a/", "  x.txt", "b/", "  y.txt", "  y.txt"]
+        parser.parse(lines)
+        issues = self.edit(parser, validate_tree(parser.tree), ["a/", "  x.txt", "  z.txt", "b/", "  y.txt", "  y.txt"])
+        self.assertEqual([(entry[4]["line"], entry[4]["other_line"]) for entry in issues], [(6, 5)])
+
+    def test_merged_directories(self):
+        parser = SplicingParser()
+        lines = ["a/", "  x.txt", "b.txt", "a/", "  y.txt"]
+        parser.parse(lines)
+        issues = validate_tree(parser.tree)
+        # Thêm x.txt vào bản trùng thứ hai của a/: va chạm với x.txt của bản đầu
+        issues = self.edit(parser, issues, lines + ["  x.txt"])
+        self.assertEqual(len(issues), 1)
+        # Bản đầu thành tệp: hai thư mục a/ không còn gộp với nhau qua nó
+        self.edit(parser, issues, ["a", "b.txt", "a/", "  y.txt", "  x.txt"])
+
+    def test_random_edits(self):
+        rng = random.Random(2468)
+        names = ["a", "A", "b", "e.txt", "E.txt", "x?"]
+
+        def line(kind):
+            name = rng.choice(names) + rng.choice(["", "", "/", " (note)"])
+            if kind == "paths":
+                return "/".join(rng.choice(names) for _ in range(rng.randint(1, 3))) + rng.choice(["", "/"])
+            return "    " * rng.randint(0, 3) + name
+
+        for _ in range(300):
+            kind = rng.choice(["indent", "paths"])
+            lines = [line(kind) for _ in range(rng.randint(0, 20))]
+            parser = SplicingParser()
+            parser.parse(lines)
+            issues = validate_tree(parser.tree)
+            for _ in range(5):
+                index = rng.randint(0, len(lines))
+                op = rng.random()
+                if op < 0.4:
+                    lines.insert(index, line(kind))
+                elif op < 0.7 and lines:
+                    del lines[min(index, len(lines) - 1)]
+                else:
+                    end = rng.randint(index, len(lines))
+                    lines[index:end] = [line(kind) for _ in range(rng.randint(0, 3))]
+                issues = self.edit(parser, issues, lines)
+
+class FileWatcherTest(WatchTestCase):
+
+    def test_change_is_reported_once(self):
+        self.write(["a"])
+        with FileWatcher(self.spec_path, interval=0.05, settle=0.05) as watcher:
+            self.assertFalse(watcher.wait(0.2))
+            self.write(["a", "b"])
+            deadline = time.monotonic() + 5
+            while not watcher.wait(0.1):
+                self.assertLess(time.monotonic(), deadline)
+            self.assertFalse(watcher.wait(0.2))
+
+
+if __name__ == "__main__":
+    unittest.main()